@@ -1,7 +1,9 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 from flask_cors import CORS
 import asyncio
+import atexit
 import logging
+import math
 from datetime import datetime
 import time
 import numpy as np
@@ -9,8 +11,20 @@ import numpy as np
 # Importar módulos optimizados
 from config import Config
 from database.mongo_client import mongo_manager
+from database.rating_buffer import rating_buffer
 from cache.redis_cache import redis_cache
+from cache.warmup import access_log, cache_warmer
 from models.simple_recommendation_engine import simple_recommendation_engine
+from models.movie_stats import movie_stats
+from models.leaderboards import leaderboards
+from models.trending import trending
+from models.cooccurrence import cooccurrence
+from models.content_engine import content_model
+from models.user_topn import user_topn
+from models.user_neighbors import user_neighbors
+from models.als import als_model
+from models.genre_index import genre_index
+from models.title_search import title_search
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -67,6 +81,28 @@ def run_async_in_sync(async_func, *args, **kwargs):
             if not new_loop.is_closed():
                 new_loop.close()
 
+def _get_pagination(default_limit, bounded=True):
+    """Leer limit/offset/cursor de la petición
+    
+    El cursor es el offset del siguiente elemento (tal como se devuelve en `next_cursor`),
+    y la ventana se acota a MAX_RECOMMENDATIONS, que es lo que guardan las listas cacheadas.
+    Con `bounded=False` (listas completas en memoria) solo se acota el tamaño de página.
+    """
+    limit = int(request.args.get('limit', default_limit))
+    cursor = request.args.get('cursor')
+    offset = max(int(cursor) if cursor else int(request.args.get('offset', 0)), 0)
+    if not bounded:
+        return min(max(limit, 0), Config.MAX_RECOMMENDATIONS), offset
+    offset = min(offset, Config.MAX_RECOMMENDATIONS)
+    limit = min(max(limit, 0), Config.MAX_RECOMMENDATIONS - offset)
+    return limit, offset
+
+def _next_cursor(offset, limit, total, bounded=True):
+    """Cursor de la siguiente página o None si no hay más resultados"""
+    next_offset = offset + limit
+    end = min(total, Config.MAX_RECOMMENDATIONS) if bounded else total
+    return str(next_offset) if next_offset < end else None
+
 async def _get_stats_async():
     """Función asíncrona para obtener estadísticas"""
     try:
@@ -88,7 +124,8 @@ async def _get_stats_async():
             'movies_loaded': len(simple_recommendation_engine.movies_data) if simple_recommendation_engine.movies_data is not None else 0,
             'ratings_loaded': len(simple_recommendation_engine.ratings_data) if simple_recommendation_engine.ratings_data is not None else 0,
             'matrix_shape': simple_recommendation_engine.user_movie_matrix.shape if simple_recommendation_engine.user_movie_matrix is not None else None,
-            'available_methods': simple_recommendation_engine.get_available_methods()
+            'available_methods': simple_recommendation_engine.get_available_methods(),
+            'snapshot': simple_recommendation_engine.get_snapshot_info()
         }
         return jsonify({
             'database': {
@@ -113,7 +150,7 @@ async def _get_stats_async():
 
 
 def initialize_system_sync():
-    """Inicializar el sistema de forma síncrona"""
+    """Inicializar el sistema de forma síncrona (bloqueante, para scripts)"""
     global is_initialized, startup_time
     
     if not is_initialized:
@@ -127,8 +164,7 @@ def initialize_system_sync():
             
             success = loop.run_until_complete(simple_recommendation_engine.initialize())
             if success:
-                is_initialized = True
-                logger.info(f"✅ Sistema inicializado en {time.time() - startup_time:.2f}s")
+                _on_engine_ready()
             else:
                 logger.error("❌ Error inicializando sistema")
         except Exception as e:
@@ -136,8 +172,35 @@ def initialize_system_sync():
         finally:
             loop.close()
 
-# Inicializar sistema al importar el módulo
-initialize_system_sync()
+def _on_engine_ready():
+    """Marcar el sistema como listo y calentar el cache"""
+    global is_initialized
+    is_initialized = True
+    logger.info(f"✅ Sistema inicializado en {time.time() - startup_time:.2f}s")
+    cache_warmer.start(trigger='startup')
+
+def start_engine_loading():
+    """Lanzar la carga del motor en segundo plano; los endpoints baratos se sirven desde ya"""
+    global startup_time
+    
+    if startup_time is None:
+        startup_time = time.time()
+    started = simple_recommendation_engine.initialize_in_background(on_ready=_on_engine_ready)
+    if started:
+        logger.info("🚀 Cargando motor de recomendaciones en segundo plano...")
+    return started
+
+def _engine_not_ready_response():
+    """Respuesta 503 para endpoints que necesitan el motor cargado"""
+    return jsonify({
+        'error': 'Sistema no inicializado',
+        'engine': simple_recommendation_engine.get_load_progress()
+    }), 503
+
+def _warm_recommendations(key):
+    """Handler de calentamiento para claves 'movieId:método'"""
+    movie_id, method = key.split(':', 1)
+    _build_recommendation_ranking(int(movie_id), method)
 
 @app.route('/')
 def index():
@@ -200,41 +263,29 @@ def health_check():
     return jsonify({
         'status': 'healthy' if is_initialized else 'initializing',
         'initialized': is_initialized,
+        'ready': simple_recommendation_engine.is_loaded,
+        'engine': simple_recommendation_engine.get_load_progress(),
         'uptime': time.time() - startup_time if startup_time else 0,
         'cache': cache_stats,
+        'warmup': cache_warmer.get_progress(),
         'timestamp': datetime.now().isoformat()
     })
 
 @app.route('/api/init')
 def initialize_system_manual():
-    """Inicializar sistema manualmente (endpoint síncrono)"""
-    global is_initialized
-    
+    """Lanzar la inicialización del sistema (no bloquea: la carga sigue en segundo plano)"""
     if is_initialized:
         return jsonify({
             'status': 'already_initialized',
             'message': 'Sistema ya inicializado'
         })
     
-    # Ejecutar inicialización de forma asíncrona
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    try:
-        success = loop.run_until_complete(simple_recommendation_engine.initialize())
-        if success:
-            is_initialized = True
-            return jsonify({
-                'status': 'success',
-                'message': 'Sistema inicializado correctamente'
-            })
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'Error inicializando sistema'
-            }), 500
-    finally:
-        loop.close()
+    start_engine_loading()
+    return jsonify({
+        'status': 'initializing',
+        'message': 'Inicialización en curso, consultar /api/health para ver el progreso',
+        'engine': simple_recommendation_engine.get_load_progress()
+    }), 202
 
 @app.route('/api/movies')
 def get_movies():
@@ -318,7 +369,7 @@ def get_movie(movie_id):
             # Intentar obtener recomendaciones del motor si está disponible
             if simple_recommendation_engine.is_loaded:
                 # Usar una aproximación síncrona simple
-                similar_movies = _get_simple_similar_movies(movie_id, movie.get('genres', ''))
+                similar_movies = _get_simple_similar_movies(movie['movieId'], movie.get('genres', ''))
         except Exception as e:
             logger.warning(f"⚠️ No se pudieron obtener películas similares: {e}")
         
@@ -341,11 +392,16 @@ def get_movie(movie_id):
         return jsonify({'error': str(e)}), 500
 
 def _get_simple_similar_movies(movie_id, genres, limit=5):
-    """Obtener películas similares usando una aproximación simple basada en géneros"""
+    """Obtener películas similares por géneros compartidos (todo el catálogo si el motor está cargado)"""
     try:
         if not genres:
             return []
         
+        similar = simple_recommendation_engine.get_similar_by_genres(movie_id, limit)
+        if similar is not None:
+            movie_index = simple_recommendation_engine.movie_index
+            return [{**movie_index[similar_id], 'similarity': score} for similar_id, score in similar]
+        
         # Buscar películas con géneros similares
         genre_list = genres.split('|')
         query = {
@@ -366,15 +422,63 @@ def _get_simple_similar_movies(movie_id, genres, limit=5):
         logger.error(f"❌ Error obteniendo películas similares: {e}")
         return []
 
+def _get_movie_cards(movie_ids):
+    """Obtener tarjetas de película (datos + estadísticas de rating) para varios IDs
+    
+    Lee todas las tarjetas del cache en un round trip y rellena solo las que faltan
+    con una consulta de películas y una agregación de ratings sobre MongoDB.
+    Devuelve {movieId: tarjeta}.
+    """
+    cards, misses = redis_cache.get_cached_movie_cards(movie_ids)
+    if not misses:
+        return cards
+    
+    if mongo_manager.db is None:
+        mongo_manager.connect()
+    
+    movies = mongo_manager.db.movies.find({'movieId': {'$in': misses}})
+    rating_pipeline = [
+        {'$match': {'movieId': {'$in': misses}}},
+        {'$group': {
+            '_id': '$movieId',
+            'avg_rating': {'$avg': '$rating'},
+            'total_ratings': {'$sum': 1},
+            'min_rating': {'$min': '$rating'},
+            'max_rating': {'$max': '$rating'}
+        }}
+    ]
+    stats_by_movie = {stats['_id']: stats for stats in mongo_manager.db.ratings.aggregate(rating_pipeline)}
+    
+    new_cards = []
+    for movie in movies:
+        stats = stats_by_movie.get(movie['movieId'])
+        new_cards.append({
+            'movieId': movie['movieId'],
+            'title': movie['title'],
+            'genres': movie.get('genres', ''),
+            'year': movie.get('year'),
+            '_id': str(movie['_id']),
+            'avg_rating': float(stats['avg_rating']) if stats else 0,
+            'total_ratings': stats['total_ratings'] if stats else 0,
+            'min_rating': float(stats['min_rating']) if stats else 0,
+            'max_rating': float(stats['max_rating']) if stats else 0,
+            'rating_count': stats['total_ratings'] if stats else 0
+        })
+    
+    if new_cards:
+        redis_cache.cache_movie_cards(new_cards)
+    cards.update({card['movieId']: card for card in new_cards})
+    return cards
+
 @app.route('/api/recommendations/<movie_id>')
 def get_recommendations(movie_id):
     """Obtener recomendaciones usando el motor optimizado"""
     try:
         method = request.args.get('method', 'hybrid')
-        limit = int(request.args.get('limit', 10))
+        limit, offset = _get_pagination(10)
         
         # Validar método
-        available_methods = ['content', 'collaborative', 'popular', 'hybrid']
+        available_methods = ['content', 'collaborative', 'popular', 'hybrid', 'graph']
         if method not in available_methods:
             return jsonify({
                 'error': f'Método no válido. Métodos disponibles: {available_methods}'
@@ -395,15 +499,23 @@ def get_recommendations(movie_id):
         if not movie:
             return jsonify({'error': 'Película no encontrada'}), 404
         
-        # Obtener recomendaciones usando una aproximación síncrona
-        recommendations = _get_sync_recommendations(movie_id, method, limit)
+        access_log.record('rec', f"{movie_id_int}:{method}")
+        
+        # Servir la página desde el ranking cacheado; si no existe, calcular el ranking completo
+        cached = redis_cache.get_cached_recommendations(movie_id_int, method, offset, limit)
+        if cached:
+            recommendations, total = cached['items'], cached['total']
+        else:
+            ranking = _build_recommendation_ranking(movie_id_int, method)
+            recommendations, total = ranking[offset:offset + limit], len(ranking)
         
         # Obtener explicación del método
         explanations = {
-            'content': 'Recomendaciones basadas en similitud de contenido (géneros)',
+            'content': 'Recomendaciones basadas en similitud de contenido (tags y géneros)',
             'collaborative': 'Recomendaciones basadas en usuarios similares',
             'popular': 'Películas más populares',
-            'hybrid': 'Combinación de métodos de contenido y colaborativo'
+            'hybrid': 'Combinación de métodos de contenido y colaborativo',
+            'graph': 'Paseo aleatorio con reinicio (PageRank personalizado) en el grafo usuario-película'
         }
         
         return jsonify({
@@ -411,13 +523,23 @@ def get_recommendations(movie_id):
             'method': method,
             'explanation': explanations.get(method, 'Método de recomendación'),
             'recommendations': recommendations,
-            'count': len(recommendations)
+            'count': len(recommendations),
+            'offset': offset,
+            'total': total,
+            'next_cursor': _next_cursor(offset, limit, total)
         })
         
     except Exception as e:
         logger.error(f"❌ Error obteniendo recomendaciones: {e}")
         return jsonify({'error': str(e)}), 500
 
+def _build_recommendation_ranking(movie_id, method):
+    """Calcular y cachear el ranking completo de recomendaciones de una película"""
+    ranking = _get_sync_recommendations(movie_id, method, Config.MAX_RECOMMENDATIONS)
+    if ranking:
+        redis_cache.cache_movie_recommendations(movie_id, method, ranking)
+    return ranking
+
 def _get_sync_recommendations(movie_id, method, limit):
     """Obtener recomendaciones usando operaciones síncronas"""
     try:
@@ -427,6 +549,8 @@ def _get_sync_recommendations(movie_id, method, limit):
             return _get_collaborative_recommendations(movie_id, limit)
         elif method == 'popular':
             return _get_popular_recommendations(limit)
+        elif method == 'graph':
+            return _get_graph_recommendations(movie_id, limit)
         else:  # hybrid
             return _get_hybrid_recommendations(movie_id, limit)
     except Exception as e:
@@ -439,6 +563,17 @@ def _get_content_recommendations(movie_id, limit):
         # Convertir movie_id a entero
         movie_id_int = int(movie_id)
         
+        # Modelo TF-IDF de tags y géneros (vecinos precalculados) o, si no está, géneros compartidos
+        similar = content_model.similar(movie_id_int, limit) if content_model.loaded else None
+        if not similar:
+            similar = simple_recommendation_engine.get_similar_by_genres(movie_id_int, limit)
+        if similar is not None and simple_recommendation_engine.is_loaded:
+            movie_index = simple_recommendation_engine.movie_index
+            return [
+                {**movie_index[similar_id], 'similarity_score': score}
+                for similar_id, score in similar if similar_id in movie_index
+            ]
+        
         # Obtener la película de referencia
         movie = mongo_manager.db.movies.find_one({'movieId': movie_id_int})
         if not movie:
@@ -481,56 +616,69 @@ def _get_content_recommendations(movie_id, limit):
         logger.error(f"❌ Error en recomendaciones de contenido: {e}")
         return []
 
+def _get_collaborative_from_database(movie_id, limit):
+    """Películas mejor valoradas por los usuarios a los que les gustó `movie_id` (agregación en MongoDB)"""
+    # Obtener usuarios que calificaron esta película con alta calificación
+    pipeline = [
+        {'$match': {'movieId': movie_id, 'rating': {'$gte': 4.0}}},
+        {'$group': {'_id': '$userId'}}
+    ]
+    
+    high_rating_users = list(mongo_manager.db.ratings.aggregate(pipeline))
+    user_ids = [user['_id'] for user in high_rating_users]
+    
+    if not user_ids:
+        return []
+    
+    # Obtener películas mejor calificadas por usuarios similares
+    pipeline = [
+        {
+            '$match': {
+                'userId': {'$in': user_ids},
+                'movieId': {'$ne': movie_id},
+                'rating': {'$gte': 4.0}
+            }
+        },
+        {
+            '$group': {
+                '_id': '$movieId',
+                'avg_rating': {'$avg': '$rating'},
+                'count': {'$sum': 1}
+            }
+        },
+        {
+            '$match': {
+                'count': {'$gte': 2}
+            }
+        },
+        {
+            '$sort': {'avg_rating': -1}
+        },
+        {
+            '$limit': limit
+        }
+    ]
+    
+    return list(mongo_manager.db.ratings.aggregate(pipeline))
+
 def _get_collaborative_recommendations(movie_id, limit):
-    """Recomendaciones colaborativas usando operaciones síncronas"""
+    """Recomendaciones colaborativas: "a quienes les gustó esta película también les gustó"
+
+    Lee una fila de la matriz de co-ocurrencia precalculada; si no está construida o la
+    película no aparece en ella, recurre a la agregación en MongoDB.
+    """
     try:
-        # Obtener usuarios que calificaron esta película con alta calificación
-        pipeline = [
-            {'$match': {'movieId': movie_id, 'rating': {'$gte': 4.0}}},
-            {'$group': {'_id': '$userId'}}
-        ]
-        
-        high_rating_users = list(mongo_manager.db.ratings.aggregate(pipeline))
-        user_ids = [user['_id'] for user in high_rating_users]
-        
-        if not user_ids:
-            return []
-        
-        # Obtener películas mejor calificadas por usuarios similares
-        pipeline = [
-            {
-                '$match': {
-                    'userId': {'$in': user_ids},
-                    'movieId': {'$ne': movie_id},
-                    'rating': {'$gte': 4.0}
-                }
-            },
-            {
-                '$group': {
-                    '_id': '$movieId',
-                    'avg_rating': {'$avg': '$rating'},
-                    'count': {'$sum': 1}
-                }
-            },
-            {
-                '$match': {
-                    'count': {'$gte': 2}
-                }
-            },
-            {
-                '$sort': {'avg_rating': -1}
-            },
-            {
-                '$limit': limit
-            }
-        ]
-        
-        results = list(mongo_manager.db.ratings.aggregate(pipeline))
-        
+        rows = cooccurrence.also_liked(movie_id, limit) if cooccurrence.loaded else None
+        if rows is not None:
+            results = [{'_id': row['movieId'], 'avg_rating': row['avg_rating'], 'count': row['count']} for row in rows]
+        else:
+            results = _get_collaborative_from_database(movie_id, limit)
+
         # Obtener información de películas
+        cards = _get_movie_cards([result['_id'] for result in results])
         recommendations = []
         for result in results:
-            movie = mongo_manager.db.movies.find_one({'movieId': result['_id']})
+            movie = cards.get(result['_id'])
             if movie:
                 recommendations.append({
                     'movieId': movie['movieId'],
@@ -547,37 +695,42 @@ def _get_collaborative_recommendations(movie_id, limit):
         logger.error(f"❌ Error en recomendaciones colaborativas: {e}")
         return []
 
+def _get_graph_recommendations(movie_id, limit):
+    """Recomendaciones por paseo aleatorio con reinicio desde la película en el grafo usuario-película
+
+    Si el motor no está cargado o la película no tiene ratings, recurre a las colaborativas.
+    """
+    try:
+        scored = simple_recommendation_engine.get_graph_recommendations(movie_id, limit)
+        if scored is None:
+            return _get_collaborative_recommendations(movie_id, limit)
+        movie_index = simple_recommendation_engine.movie_index
+        return [
+            {**movie_index[other_id], 'graph_score': score}
+            for other_id, score in scored if other_id in movie_index
+        ]
+    except Exception as e:
+        logger.error(f"❌ Error en recomendaciones por grafo: {e}")
+        return []
+
+def _get_top_rated(limit, min_ratings=10):
+    """Películas mejor valoradas: [{'_id', 'avg_rating', 'count'}] (slice del ranking compartido)"""
+    return [
+        {'_id': top['movieId'], 'avg_rating': top['avg_rating'], 'count': top['rating_count']}
+        for top in leaderboards.top(limit=limit, min_ratings=min_ratings)
+    ]
+
 def _get_popular_recommendations(limit):
     """Recomendaciones basadas en popularidad usando operaciones síncronas"""
     try:
         # Obtener películas más populares
-        pipeline = [
-            {
-                '$group': {
-                    '_id': '$movieId',
-                    'avg_rating': {'$avg': '$rating'},
-                    'count': {'$sum': 1}
-                }
-            },
-            {
-                '$match': {
-                    'count': {'$gte': 10}
-                }
-            },
-            {
-                '$sort': {'avg_rating': -1}
-            },
-            {
-                '$limit': limit
-            }
-        ]
-        
-        popular_movies = list(mongo_manager.db.ratings.aggregate(pipeline))
+        popular_movies = _get_top_rated(limit)
         
         # Obtener información de películas
+        cards = _get_movie_cards([popular['_id'] for popular in popular_movies])
         recommendations = []
         for popular in popular_movies:
-            movie = mongo_manager.db.movies.find_one({'movieId': popular['_id']})
+            movie = cards.get(popular['_id'])
             if movie:
                 recommendations.append({
                     'movieId': movie['movieId'],
@@ -627,9 +780,10 @@ def _get_hybrid_recommendations(movie_id, limit):
         sorted_recs = sorted(all_recommendations.items(), key=lambda x: x[1], reverse=True)[:limit]
         
         # Formatear resultados
+        cards = _get_movie_cards([movie_id for movie_id, _ in sorted_recs])
         recommendations = []
         for movie_id, score in sorted_recs:
-            movie = mongo_manager.db.movies.find_one({'movieId': movie_id})
+            movie = cards.get(movie_id)
             if movie:
                 recommendations.append({
                     'movieId': movie['movieId'],
@@ -648,41 +802,21 @@ def _get_hybrid_recommendations(movie_id, limit):
 def _get_popular_movies_with_ratings(limit):
     """Obtener películas populares con información de rating usando operaciones síncronas"""
     try:
-        # Obtener películas más populares con rating
-        pipeline = [
-            {
-                '$group': {
-                    '_id': '$movieId',
-                    'avg_rating': {'$avg': '$rating'},
-                    'count': {'$sum': 1}
-                }
-            },
-            {
-                '$match': {
-                    'count': {'$gte': 10}  # Al menos 10 calificaciones
-                }
-            },
-            {
-                '$sort': {'avg_rating': -1}
-            },
-            {
-                '$limit': limit
-            }
-        ]
-        
-        popular_movies = list(mongo_manager.db.ratings.aggregate(pipeline))
+        # Obtener películas más populares con rating (al menos 10 calificaciones)
+        popular_movies = _get_top_rated(limit)
         
         # Obtener información completa de películas
+        cards = _get_movie_cards([popular['_id'] for popular in popular_movies])
         enriched_movies = []
         for popular in popular_movies:
-            movie = mongo_manager.db.movies.find_one({'movieId': popular['_id']})
+            movie = cards.get(popular['_id'])
             if movie:
                 enriched_movie = {
                     'movieId': movie['movieId'],
                     'title': movie['title'],
                     'genres': movie.get('genres', ''),
                     'year': movie.get('year'),
-                    '_id': str(movie['_id']),
+                    '_id': movie['_id'],
                     'avg_rating': float(popular['avg_rating']),
                     'total_ratings': popular['count'],
                     'rating_count': popular['count'],
@@ -698,6 +832,94 @@ def _get_popular_movies_with_ratings(limit):
         logger.error(f"❌ Error obteniendo películas populares con rating: {e}")
         return []
 
+def _parse_rating(item):
+    """Validar un rating del cuerpo de la petición; devuelve (rating, error)"""
+    try:
+        rating = {
+            'userId': int(item['userId']),
+            'movieId': int(item['movieId']),
+            'rating': float(item['rating'])
+        }
+        # Sin timestamp se usa la hora actual (0 es un timestamp válido)
+        timestamp = item.get('timestamp')
+        timestamp = time.time() if timestamp is None else float(timestamp)
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None, 'Se requieren userId, movieId y rating numéricos'
+    
+    if not 0.5 <= rating['rating'] <= 5.0 or (rating['rating'] * 2) % 1:
+        return None, 'El rating debe estar entre 0.5 y 5.0 en pasos de 0.5'
+    # Un timestamp fuera de rango (o inf/nan) movería el log de deltas, las tendencias y el top-N precalculado
+    if not math.isfinite(timestamp) or not 0 <= timestamp <= time.time() + Config.RATINGS_MAX_CLOCK_SKEW:
+        return None, 'El timestamp debe estar entre 0 y la hora actual del servidor'
+    rating['timestamp'] = int(timestamp)
+    return rating, None
+
+@app.route('/api/ratings', methods=['POST'])
+def add_ratings():
+    """Registrar uno o varios ratings
+    
+    Acepta un rating ({userId, movieId, rating[, timestamp]}) o {'ratings': [...]}.
+    Los ratings se encolan y se persisten en lote en segundo plano (202 Accepted).
+    """
+    try:
+        payload = request.get_json(silent=True)
+        if payload is None:
+            return jsonify({'error': 'Se esperaba un cuerpo JSON'}), 400
+        
+        items = payload.get('ratings') if isinstance(payload, dict) and 'ratings' in payload else payload
+        if isinstance(items, dict):
+            items = [items]
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'No se recibieron ratings'}), 400
+        if len(items) > Config.RATINGS_MAX_BULK:
+            return jsonify({'error': f'Máximo {Config.RATINGS_MAX_BULK} ratings por petición'}), 413
+        
+        ratings = []
+        errors = []
+        for position, item in enumerate(items):
+            rating, error = _parse_rating(item) if isinstance(item, dict) else (None, 'Se esperaba un objeto')
+            if error:
+                errors.append({'index': position, 'error': error})
+            else:
+                ratings.append(rating)
+        
+        # Comprobar que las películas existen con una sola consulta
+        if not errors:
+            if mongo_manager.db is None:
+                mongo_manager.connect()
+            movie_ids = list({rating['movieId'] for rating in ratings})
+            known = set(mongo_manager.db.movies.distinct('movieId', {'movieId': {'$in': movie_ids}}))
+            errors = [
+                {'index': position, 'error': f"Película {rating['movieId']} no encontrada"}
+                for position, rating in enumerate(ratings) if rating['movieId'] not in known
+            ]
+        
+        if errors:
+            return jsonify({'error': 'Ratings no válidos', 'details': errors[:20]}), 400
+        
+        accepted = rating_buffer.add(ratings)
+        return jsonify({
+            'status': 'accepted',
+            'accepted': accepted,
+            'pending': rating_buffer.pending_count()
+        }), 202
+    except Exception as e:
+        logger.error(f"❌ Error registrando ratings: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _on_ratings_flushed(changes):
+    """Actualizar el estado derivado tras persistir un lote de ratings"""
+    simple_recommendation_engine.apply_ratings(changes)
+    changed_movies = movie_stats.apply(changes)
+    leaderboards.update(changed_movies)
+    genre_index.update(changed_movies)
+    title_search.update(changed_movies)
+    trending.record_many(changes)
+    user_topn.mark_changed({change['userId'] for change in changes})
+    if changed_movies:
+        # El ranking popular cacheado lleva movie_stats.version en la clave: no hace falta borrarlo
+        redis_cache.invalidate_movie_cards(changed_movies)
+
 @app.route('/api/user-recommendations/<user_id>')
 def get_user_recommendations(user_id):
     """Obtener recomendaciones basadas en usuario"""
@@ -706,7 +928,18 @@ def get_user_recommendations(user_id):
         limit = int(request.args.get('limit', 10))
         
         if not is_initialized:
-            return jsonify({'error': 'Sistema no inicializado'}), 503
+            # Motor aún cargando: degradar a películas populares (solo necesita MongoDB)
+            if mongo_manager.db is None:
+                mongo_manager.connect()
+            recommendations = _get_popular_recommendations(limit)
+            return jsonify({
+                'user_id': user_id,
+                'method': 'popular',
+                'fallback': True,
+                'engine': simple_recommendation_engine.get_load_progress(),
+                'recommendations': recommendations,
+                'count': len(recommendations)
+            })
         
         # Usar run_async_in_sync para manejar operaciones asíncronas
         try:
@@ -735,7 +968,7 @@ def get_similarity(movie_id1, movie_id2):
         method = request.args.get('method', 'cosine')
         
         if not is_initialized:
-            return jsonify({'error': 'Sistema no inicializado'}), 503
+            return _engine_not_ready_response()
         
         # Validar método
         available_methods = simple_recommendation_engine.get_available_methods()
@@ -746,12 +979,14 @@ def get_similarity(movie_id1, movie_id2):
         
         # Usar run_async_in_sync para manejar operaciones asíncronas
         try:
-            # Obtener información de ambas películas
+            # Obtener información de ambas películas (los movieId se guardan como enteros)
+            movie_id1, movie_id2 = int(movie_id1), int(movie_id2)
             movie1 = run_async_in_sync(mongo_manager.get_movie_by_id, movie_id1)
             movie2 = run_async_in_sync(mongo_manager.get_movie_by_id, movie_id2)
             
             if not movie1 or not movie2:
                 return jsonify({'error': 'Una o ambas películas no encontradas'}), 404
+            movie1['_id'], movie2['_id'] = str(movie1['_id']), str(movie2['_id'])
             
             similarity = simple_recommendation_engine.get_movie_similarity(movie_id1, movie_id2, method)
             explanation = simple_recommendation_engine.get_similarity_explanation(method)
@@ -785,10 +1020,13 @@ def get_similarity(movie_id1, movie_id2):
 
 @app.route('/api/search')
 def search_movies():
-    """Buscar películas"""
+    """Buscar películas
+    
+    `limit` se limita a MAX_RECOMMENDATIONS, lo mismo que se guarda en cache por búsqueda.
+    """
     try:
         query = request.args.get('q', '')
-        limit = int(request.args.get('limit', 20))
+        limit = min(max(int(request.args.get('limit', 20)), 1), Config.MAX_RECOMMENDATIONS)
         genre = request.args.get('genre')
         year = request.args.get('year')
         rating = request.args.get('rating')
@@ -811,19 +1049,24 @@ def search_movies():
             if rating:
                 filters['rating'] = float(rating)
             
+            # Las búsquedas simples se registran para el precalentamiento sea cual sea el camino
+            if query and not genre and not year and not rating:
+                access_log.record('search', query)
+            
+            # Búsquedas simples por título: índice en memoria si el motor está cargado
+            if query and not genre and not year and not rating and title_search.ready:
+                return jsonify(_search_titles(query, limit))
+            
             # Verificar cache para búsquedas simples
             if query and not genre and not year and not rating:
                 cached_results = redis_cache.get_cached_search_results(query)
                 if cached_results:
                     return jsonify(cached_results[:limit])
+                return jsonify(_build_search_results(query)[:limit])
             
             # Búsqueda en MongoDB
             results = run_async_in_sync(mongo_manager.get_movies_batch, limit=limit, filters=filters)
             
-            # Guardar en cache para búsquedas simples
-            if query and results and not genre and not year and not rating:
-                redis_cache.cache_search_results(query, results)
-            
             return jsonify(results)
         except Exception as e:
             logger.error(f"❌ Error en búsqueda: {e}")
@@ -833,10 +1076,58 @@ def search_movies():
         logger.error(f"❌ Error en búsqueda: {e}")
         return jsonify({'error': str(e)}), 500
 
+def _build_search_results(query):
+    """Buscar por texto y cachear hasta MAX_RECOMMENDATIONS resultados"""
+    results = run_async_in_sync(mongo_manager.get_movies_batch, limit=Config.MAX_RECOMMENDATIONS,
+                                filters={'search': query})
+    if results:
+        redis_cache.cache_search_results(query, results)
+    return results
+
+def _search_titles(query, limit):
+    """Buscar en el índice de títulos y devolver los datos de cada película"""
+    movie_index = simple_recommendation_engine.movie_index
+    results = []
+    for movie_id, match, score in title_search.search(query, limit):
+        movie = movie_index.get(movie_id)
+        if movie:
+            results.append({
+                **movie,
+                'rating_count': title_search.popularity(movie_id),
+                'match': match,
+                'match_score': score
+            })
+    return results
+
+@app.route('/api/autocomplete')
+def autocomplete():
+    """Sugerencias de títulos mientras se escribe (prefijo, palabras y aproximada), sin MongoDB"""
+    try:
+        query = request.args.get('q', '')
+        limit = min(max(int(request.args.get('limit', 10)), 1), Config.AUTOCOMPLETE_MAX_RESULTS)
+        if not title_search.ready:
+            return _engine_not_ready_response()
+        
+        start = time.perf_counter()
+        suggestions = _search_titles(query, limit)
+        return jsonify({
+            'query': query,
+            'suggestions': suggestions,
+            'count': len(suggestions),
+            'took_ms': round((time.perf_counter() - start) * 1000, 3)
+        })
+    except Exception as e:
+        logger.error(f"❌ Error en autocompletado: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/genres')
 def get_genres():
     """Obtener géneros disponibles"""
     try:
+        # Conteos precalculados en el índice invertido de géneros
+        if genre_index.ready:
+            return jsonify([genre for genre in genre_index.genre_counts() if genre['genre'] != 'Unknown'])
+        
         # Usar operaciones síncronas para evitar problemas con event loops
         # Asegurar conexión síncrona a MongoDB
         if mongo_manager.db is None:
@@ -879,77 +1170,108 @@ def get_genres():
 
 @app.route('/api/genres/<genre>')
 def get_movies_by_genre(genre):
-    """Obtener películas por género con información de rating y similitud"""
+    """Obtener películas por género con información de rating y similitud
+    
+    Varios géneros separados por comas se combinan con match=any (OR, por defecto) o
+    match=all (AND); sort=rating (por defecto) o popularity.
+    """
     try:
-        limit = int(request.args.get('limit', 20))
-        
-        # Verificar cache
-        cached_movies = redis_cache.get_cached_genre_movies(genre)
-        if cached_movies:
-            return jsonify(cached_movies[:limit])
-        
-        # Usar operaciones síncronas para evitar problemas con event loops
-        # Asegurar conexión síncrona a MongoDB
-        if mongo_manager.db is None:
-            mongo_manager.connect()
-        
-        # Obtener películas del género usando operaciones síncronas
-        query = {'genres': {'$regex': genre, '$options': 'i'}}
-        movies = list(mongo_manager.db.movies.find(query).limit(limit))
-        
-        # Enriquecer películas con información de rating y similitud
-        enriched_movies = []
-        for movie in movies:
-            movie_id = movie['movieId']
-            
-            # Obtener estadísticas de rating para esta película
-            rating_pipeline = [
-                {'$match': {'movieId': movie_id}},
-                {'$group': {
-                    '_id': None,
-                    'avg_rating': {'$avg': '$rating'},
-                    'total_ratings': {'$sum': 1},
-                    'min_rating': {'$min': '$rating'},
-                    'max_rating': {'$max': '$rating'}
-                }}
+        # Con el índice de géneros se pagina la lista completa; las listas cacheadas llegan a MAX_RECOMMENDATIONS
+        bounded = not (genre_index.ready and simple_recommendation_engine.is_loaded)
+        limit, offset = _get_pagination(20, bounded=bounded)
+        access_log.record('genre', genre.lower())
+        
+        if not bounded:
+            match = request.args.get('match', 'any')
+            sort = request.args.get('sort', 'rating')
+            if match not in genre_index.MATCHES or sort not in genre_index.SORTS:
+                return jsonify({
+                    'error': f'Parámetros no válidos. match: {list(genre_index.MATCHES)}, sort: {list(genre_index.SORTS)}'
+                }), 400
+            genres = genre.split(',')
+            movie_ids, total = genre_index.query(genres, match=match, sort=sort, limit=limit, offset=offset)
+            cards = _index_movie_cards(movie_ids)
+            movies = [
+                {**cards[movie_id], 'similarity_score': _genre_share(cards[movie_id], genres)}
+                for movie_id in movie_ids if movie_id in cards
             ]
-            
-            rating_stats = list(mongo_manager.db.ratings.aggregate(rating_pipeline))
-            
-            # Calcular similitud basada en géneros compartidos
-            movie_genres = movie.get('genres', '').split('|')
-            genre_similarity = len([g for g in movie_genres if g.lower() == genre.lower()]) / len(movie_genres) if movie_genres else 0
-            
-            # Crear película enriquecida
-            enriched_movie = {
-                'movieId': movie['movieId'],
-                'title': movie['title'],
-                'genres': movie.get('genres', ''),
-                'year': movie.get('year'),
-                '_id': str(movie['_id']),
-                'avg_rating': float(rating_stats[0]['avg_rating']) if rating_stats else 0,
-                'total_ratings': rating_stats[0]['total_ratings'] if rating_stats else 0,
-                'min_rating': float(rating_stats[0]['min_rating']) if rating_stats else 0,
-                'max_rating': float(rating_stats[0]['max_rating']) if rating_stats else 0,
-                'similarity_score': genre_similarity,
-                'rating_count': rating_stats[0]['total_ratings'] if rating_stats else 0
-            }
-            
-            enriched_movies.append(enriched_movie)
-        
-        # Ordenar por rating promedio (descendente)
-        enriched_movies.sort(key=lambda x: x['avg_rating'], reverse=True)
-        
-        # Guardar en cache
-        if enriched_movies:
-            redis_cache.cache_genre_movies(genre, enriched_movies)
+        else:
+            # Verificar cache (ranking completo, se lee solo la página pedida)
+            cached_movies = redis_cache.get_cached_genre_movies(genre, offset, limit)
+            if cached_movies:
+                movies, total = cached_movies['items'], cached_movies['total']
+            else:
+                ranking = _build_genre_ranking(genre)
+                movies, total = ranking[offset:offset + limit], len(ranking)
         
-        return jsonify(enriched_movies)
+        response = jsonify(movies)
+        response.headers['X-Total-Count'] = str(total)
+        response.headers['X-Next-Cursor'] = _next_cursor(offset, limit, total, bounded=bounded) or ''
+        return response
         
     except Exception as e:
         logger.error(f"❌ Error obteniendo películas por género: {e}")
         return jsonify({'error': str(e)}), 500
 
+def _index_movie_cards(movie_ids):
+    """Tarjetas de película desde el índice del motor y las estadísticas en memoria (sin Redis ni MongoDB)
+    
+    Mismos campos que _get_movie_cards salvo _id, min_rating y max_rating, que no se
+    guardan en memoria. Devuelve {movieId: tarjeta}.
+    """
+    movie_index = simple_recommendation_engine.movie_index
+    stats = movie_stats.get_many(movie_ids)
+    cards = {}
+    for movie_id in movie_ids:
+        movie = movie_index.get(movie_id)
+        if not movie:
+            continue
+        count, total = stats.get(movie_id, (0, 0.0))
+        cards[movie_id] = {
+            **movie,
+            'avg_rating': total / count if count else 0,
+            'total_ratings': count,
+            'rating_count': count
+        }
+    return cards
+
+def _genre_share(card, genres):
+    """Fracción de los géneros de la película que están entre los pedidos"""
+    movie_genres = card['genres'].split('|')
+    wanted = {genre.strip().lower() for genre in genres}
+    return len([g for g in movie_genres if g.lower() in wanted]) / len(movie_genres) if movie_genres else 0
+
+def _build_genre_ranking(genre):
+    """Calcular y cachear el ranking completo de películas de un género"""
+    # Usar operaciones síncronas para evitar problemas con event loops
+    # Asegurar conexión síncrona a MongoDB
+    if mongo_manager.db is None:
+        mongo_manager.connect()
+    
+    # Obtener películas del género usando operaciones síncronas
+    query = {'genres': {'$regex': genre, '$options': 'i'}}
+    movies = list(mongo_manager.db.movies.find(query, {'movieId': 1}).limit(Config.MAX_RECOMMENDATIONS))
+    
+    # Enriquecer películas con información de rating y similitud (tarjetas en lote)
+    cards = _get_movie_cards([movie['movieId'] for movie in movies])
+    enriched_movies = []
+    for movie in movies:
+        card = cards.get(movie['movieId'])
+        if not card:
+            continue
+        
+        # Calcular similitud basada en géneros compartidos
+        enriched_movies.append({**card, 'similarity_score': _genre_share(card, [genre])})
+    
+    # Ordenar por rating promedio (descendente)
+    enriched_movies.sort(key=lambda x: x['avg_rating'], reverse=True)
+    
+    # Guardar en cache
+    if enriched_movies:
+        redis_cache.cache_genre_movies(genre, enriched_movies)
+    
+    return enriched_movies
+
 @app.route('/api/genre-recommendations')
 def get_genre_recommendations():
     """Obtener recomendaciones basadas en múltiples géneros seleccionados"""
@@ -999,100 +1321,136 @@ def get_genre_recommendations():
 def _get_multi_genre_recommendations(genres, method, limit):
     """Obtener recomendaciones basadas en múltiples géneros o similitud KNN"""
     try:
-        # Construir query para múltiples géneros
-        genre_queries = []
-        for genre in genres:
-            if genre.strip():
-                genre_queries.append({'genres': {'$regex': genre.strip(), '$options': 'i'}})
-        if not genre_queries:
-            return []
-        # Buscar películas que contengan al menos uno de los géneros seleccionados
-        query = {'$or': genre_queries}
-        movies = list(mongo_manager.db.movies.find(query).limit(limit * 5))  # Obtener más para filtrar
+        if genre_index.ready:
+            # Candidatas (al menos uno de los géneros) desde el índice invertido, mejor valoradas primero
+            movie_ids, _ = genre_index.query(genres, match='any', limit=limit * 5)
+            movies = [{'movieId': movie_id} for movie_id in movie_ids]
+        else:
+            # Construir query para múltiples géneros
+            genre_queries = []
+            for genre in genres:
+                if genre.strip():
+                    genre_queries.append({'genres': {'$regex': genre.strip(), '$options': 'i'}})
+            if not genre_queries:
+                return []
+            # Buscar películas que contengan al menos uno de los géneros seleccionados
+            query = {'$or': genre_queries}
+            movies = list(mongo_manager.db.movies.find(query, {'movieId': 1}).limit(limit * 5))  # Obtener más para filtrar
         # Si el método es de similitud, aplicar KNN
         similarity_methods = ['cosine', 'pearson', 'euclidean', 'manhattan']
-        if method in similarity_methods and len(movies) > 1:
-            # Calcular la similitud promedio de cada película respecto a las demás
+        if method in similarity_methods and len(movies) > 1 and simple_recommendation_engine.is_loaded:
+            # Similitud media de cada película respecto a las demás: submatriz de similitudes
+            # de los candidatos en un solo producto y una reducción por filas (sin la diagonal)
             movie_ids = [m['movieId'] for m in movies]
-            sim_scores = {}
-            for i, movie in enumerate(movies):
-                sims = []
-                for j, other in enumerate(movies):
-                    if i != j:
-                        sim = simple_recommendation_engine.get_movie_similarity(movie['movieId'], other['movieId'], method)
-                        sims.append(sim)
-                sim_scores[movie['movieId']] = float(np.mean(sims)) if sims else 0.0
-            # Enriquecer películas con información de rating y similitud
-            enriched_movies = []
-            for movie in movies:
-                movie_id = movie['movieId']
-                rating_pipeline = [
-                    {'$match': {'movieId': movie_id}},
-                    {'$group': {
-                        '_id': None,
-                        'avg_rating': {'$avg': '$rating'},
-                        'total_ratings': {'$sum': 1},
-                        'min_rating': {'$min': '$rating'},
-                        'max_rating': {'$max': '$rating'}
-                    }}
-                ]
-                rating_stats = list(mongo_manager.db.ratings.aggregate(rating_pipeline))
-                enriched_movie = {
-                    'movieId': movie['movieId'],
-                    'title': movie['title'],
-                    'genres': movie.get('genres', ''),
-                    'year': movie.get('year'),
-                    '_id': str(movie['_id']),
-                    'avg_rating': float(rating_stats[0]['avg_rating']) if rating_stats else 0,
-                    'total_ratings': rating_stats[0]['total_ratings'] if rating_stats else 0,
-                    'min_rating': float(rating_stats[0]['min_rating']) if rating_stats else 0,
-                    'max_rating': float(rating_stats[0]['max_rating']) if rating_stats else 0,
-                    'similarity_score': sim_scores.get(movie_id, 0.0),
-                    'rating_count': rating_stats[0]['total_ratings'] if rating_stats else 0
-                }
-                enriched_movies.append(enriched_movie)
+            similarity = simple_recommendation_engine.get_similarity_matrix(movie_ids, method)
+            mean_similarity = (similarity.sum(axis=1) - np.diag(similarity)) / (len(movie_ids) - 1)
+            sim_scores = dict(zip(movie_ids, mean_similarity.tolist()))
+            # Enriquecer películas con información de rating y similitud (tarjetas en lote)
+            cards = _get_movie_cards(movie_ids)
+            enriched_movies = [
+                {**cards[movie['movieId']], 'similarity_score': sim_scores.get(movie['movieId'], 0.0)}
+                for movie in movies if movie['movieId'] in cards
+            ]
             # Ordenar por similitud y rating
             enriched_movies.sort(key=lambda x: (x['similarity_score'], x['avg_rating']), reverse=True)
             return enriched_movies[:limit]
         else:
             # --- Modo clásico: similitud de géneros ---
+            cards = _get_movie_cards([movie['movieId'] for movie in movies])
             enriched_movies = []
             for movie in movies:
-                movie_id = movie['movieId']
-                rating_pipeline = [
-                    {'$match': {'movieId': movie_id}},
-                    {'$group': {
-                        '_id': None,
-                        'avg_rating': {'$avg': '$rating'},
-                        'total_ratings': {'$sum': 1},
-                        'min_rating': {'$min': '$rating'},
-                        'max_rating': {'$max': '$rating'}
-                    }}
-                ]
-                rating_stats = list(mongo_manager.db.ratings.aggregate(rating_pipeline))
-                movie_genres = movie.get('genres', '').split('|')
+                card = cards.get(movie['movieId'])
+                if not card:
+                    continue
+                movie_genres = card['genres'].split('|')
                 shared_genres = set(movie_genres) & set(genres)
                 genre_similarity = len(shared_genres) / max(len(movie_genres), len(genres)) if movie_genres else 0
-                enriched_movie = {
-                    'movieId': movie['movieId'],
-                    'title': movie['title'],
-                    'genres': movie.get('genres', ''),
-                    'year': movie.get('year'),
-                    '_id': str(movie['_id']),
-                    'avg_rating': float(rating_stats[0]['avg_rating']) if rating_stats else 0,
-                    'total_ratings': rating_stats[0]['total_ratings'] if rating_stats else 0,
-                    'min_rating': float(rating_stats[0]['min_rating']) if rating_stats else 0,
-                    'max_rating': float(rating_stats[0]['max_rating']) if rating_stats else 0,
-                    'similarity_score': genre_similarity,
-                    'rating_count': rating_stats[0]['total_ratings'] if rating_stats else 0
-                }
-                enriched_movies.append(enriched_movie)
+                enriched_movies.append({**card, 'similarity_score': genre_similarity})
             enriched_movies.sort(key=lambda x: (x['similarity_score'], x['avg_rating']), reverse=True)
             return enriched_movies[:limit]
     except Exception as e:
         logger.error(f"❌ Error obteniendo recomendaciones multi-género: {e}")
         return []
 
+@app.route('/api/trending')
+def get_trending():
+    """Películas en tendencia (ratings recientes con decaimiento exponencial)
+    
+    Parámetros: window (24h, 7d, 30d), genre, limit, offset/cursor.
+    """
+    try:
+        if not trending.loaded:
+            return _engine_not_ready_response()
+        
+        window = request.args.get('window', '7d')
+        if window not in Config.TRENDING_WINDOWS:
+            return jsonify({
+                'error': f'Ventana no válida. Ventanas disponibles: {list(Config.TRENDING_WINDOWS)}'
+            }), 400
+        genre = request.args.get('genre')
+        limit, offset = _get_pagination(10)
+        
+        ranking = trending.top(window=window, limit=limit, offset=offset, genre=genre)
+        cards = _get_movie_cards([entry['movieId'] for entry in ranking])
+        movies = [
+            {**cards[entry['movieId']], **entry}
+            for entry in ranking if entry['movieId'] in cards
+        ]
+        
+        return jsonify({
+            'window': window,
+            'genre': genre,
+            'movies': movies,
+            'count': len(movies),
+            'offset': offset,
+            'next_cursor': str(offset + limit) if len(ranking) == limit else None
+        })
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo tendencias: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/movies/top')
+def get_top_movies():
+    """Ranking de películas mejor valoradas (rankings en memoria compartidos)
+    
+    Parámetros: formula (average, bayesian, count), genre, decade (p. ej. 1990),
+    min_ratings, limit, offset/cursor.
+    """
+    try:
+        formula = request.args.get('formula', 'average')
+        if formula not in leaderboards.FORMULAS:
+            return jsonify({'error': f'Fórmula no válida. Fórmulas disponibles: {list(leaderboards.FORMULAS)}'}), 400
+        genre = request.args.get('genre')
+        decade = request.args.get('decade')
+        if decade is not None:
+            if not decade.isdigit() or int(decade) % 10:
+                return jsonify({'error': 'La década debe ser un año terminado en 0 (p. ej. 1990)'}), 400
+            decade = int(decade)
+        min_ratings = max(int(request.args.get('min_ratings', 10)), 1)
+        limit, offset = _get_pagination(10, bounded=False)
+        
+        ranking = leaderboards.top(limit=limit, offset=offset, min_ratings=min_ratings, formula=formula,
+                                   genre=genre, decade=decade)
+        cards = _get_movie_cards([entry['movieId'] for entry in ranking])
+        movies = [
+            {**cards[entry['movieId']], **entry}
+            for entry in ranking if entry['movieId'] in cards
+        ]
+        
+        return jsonify({
+            'formula': formula,
+            'genre': genre,
+            'decade': decade,
+            'min_ratings': min_ratings,
+            'movies': movies,
+            'count': len(movies),
+            'offset': offset,
+            'next_cursor': str(offset + limit) if len(ranking) == limit else None
+        })
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo ranking de películas: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/stats')
 def get_stats():
     """Obtener estadísticas del sistema"""
@@ -1119,7 +1477,8 @@ def get_stats():
             'movies_loaded': len(simple_recommendation_engine.movies_data) if simple_recommendation_engine.movies_data is not None else 0,
             'ratings_loaded': len(simple_recommendation_engine.ratings_data) if simple_recommendation_engine.ratings_data is not None else 0,
             'matrix_shape': simple_recommendation_engine.user_movie_matrix.shape if simple_recommendation_engine.user_movie_matrix is not None else None,
-            'available_methods': simple_recommendation_engine.get_available_methods()
+            'available_methods': simple_recommendation_engine.get_available_methods(),
+            'snapshot': simple_recommendation_engine.get_snapshot_info()
         }
         
         return jsonify({
@@ -1133,6 +1492,19 @@ def get_stats():
             },
             'cache': cache_stats,
             'engine': engine_info,
+            'ingestion': {
+                'buffer': rating_buffer.get_stats(),
+                'movie_stats': movie_stats.get_stats(),
+                'leaderboards': leaderboards.get_stats(),
+                'trending': trending.get_stats(),
+                'cooccurrence': cooccurrence.get_stats(),
+                'genre_index': genre_index.get_stats(),
+                'title_search': title_search.get_stats(),
+                'content_model': content_model.get_stats(),
+                'user_topn': user_topn.get_stats(),
+                'user_neighbors': user_neighbors.get_stats(),
+                'als': als_model.get_stats()
+            },
             'system': {
                 'initialized': is_initialized,
                 'uptime': time.time() - startup_time if startup_time else 0
@@ -1144,19 +1516,81 @@ def get_stats():
         logger.error(f"❌ Error obteniendo estadísticas: {e}\n{traceback.format_exc()}")
         return jsonify({'error': f'{e}', 'traceback': traceback.format_exc()}), 500
 
+@app.route('/api/metrics')
+def get_metrics():
+    """Métricas del cache por namespace (JSON o formato Prometheus con ?format=prometheus)"""
+    try:
+        if request.args.get('format') == 'prometheus':
+            return Response(redis_cache.metrics.to_prometheus(), mimetype='text/plain; version=0.0.4')
+        
+        return jsonify({
+            'cache': redis_cache.metrics.get_stats(),
+            'circuit_breaker': redis_cache.breaker.get_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo métricas: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/engine/rebuild', methods=['POST'])
+def rebuild_engine():
+    """Reconstruir el motor en segundo plano y publicar la nueva instantánea sin cortar el servicio"""
+    try:
+        if not is_initialized:
+            return _engine_not_ready_response()
+        
+        def on_done(success):
+            if success:
+                cache_warmer.start(trigger='rebuild')
+        
+        if not simple_recommendation_engine.rebuild_in_background(on_done=on_done):
+            return jsonify({
+                'status': 'in_progress',
+                'message': 'Ya hay una reconstrucción en curso',
+                'engine': simple_recommendation_engine.get_load_progress()
+            }), 409
+        
+        return jsonify({
+            'status': 'rebuilding',
+            'message': 'Reconstrucción en curso, la instantánea actual sigue sirviendo peticiones',
+            'snapshot': simple_recommendation_engine.get_snapshot_info(),
+            'engine': simple_recommendation_engine.get_load_progress()
+        }), 202
+    except Exception as e:
+        logger.error(f"❌ Error lanzando reconstrucción del motor: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/cache/clear')
 def clear_cache():
     """Limpiar cache"""
     try:
         redis_cache.clear_pattern('*')
+        cache_warmer.start(trigger='invalidation')
         return jsonify({
             'status': 'success',
-            'message': 'Cache limpiado correctamente'
+            'message': 'Cache limpiado correctamente',
+            'warmup': cache_warmer.get_progress()
         })
     except Exception as e:
         logger.error(f"❌ Error limpiando cache: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Calentamiento del cache con las claves más accedidas (tras arrancar y tras invalidar)
+cache_warmer.register('rec', _warm_recommendations)
+# Con los índices en memoria listos, /api/genres y /api/search ya no leen estos caches
+cache_warmer.register('genre', _build_genre_ranking,
+                      needed=lambda: not (genre_index.ready and simple_recommendation_engine.is_loaded))
+cache_warmer.register('search', _build_search_results, needed=lambda: not title_search.ready)
+
+# Escritura en lote de ratings y actualización incremental del estado derivado
+rating_buffer.subscribe(_on_ratings_flushed)
+rating_buffer.start()
+atexit.register(rating_buffer.flush)
+
+# Cargar el motor en segundo plano al importar el módulo (sin bloquear la importación)
+if Config.ENGINE_AUTOLOAD:
+    start_engine_loading()
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint no encontrado'}), 404
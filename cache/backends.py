@@ -0,0 +1,413 @@
+import fnmatch
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import logging
+
+import redis
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend:
+    """Interfaz común de los backends de cache
+
+    Todos los backends guardan bytes ya serializados y comparten la misma semántica:
+    TTL por clave, lecturas/escrituras en lote, listas ordenadas leídas por rangos e
+    invalidación por patrón glob (mismo formato que SCAN de Redis).
+    """
+
+    name = 'base'
+
+    @property
+    def connected(self):
+        return True
+
+    def connect(self):
+        """Preparar el backend; devuelve True si está disponible"""
+        return True
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        raise NotImplementedError
+
+    def msetex(self, items, ttl):
+        for key, value in items.items():
+            self.setex(key, ttl, value)
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def delete_pattern(self, pattern):
+        raise NotImplementedError
+
+    def set_ranked(self, key, members, ttl):
+        """Guardar una lista ordenada (members ya en orden de ranking)"""
+        raise NotImplementedError
+
+    def get_ranked(self, key, start, stop):
+        """Leer members[start:stop + 1]; devuelve (members, total, ttl_restante)"""
+        raise NotImplementedError
+
+    def info(self):
+        return {'backend': self.name}
+
+    def close(self):
+        pass
+
+class RedisBackend(CacheBackend):
+    """Backend Redis con pool de conexiones y timeouts acotados"""
+
+    name = 'redis'
+
+    def __init__(self, url):
+        self.url = url
+        self.pool = None
+        self.client = None
+
+    @property
+    def connected(self):
+        return self.client is not None
+
+    def connect(self):
+        if self.pool is None:
+            self.pool = redis.ConnectionPool.from_url(
+                self.url,
+                max_connections=Config.REDIS_MAX_CONNECTIONS,
+                socket_connect_timeout=Config.REDIS_CONNECT_TIMEOUT,
+                socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+                health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL
+            )
+        client = redis.Redis(connection_pool=self.pool)
+        try:
+            client.ping()
+        except Exception:
+            self.client = None
+            raise
+        self.client = client
+        return True
+
+    def ping(self):
+        return self.client.ping()
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def mget(self, keys):
+        return self.client.mget(keys)
+
+    def setex(self, key, ttl, value):
+        self.client.setex(key, ttl, value)
+
+    def msetex(self, items, ttl):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.setex(key, ttl, value)
+        pipe.execute()
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def delete_pattern(self, pattern):
+        # SCAN incremental para no bloquear Redis con KEYS
+        batch = []
+        for key in self.client.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+    def set_ranked(self, key, members, ttl):
+        # Sorted set con score = posición en el ranking
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.zadd(key, {member: rank for rank, member in enumerate(members)})
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    def get_ranked(self, key, start, stop):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrange(key, start, stop)
+        pipe.zcard(key)
+        pipe.ttl(key)
+        members, total, remaining_ttl = pipe.execute()
+        return members, total, remaining_ttl
+
+    def info(self):
+        info = self.client.info()
+        return {
+            'backend': self.name,
+            'connected_clients': info.get('connected_clients', 0),
+            'used_memory_human': info.get('used_memory_human', '0B'),
+            'keyspace_hits': info.get('keyspace_hits', 0),
+            'keyspace_misses': info.get('keyspace_misses', 0),
+            'total_commands_processed': info.get('total_commands_processed', 0)
+        }
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.disconnect()
+
+class MemoryBackend(CacheBackend):
+    """Backend en memoria del proceso (LRU acotado) para CI y benchmarks sin Redis"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or Config.CACHE_MEMORY_MAX_ENTRIES
+        self._entries = OrderedDict()  # clave -> (valor, expira_en)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _read(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _write(self, key, value, ttl):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            value = self._read(key, time.monotonic())
+        return value if isinstance(value, bytes) else None
+
+    def mget(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            values = [self._read(key, now) for key in keys]
+        return [value if isinstance(value, bytes) else None for value in values]
+
+    def setex(self, key, ttl, value):
+        with self._lock:
+            self._write(key, value, ttl)
+
+    def msetex(self, items, ttl):
+        with self._lock:
+            for key, value in items.items():
+                self._write(key, value, ttl)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_pattern(self, pattern):
+        with self._lock:
+            for key in [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]:
+                del self._entries[key]
+
+    def set_ranked(self, key, members, ttl):
+        with self._lock:
+            self._write(key, tuple(members), ttl)
+
+    def get_ranked(self, key, start, stop):
+        now = time.monotonic()
+        with self._lock:
+            members = self._read(key, now)
+            if not isinstance(members, tuple):
+                return [], 0, -2
+            remaining_ttl = int(self._entries[key][1] - now)
+        return list(members[start:stop + 1]), len(members), remaining_ttl
+
+    def info(self):
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            'backend': self.name,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'evictions': self.evictions
+        }
+
+class SQLiteBackend(CacheBackend):
+    """Backend local en disco sobre SQLite (modo WAL), persistente entre reinicios"""
+
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    @property
+    def connected(self):
+        return self._conn is not None
+
+    def connect(self):
+        if self._conn is not None:
+            return True
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS ranked (key TEXT, rank INTEGER, member BLOB, PRIMARY KEY (key, rank))')
+        conn.execute('CREATE TABLE IF NOT EXISTS ranked_meta (key TEXT PRIMARY KEY, total INTEGER, expires_at REAL)')
+        self._conn = conn
+        return True
+
+    def ping(self):
+        with self._lock:
+            self._conn.execute('SELECT 1')
+        return True
+
+    def _purge_expired(self, now):
+        """Borrar entradas caducadas como mucho una vez por minuto"""
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        self._conn.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+        expired = [row[0] for row in self._conn.execute('SELECT key FROM ranked_meta WHERE expires_at <= ?', (now,))]
+        self._delete_ranked(expired)
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN/COMMIT explícitos con ROLLBACK si algo falla, para no dejar la conexión dentro de la transacción"""
+        self._conn.execute('BEGIN')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def _delete_ranked(self, keys):
+        for key in keys:
+            self._conn.execute('DELETE FROM ranked WHERE key = ?', (key,))
+            self._conn.execute('DELETE FROM ranked_meta WHERE key = ?', (key,))
+
+    def get(self, key):
+        return self.mget([key])[0]
+
+    def mget(self, keys):
+        keys = list(keys)
+        now = time.time()
+        with self._lock:
+            found = {}
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT key, value FROM entries WHERE key IN ({placeholders}) AND expires_at > ?',
+                    (*chunk, now)
+                )
+                found.update(rows)
+        return [found.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        self.msetex({key: value}, ttl)
+
+    def msetex(self, items, ttl):
+        now = time.time()
+        with self._lock, self._transaction():
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)',
+                [(key, value, now + ttl) for key, value in items.items()]
+            )
+            self._purge_expired(now)
+
+    def delete(self, *keys):
+        with self._lock, self._transaction():
+            self._conn.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key in keys])
+            self._delete_ranked(keys)
+
+    def delete_pattern(self, pattern):
+        # GLOB de SQLite usa la misma sintaxis que los patrones de Redis (*, ?, [...])
+        with self._lock, self._transaction():
+            self._conn.execute('DELETE FROM entries WHERE key GLOB ?', (pattern,))
+            keys = [row[0] for row in self._conn.execute('SELECT key FROM ranked_meta WHERE key GLOB ?', (pattern,))]
+            self._delete_ranked(keys)
+
+    def set_ranked(self, key, members, ttl):
+        now = time.time()
+        with self._lock, self._transaction():
+            self._delete_ranked([key])
+            self._conn.executemany(
+                'INSERT INTO ranked (key, rank, member) VALUES (?, ?, ?)',
+                [(key, rank, member) for rank, member in enumerate(members)]
+            )
+            self._conn.execute(
+                'INSERT INTO ranked_meta (key, total, expires_at) VALUES (?, ?, ?)',
+                (key, len(members), now + ttl)
+            )
+
+    def get_ranked(self, key, start, stop):
+        now = time.time()
+        with self._lock:
+            meta = self._conn.execute(
+                'SELECT total, expires_at FROM ranked_meta WHERE key = ? AND expires_at > ?', (key, now)
+            ).fetchone()
+            if not meta:
+                return [], 0, -2
+            rows = self._conn.execute(
+                'SELECT member FROM ranked WHERE key = ? AND rank BETWEEN ? AND ? ORDER BY rank',
+                (key, start, stop)
+            ).fetchall()
+        return [row[0] for row in rows], meta[0], int(meta[1] - now)
+
+    def info(self):
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            ranked = self._conn.execute('SELECT COUNT(*) FROM ranked_meta').fetchone()[0]
+        return {
+            'backend': self.name,
+            'path': self.path,
+            'entries': entries,
+            'ranked_lists': ranked,
+            'size_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def create_backend(url=None):
+    """Elegir el backend a partir del esquema de la URL (Config.REDIS_URL)
+
+    - redis://, rediss://, unix://  -> Redis
+    - memory://                      -> memoria del proceso
+    - sqlite:///ruta/cache.db        -> SQLite local (ruta relativa; sqlite:////ruta para absoluta)
+    """
+    url = url or Config.REDIS_URL
+    scheme = urlparse(url).scheme.lower()
+
+    if scheme in ('redis', 'rediss', 'unix'):
+        return RedisBackend(url)
+    if scheme == 'memory':
+        return MemoryBackend()
+    if scheme == 'sqlite':
+        path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else urlparse(url).path
+        return SQLiteBackend(path or os.path.join(Config.MODEL_CACHE_DIR, 'cache.db'))
+    raise ValueError(f"Esquema de cache no soportado: {scheme}")
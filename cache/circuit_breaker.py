@@ -0,0 +1,80 @@
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """Circuit breaker para dependencias opcionales (Redis)
+    
+    Tras `failure_threshold` fallos consecutivos el circuito se abre y las llamadas se
+    omiten durante `cooldown` segundos. Pasado ese tiempo se deja pasar una única llamada
+    de prueba (semiabierto): si funciona se cierra, si falla vuelve a abrirse.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold=3, cooldown=10.0, name='redis'):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.name = name
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self):
+        """Estado actual del circuito"""
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return self.HALF_OPEN
+        return self.OPEN
+    
+    def allow_request(self):
+        """Indicar si se puede intentar la llamada (camino rápido sin lock con el circuito cerrado)"""
+        if self.opened_at is None:
+            return True
+        
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+    
+    def record_success(self):
+        """Registrar una llamada correcta"""
+        if self.opened_at is None and self.failures == 0:
+            return
+        
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"✅ Circuito {self.name} cerrado de nuevo")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        """Registrar un fallo; abre el circuito al superar el umbral"""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    self.trips += 1
+                    logger.warning(f"⚠️ Circuito {self.name} abierto durante {self.cooldown}s tras {self.failures} fallos")
+                self.opened_at = time.monotonic()
+    
+    def get_stats(self):
+        """Estado del circuito para /api/health y /api/stats"""
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'trips': self.trips
+        }
@@ -0,0 +1,176 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (ms) de los buckets del histograma de latencia de Redis
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+class CacheMetrics:
+    """Métricas del cache agrupadas por namespace (prefijo de la clave: rec, popular, search, genre...)
+    
+    Cuenta hits, misses, respuestas stale, llamadas omitidas por el circuit breaker y errores,
+    bytes leídos/escritos, tiempo de (de)serialización y un histograma de latencia por round trip.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces = {}
+    
+    @staticmethod
+    def namespace_of(key):
+        """Namespace de una clave de cache"""
+        if isinstance(key, bytes):
+            key = key.decode(errors='ignore')
+        return str(key).split(':', 1)[0]
+    
+    def _get(self, namespace):
+        metrics = self._namespaces.get(namespace)
+        if metrics is None:
+            metrics = {
+                'hits': 0,
+                'misses': 0,
+                'stale': 0,
+                'skipped': 0,
+                'errors': 0,
+                'bytes_read': 0,
+                'bytes_written': 0,
+                'serialization_seconds': 0.0,
+                'serialization_ops': 0,
+                'round_trips': 0,
+                'latency_seconds': 0.0,
+                'latency_buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            }
+            self._namespaces[namespace] = metrics
+        return metrics
+    
+    def _add(self, namespace, field, value=1):
+        with self._lock:
+            self._get(namespace)[field] += value
+    
+    def record_hit(self, namespace, count=1):
+        self._add(namespace, 'hits', count)
+    
+    def record_miss(self, namespace, count=1):
+        self._add(namespace, 'misses', count)
+    
+    def record_stale(self, namespace, count=1):
+        self._add(namespace, 'stale', count)
+    
+    def record_skipped(self, namespace, count=1):
+        self._add(namespace, 'skipped', count)
+    
+    def record_error(self, namespace):
+        self._add(namespace, 'errors')
+    
+    def record_read(self, namespace, nbytes, serialization_seconds=0.0):
+        """Bytes leídos de Redis y tiempo de deserialización"""
+        with self._lock:
+            metrics = self._get(namespace)
+            metrics['bytes_read'] += nbytes
+            metrics['serialization_seconds'] += serialization_seconds
+            metrics['serialization_ops'] += 1
+    
+    def record_write(self, namespace, nbytes, serialization_seconds=0.0):
+        """Bytes escritos en Redis y tiempo de serialización"""
+        with self._lock:
+            metrics = self._get(namespace)
+            metrics['bytes_written'] += nbytes
+            metrics['serialization_seconds'] += serialization_seconds
+            metrics['serialization_ops'] += 1
+    
+    def record_latency(self, namespace, seconds):
+        """Registrar la duración de un round trip a Redis"""
+        elapsed_ms = seconds * 1000
+        bucket = len(LATENCY_BUCKETS_MS)
+        for i, upper in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= upper:
+                bucket = i
+                break
+        
+        with self._lock:
+            metrics = self._get(namespace)
+            metrics['round_trips'] += 1
+            metrics['latency_seconds'] += seconds
+            metrics['latency_buckets'][bucket] += 1
+    
+    @staticmethod
+    def _percentile_ms(buckets, fraction):
+        """Estimar un percentil (límite superior del bucket que lo contiene)"""
+        total = sum(buckets)
+        if not total:
+            return 0.0
+        threshold = total * fraction
+        cumulative = 0
+        for i, count in enumerate(buckets):
+            cumulative += count
+            if cumulative >= threshold:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else float(LATENCY_BUCKETS_MS[-1])
+        return float(LATENCY_BUCKETS_MS[-1])
+    
+    def get_stats(self):
+        """Resumen por namespace para /api/stats y /api/metrics"""
+        with self._lock:
+            namespaces = {name: {**metrics, 'latency_buckets': list(metrics['latency_buckets'])}
+                          for name, metrics in self._namespaces.items()}
+        
+        stats = {}
+        for name, metrics in sorted(namespaces.items()):
+            lookups = metrics['hits'] + metrics['misses']
+            buckets = metrics['latency_buckets']
+            stats[name] = {
+                'hits': metrics['hits'],
+                'misses': metrics['misses'],
+                'stale': metrics['stale'],
+                'skipped': metrics['skipped'],
+                'errors': metrics['errors'],
+                'hit_ratio': round(metrics['hits'] / lookups, 4) if lookups else 0.0,
+                'bytes_read': metrics['bytes_read'],
+                'bytes_written': metrics['bytes_written'],
+                'avg_serialization_ms': round(metrics['serialization_seconds'] * 1000 / metrics['serialization_ops'], 4)
+                    if metrics['serialization_ops'] else 0.0,
+                'round_trips': metrics['round_trips'],
+                'avg_latency_ms': round(metrics['latency_seconds'] * 1000 / metrics['round_trips'], 4)
+                    if metrics['round_trips'] else 0.0,
+                'p50_latency_ms': self._percentile_ms(buckets, 0.5),
+                'p95_latency_ms': self._percentile_ms(buckets, 0.95),
+                'p99_latency_ms': self._percentile_ms(buckets, 0.99),
+                'latency_histogram_ms': {
+                    **{f'le_{upper}': count for upper, count in zip(LATENCY_BUCKETS_MS, buckets)},
+                    'inf': buckets[-1]
+                }
+            }
+        return stats
+    
+    def to_prometheus(self, prefix='movie_cache'):
+        """Exportar las métricas en formato de texto de Prometheus"""
+        with self._lock:
+            namespaces = {name: {**metrics, 'latency_buckets': list(metrics['latency_buckets'])}
+                          for name, metrics in self._namespaces.items()}
+        
+        lines = []
+        counters = ['hits', 'misses', 'stale', 'skipped', 'errors', 'bytes_read', 'bytes_written']
+        for field in counters:
+            lines.append(f'# TYPE {prefix}_{field}_total counter')
+            for name, metrics in sorted(namespaces.items()):
+                lines.append(f'{prefix}_{field}_total{{namespace="{name}"}} {metrics[field]}')
+        
+        lines.append(f'# TYPE {prefix}_serialization_seconds_total counter')
+        for name, metrics in sorted(namespaces.items()):
+            lines.append(f'{prefix}_serialization_seconds_total{{namespace="{name}"}} {metrics["serialization_seconds"]:.6f}')
+        
+        lines.append(f'# TYPE {prefix}_round_trip_seconds histogram')
+        for name, metrics in sorted(namespaces.items()):
+            cumulative = 0
+            for upper, count in zip(LATENCY_BUCKETS_MS, metrics['latency_buckets']):
+                cumulative += count
+                lines.append(f'{prefix}_round_trip_seconds_bucket{{namespace="{name}",le="{upper / 1000}"}} {cumulative}')
+            lines.append(f'{prefix}_round_trip_seconds_bucket{{namespace="{name}",le="+Inf"}} {metrics["round_trips"]}')
+            lines.append(f'{prefix}_round_trip_seconds_sum{{namespace="{name}"}} {metrics["latency_seconds"]:.6f}')
+            lines.append(f'{prefix}_round_trip_seconds_count{{namespace="{name}"}} {metrics["round_trips"]}')
+        return '\n'.join(lines) + '\n'
+    
+    def reset(self):
+        """Reiniciar todas las métricas"""
+        with self._lock:
+            self._namespaces = {}
@@ -1,101 +1,309 @@
-import redis
 import json
 import pickle
 import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
 from config import Config
+from cache.backends import create_backend
+from cache.circuit_breaker import CircuitBreaker
+from cache.metrics import CacheMetrics
 import logging
 
 logger = logging.getLogger(__name__)
 
 class RedisCache:
-    def __init__(self):
-        self.redis_client = None
+    """Cache de la aplicación
+    
+    El almacenamiento lo pone un backend intercambiable elegido por el esquema de
+    Config.REDIS_URL (Redis, memoria del proceso o SQLite local, ver cache/backends.py);
+    TTL, lotes, listas ordenadas, invalidación, métricas y circuit breaker son comunes.
+    """
+    
+    def __init__(self, url=None):
+        self.backend = create_backend(url)
+        self.breaker = CircuitBreaker(
+            failure_threshold=Config.REDIS_FAILURE_THRESHOLD,
+            cooldown=Config.REDIS_COOLDOWN,
+            name=self.backend.name
+        )
+        self._reconnect_thread = None
+        self._reconnect_lock = threading.Lock()
+        self.metrics = CacheMetrics()
         self.connect()
     
-    def connect(self):
-        """Conectar a Redis"""
+    def connect(self, retrying=False):
+        """Conectar el backend de cache (para Redis: pool con timeouts acotados)"""
         try:
-            self.redis_client = redis.from_url(Config.REDIS_URL)
-            # Test connection
-            self.redis_client.ping()
-            logger.info("✅ Conexión a Redis establecida")
+            self.backend.connect()
+            self.breaker.record_success()
+            logger.info(f"✅ Conexión a cache ({self.backend.name}) establecida")
+            return True
         except Exception as e:
-            logger.error(f"❌ Error conectando a Redis: {e}")
-            self.redis_client = None
+            if retrying:
+                logger.debug(f"El cache ({self.backend.name}) sigue sin responder: {e}")
+            else:
+                logger.error(f"❌ Error conectando a cache ({self.backend.name}): {e}")
+            self._start_reconnect_loop()
+            return False
+    
+    def _start_reconnect_loop(self):
+        """Arrancar (una sola vez) el hilo que reconecta el backend en segundo plano"""
+        with self._reconnect_lock:
+            if self._reconnect_thread and self._reconnect_thread.is_alive():
+                return
+            self._reconnect_thread = threading.Thread(
+                target=self._reconnect_loop, name='cache-reconnect', daemon=True
+            )
+            self._reconnect_thread.start()
+    
+    def _reconnect_loop(self):
+        """Reintentar la conexión mientras el backend no esté disponible o el circuito siga abierto"""
+        while True:
+            time.sleep(Config.REDIS_RECONNECT_INTERVAL)
+            if not self.backend.connected:
+                if self.connect(retrying=True):
+                    return
+            elif self.breaker.state != CircuitBreaker.CLOSED:
+                try:
+                    self.backend.ping()
+                    self.breaker.record_success()
+                    return
+                except Exception:
+                    pass
+            else:
+                return
+    
+    def _is_available(self):
+        """Backend conectado y circuito cerrado (o con una llamada de prueba permitida)"""
+        return self.backend.connected and self.breaker.allow_request()
+    
+    def _record_failure(self, action, error):
+        """Registrar un fallo del backend y abrir el circuito si se repite"""
+        logger.error(f"❌ Error {action}: {error}")
+        self.breaker.record_failure()
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            self._start_reconnect_loop()
     
     def _generate_key(self, prefix, *args):
-        """Generar clave única para cache"""
-        key_parts = [prefix] + [str(arg) for arg in args]
-        key_string = ":".join(key_parts)
-        return hashlib.md5(key_string.encode()).hexdigest()
+        """Generar clave única para cache (el prefijo queda legible para poder invalidar por patrón)"""
+        key_string = ":".join(str(arg) for arg in args)
+        return f"{prefix}:{hashlib.md5(key_string.encode()).hexdigest()}"
+    
+    def _serialize(self, namespace, data):
+        """Serializar un valor midiendo tiempo y tamaño"""
+        start = time.perf_counter()
+        if isinstance(data, (dict, list)):
+            serialized_data = json.dumps(data, default=str).encode()
+        else:
+            serialized_data = pickle.dumps(data)
+        self.metrics.record_write(namespace, len(serialized_data), time.perf_counter() - start)
+        return serialized_data
+    
+    def _deserialize(self, namespace, data, as_json=True):
+        """Deserializar un valor midiendo tiempo y tamaño"""
+        start = time.perf_counter()
+        value = json.loads(data) if as_json else pickle.loads(data)
+        self.metrics.record_read(namespace, len(data), time.perf_counter() - start)
+        return value
+    
+    def _execute(self, namespace, operation):
+        """Ejecutar un round trip al backend registrando su latencia"""
+        start = time.perf_counter()
+        result = operation()
+        self.metrics.record_latency(namespace, time.perf_counter() - start)
+        self.breaker.record_success()
+        return result
     
     def set_cache(self, key, data, ttl=None):
         """Guardar datos en cache"""
-        if not self.redis_client:
+        namespace = self.metrics.namespace_of(key)
+        if not self._is_available():
+            self.metrics.record_skipped(namespace)
             return False
         
         try:
-            if isinstance(data, (dict, list)):
-                serialized_data = json.dumps(data, default=str)
-            else:
-                serialized_data = pickle.dumps(data)
-            
+            serialized_data = self._serialize(namespace, data)
             ttl = ttl or Config.CACHE_TTL
-            self.redis_client.setex(key, ttl, serialized_data)
+            self._execute(namespace, lambda: self.backend.setex(key, ttl, serialized_data))
             return True
         except Exception as e:
-            logger.error(f"❌ Error guardando en cache: {e}")
+            self.metrics.record_error(namespace)
+            self._record_failure("guardando en cache", e)
             return False
     
     def get_cache(self, key, as_json=True):
         """Obtener datos del cache"""
-        if not self.redis_client:
+        namespace = self.metrics.namespace_of(key)
+        if not self._is_available():
+            self.metrics.record_skipped(namespace)
             return None
         
         try:
-            data = self.redis_client.get(key)
+            data = self._execute(namespace, lambda: self.backend.get(key))
             if data:
-                if as_json:
-                    return json.loads(data)
+                self.metrics.record_hit(namespace)
+                return self._deserialize(namespace, data, as_json)
+            self.metrics.record_miss(namespace)
+            return None
+        except Exception as e:
+            self.metrics.record_error(namespace)
+            self._record_failure("obteniendo de cache", e)
+            return None
+    
+    def mget_cache(self, keys, as_json=True):
+        """Obtener varias claves en un solo round trip (MGET)
+        
+        Devuelve (hits, misses): hits es {clave: datos} y misses la lista de claves sin valor.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}, []
+        namespace = self.metrics.namespace_of(keys[0])
+        if not self._is_available():
+            self.metrics.record_skipped(namespace, len(keys))
+            return {}, keys
+        
+        try:
+            values = self._execute(namespace, lambda: self.backend.mget(keys))
+            hits, misses = {}, []
+            for key, data in zip(keys, values):
+                if data:
+                    hits[key] = self._deserialize(namespace, data, as_json)
                 else:
-                    return pickle.loads(data)
+                    misses.append(key)
+            self.metrics.record_hit(namespace, len(hits))
+            self.metrics.record_miss(namespace, len(misses))
+            return hits, misses
+        except Exception as e:
+            self.metrics.record_error(namespace)
+            self._record_failure("obteniendo lote de cache", e)
+            return {}, keys
+    
+    def mset_cache(self, items, ttl=None):
+        """Guardar varias claves con SETEX en un único pipeline"""
+        if not items:
+            return False
+        namespace = self.metrics.namespace_of(next(iter(items)))
+        if not self._is_available():
+            self.metrics.record_skipped(namespace, len(items))
+            return False
+        
+        try:
+            ttl = ttl or Config.CACHE_TTL
+            serialized = {key: self._serialize(namespace, data) for key, data in items.items()}
+            self._execute(namespace, lambda: self.backend.msetex(serialized, ttl))
+            return True
+        except Exception as e:
+            self.metrics.record_error(namespace)
+            self._record_failure("guardando lote en cache", e)
+            return False
+    
+    def set_ranked_list(self, key, items, ttl=None):
+        """Guardar una lista ordenada completa como sorted set (score = posición en el ranking)
+        
+        La clave vive CACHE_STALE_GRACE segundos más que su TTL; durante ese margen se sigue
+        sirviendo pero se contabiliza como respuesta stale.
+        """
+        namespace = self.metrics.namespace_of(key)
+        if not items:
+            return False
+        if not self._is_available():
+            self.metrics.record_skipped(namespace)
+            return False
+        
+        try:
+            items = items[:Config.MAX_RECOMMENDATIONS]
+            members = [self._serialize(namespace, item) for item in items]
+            
+            ttl = (ttl or Config.CACHE_TTL) + Config.CACHE_STALE_GRACE
+            self._execute(namespace, lambda: self.backend.set_ranked(key, members, ttl))
+            return True
+        except Exception as e:
+            self.metrics.record_error(namespace)
+            self._record_failure("guardando lista ordenada en cache", e)
+            return False
+    
+    def get_ranked_slice(self, key, offset=0, limit=10):
+        """Leer una página [offset, offset + limit) de una lista ordenada cacheada
+        
+        Devuelve {'items': [...], 'total': n, 'stale': bool} o None si la lista no está en cache.
+        """
+        namespace = self.metrics.namespace_of(key)
+        if not self._is_available():
+            self.metrics.record_skipped(namespace)
             return None
+        
+        try:
+            offset = max(int(offset), 0)
+            limit = max(int(limit), 0)
+            members, total, remaining_ttl = self._execute(
+                namespace, lambda: self.backend.get_ranked(key, offset, offset + limit - 1)
+            )
+            if not total:
+                self.metrics.record_miss(namespace)
+                return None
+            
+            stale = 0 <= remaining_ttl <= Config.CACHE_STALE_GRACE
+            self.metrics.record_hit(namespace)
+            if stale:
+                self.metrics.record_stale(namespace)
+            return {
+                'items': [self._deserialize(namespace, member) for member in members] if limit else [],
+                'total': total,
+                'stale': stale
+            }
         except Exception as e:
-            logger.error(f"❌ Error obteniendo de cache: {e}")
+            self.metrics.record_error(namespace)
+            self._record_failure("leyendo lista ordenada de cache", e)
             return None
     
     def delete_cache(self, key):
         """Eliminar clave del cache"""
-        if self.redis_client:
-            self.redis_client.delete(key)
+        if not self._is_available():
+            return
+        
+        try:
+            self._execute(self.metrics.namespace_of(key), lambda: self.backend.delete(key))
+        except Exception as e:
+            self._record_failure("eliminando de cache", e)
     
     def clear_pattern(self, pattern):
-        """Eliminar todas las claves que coincidan con un patrón"""
-        if self.redis_client:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                self.redis_client.delete(*keys)
+        """Eliminar todas las claves que coincidan con un patrón glob"""
+        if not self._is_available():
+            return
+        
+        try:
+            self._execute(self.metrics.namespace_of(pattern), lambda: self.backend.delete_pattern(pattern))
+        except Exception as e:
+            self._record_failure("limpiando cache", e)
     
     # Métodos específicos para recomendaciones
+    # Las listas se guardan completas (hasta MAX_RECOMMENDATIONS) y se sirven por rangos,
+    # así cualquier combinación de limit/offset reutiliza la misma entrada.
     def cache_movie_recommendations(self, movie_id, method, recommendations):
-        """Cache de recomendaciones de películas"""
-        key = self._generate_key("rec", movie_id, method)
-        return self.set_cache(key, recommendations, ttl=1800)  # 30 minutos
+        """Cache de recomendaciones de películas (ranking completo)"""
+        key = self._generate_key(f"rec:{movie_id}", method)
+        return self.set_ranked_list(key, recommendations, ttl=1800)  # 30 minutos
     
-    def get_cached_recommendations(self, movie_id, method):
-        """Obtener recomendaciones cacheadas"""
-        key = self._generate_key("rec", movie_id, method)
-        return self.get_cache(key)
+    def get_cached_recommendations(self, movie_id, method, offset=0, limit=None):
+        """Obtener una página de recomendaciones cacheadas"""
+        key = self._generate_key(f"rec:{movie_id}", method)
+        return self.get_ranked_slice(key, offset, limit or Config.MAX_RECOMMENDATIONS)
     
-    def cache_popular_movies(self, movies):
-        """Cache de películas populares"""
-        key = "popular_movies"
-        return self.set_cache(key, movies, ttl=3600)  # 1 hora
+    def cache_popular_movies(self, movies, min_ratings=10, version=0):
+        """Cache de películas populares (ranking completo)
+        
+        `version` (la de las estadísticas por película) forma parte de la clave: al cambiar,
+        el ranking anterior deja de leerse sin borrarlo (caduca con su TTL).
+        """
+        key = self._generate_key("popular", min_ratings, version)
+        return self.set_ranked_list(key, movies, ttl=3600)  # 1 hora
     
-    def get_cached_popular_movies(self):
-        """Obtener películas populares cacheadas"""
-        return self.get_cache("popular_movies")
+    def get_cached_popular_movies(self, min_ratings=10, offset=0, limit=None, version=0):
+        """Obtener una página de películas populares cacheadas"""
+        key = self._generate_key("popular", min_ratings, version)
+        return self.get_ranked_slice(key, offset, limit or Config.MAX_RECOMMENDATIONS)
     
     def cache_search_results(self, query, results):
         """Cache de resultados de búsqueda"""
@@ -108,14 +316,39 @@ class RedisCache:
         return self.get_cache(key)
     
     def cache_genre_movies(self, genre, movies):
-        """Cache de películas por género"""
-        key = self._generate_key("genre", genre)
-        return self.set_cache(key, movies, ttl=1800)  # 30 minutos
+        """Cache de películas por género (ranking completo)"""
+        key = self._generate_key("genre", genre.lower())
+        return self.set_ranked_list(key, movies, ttl=1800)  # 30 minutos
     
-    def get_cached_genre_movies(self, genre):
-        """Obtener películas por género cacheadas"""
-        key = self._generate_key("genre", genre)
-        return self.get_cache(key)
+    def get_cached_genre_movies(self, genre, offset=0, limit=None):
+        """Obtener una página de películas por género cacheadas"""
+        key = self._generate_key("genre", genre.lower())
+        return self.get_ranked_slice(key, offset, limit or Config.MAX_RECOMMENDATIONS)
+    
+    def cache_movie_cards(self, cards):
+        """Cache de tarjetas de película (datos + estadísticas de rating) por movieId"""
+        items = {self._generate_key("card", card['movieId']): card for card in cards}
+        return self.mset_cache(items, ttl=3600)  # 1 hora
+    
+    def get_cached_movie_cards(self, movie_ids):
+        """Obtener tarjetas cacheadas en un round trip
+        
+        Devuelve ({movieId: tarjeta}, [movieIds sin cache]).
+        """
+        keys = {self._generate_key("card", movie_id): movie_id for movie_id in movie_ids}
+        hits, misses = self.mget_cache(keys)
+        return {keys[key]: card for key, card in hits.items()}, [keys[key] for key in misses]
+    
+    def invalidate_movie_cards(self, movie_ids):
+        """Invalidar las tarjetas de varias películas en una sola operación"""
+        if not movie_ids or not self._is_available():
+            return
+        
+        keys = [self._generate_key("card", movie_id) for movie_id in movie_ids]
+        try:
+            self._execute("card", lambda: self.backend.delete(*keys))
+        except Exception as e:
+            self._record_failure("invalidando tarjetas de cache", e)
     
     def invalidate_recommendations(self, movie_id=None):
         """Invalidar cache de recomendaciones"""
@@ -127,21 +360,29 @@ class RedisCache:
     
     def get_cache_stats(self):
         """Obtener estadísticas del cache"""
-        if not self.redis_client:
-            return {}
+        if not self._is_available():
+            return {
+                'connected': False,
+                'circuit_breaker': self.breaker.get_stats(),
+                'namespaces': self.metrics.get_stats()
+            }
         
         try:
-            info = self.redis_client.info()
+            info = self.backend.info()
+            self.breaker.record_success()
             return {
-                'connected_clients': info.get('connected_clients', 0),
-                'used_memory_human': info.get('used_memory_human', '0B'),
-                'keyspace_hits': info.get('keyspace_hits', 0),
-                'keyspace_misses': info.get('keyspace_misses', 0),
-                'total_commands_processed': info.get('total_commands_processed', 0)
+                'connected': True,
+                'circuit_breaker': self.breaker.get_stats(),
+                'namespaces': self.metrics.get_stats(),
+                **info
             }
         except Exception as e:
-            logger.error(f"❌ Error obteniendo stats de Redis: {e}")
-            return {}
+            self._record_failure("obteniendo stats del cache", e)
+            return {
+                'connected': False,
+                'circuit_breaker': self.breaker.get_stats(),
+                'namespaces': self.metrics.get_stats()
+            }
 
 # Instancia global
 redis_cache = RedisCache() 
\ No newline at end of file
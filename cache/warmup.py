@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class AccessLog:
+    """Registro compacto y rotativo de claves calientes
+
+    Guarda un contador por (tipo, clave) — p. ej. ('rec', '1:hybrid'), ('genre', 'action'),
+    ('search', 'star wars') — con decaimiento: cada `half_life` segundos los contadores se
+    dividen a la mitad, y si un tipo supera `max_keys` se descartan las claves más frías.
+    Se persiste en JSON para poder calentar el cache tras un despliegue.
+    """
+
+    def __init__(self, path=None, max_keys=None, half_life=None, save_interval=60):
+        self.path = path or os.path.join(Config.MODEL_CACHE_DIR, 'access_log.json')
+        self.max_keys = max_keys or Config.ACCESS_LOG_MAX_KEYS
+        self.half_life = half_life or Config.ACCESS_LOG_HALF_LIFE
+        self.save_interval = save_interval
+        self._counts = {}
+        self._last_decay = time.time()
+        self._last_save = time.time()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def record(self, kind, key):
+        """Registrar un acceso (O(1) amortizado)"""
+        now = time.time()
+        with self._lock:
+            counts = self._counts.setdefault(kind, {})
+            counts[key] = counts.get(key, 0.0) + 1.0
+            self._dirty = True
+
+            if now - self._last_decay >= self.half_life:
+                self._decay(now)
+                # _decay reemplaza los diccionarios: podar el vigente, no el anterior
+                counts = self._counts[kind]
+            if len(counts) > self.max_keys:
+                self._prune(counts)
+            should_save = now - self._last_save >= self.save_interval
+
+        if should_save:
+            self.save()
+
+    def _decay(self, now):
+        periods = int((now - self._last_decay) // self.half_life)
+        factor = 0.5 ** periods
+        for kind, counts in self._counts.items():
+            self._counts[kind] = {key: count * factor for key, count in counts.items() if count * factor >= 0.01}
+        self._last_decay += periods * self.half_life
+
+    def _prune(self, counts):
+        """Quedarse con la mitad más caliente de las claves de un tipo"""
+        keep = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.max_keys // 2]
+        counts.clear()
+        counts.update(keep)
+
+    def top(self, kind, k):
+        """Las k claves más accedidas de un tipo"""
+        with self._lock:
+            counts = dict(self._counts.get(kind, {}))
+        return [key for key, _ in sorted(counts.items(), key=lambda item: item[1], reverse=True)[:k]]
+
+    def kinds(self):
+        with self._lock:
+            return list(self._counts)
+
+    def save(self):
+        """Persistir el registro en disco (escritura atómica)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {'last_decay': self._last_decay, 'counts': self._counts}
+            data = json.dumps(payload)
+            self._dirty = False
+            self._last_save = time.time()
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"❌ Error guardando registro de accesos: {e}")
+
+    def load(self):
+        """Cargar el registro persistido, si existe"""
+        try:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path) as f:
+                payload = json.load(f)
+            with self._lock:
+                self._counts = payload.get('counts', {})
+                self._last_decay = payload.get('last_decay', time.time())
+            logger.info(f"✅ Registro de accesos cargado ({sum(len(c) for c in self._counts.values())} claves)")
+        except Exception as e:
+            logger.error(f"❌ Error cargando registro de accesos: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            return {kind: len(counts) for kind, counts in self._counts.items()}
+
+class CacheWarmer:
+    """Calentamiento del cache a partir del registro de accesos
+
+    Reproduce las top-K claves de cada tipo a través de los handlers registrados
+    (uno por tipo, que calculan y cachean el resultado) con concurrencia acotada.
+    """
+
+    def __init__(self, access_log, top_k=None, concurrency=None):
+        self.access_log = access_log
+        self.top_k = top_k or Config.WARMUP_TOP_K
+        self.concurrency = concurrency or Config.WARMUP_CONCURRENCY
+        self.handlers = {}
+        self._needed = {}
+        self._thread = None
+        self._lock = threading.Lock()
+        self.progress = {
+            'state': 'idle',
+            'trigger': None,
+            'total': 0,
+            'completed': 0,
+            'failed': 0,
+            'started_at': None,
+            'finished_at': None
+        }
+
+    def register(self, kind, handler, needed=None):
+        """Registrar el handler que recalcula y cachea una clave de un tipo
+
+        `needed` (opcional) indica en cada calentamiento si ese cache se sigue leyendo; si
+        devuelve False las claves de ese tipo no se reproducen.
+        """
+        self.handlers[kind] = handler
+        self._needed[kind] = needed
+
+    def start(self, trigger='startup'):
+        """Lanzar el calentamiento en segundo plano (no hace nada si ya hay uno en curso)"""
+        if not Config.WARMUP_ENABLED:
+            return False
+
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._run, args=(trigger,), name='cache-warmup', daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self, trigger):
+        tasks = [
+            (kind, key)
+            for kind in self.handlers
+            if self._needed[kind] is None or self._needed[kind]()
+            for key in self.access_log.top(kind, self.top_k)
+        ]
+        self.progress = {
+            'state': 'running',
+            'trigger': trigger,
+            'total': len(tasks),
+            'completed': 0,
+            'failed': 0,
+            'started_at': datetime.now().isoformat(),
+            'finished_at': None
+        }
+        logger.info(f"🔥 Calentando cache ({trigger}): {len(tasks)} claves")
+        start = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='warmup') as executor:
+            futures = {executor.submit(self.handlers[kind], key): (kind, key) for kind, key in tasks}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    self.progress['completed'] += 1
+                except Exception as e:
+                    kind, key = futures[future]
+                    logger.warning(f"⚠️ Error calentando {kind}:{key}: {e}")
+                    self.progress['failed'] += 1
+
+        self.progress['state'] = 'done'
+        self.progress['finished_at'] = datetime.now().isoformat()
+        logger.info(f"✅ Cache calentado en {time.time() - start:.2f}s "
+                    f"({self.progress['completed']}/{self.progress['total']})")
+
+    def get_progress(self):
+        """Progreso para /api/health"""
+        progress = dict(self.progress)
+        progress['percent'] = round(100 * (progress['completed'] + progress['failed']) / progress['total'], 1) \
+            if progress['total'] else (100.0 if progress['state'] == 'done' else 0.0)
+        return progress
+
+# Instancias globales
+access_log = AccessLog()
+cache_warmer = CacheWarmer(access_log)
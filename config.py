@@ -8,8 +8,16 @@ class Config:
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
     MONGO_DB = os.getenv('MONGO_DB', 'movie_recommendations')
     
-    # Redis
+    # Redis / cache (el esquema elige backend: redis://, memory:// o sqlite:///ruta/cache.db)
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_MEMORY_MAX_ENTRIES = int(os.getenv('CACHE_MEMORY_MAX_ENTRIES', '100000'))
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+    REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', '0.25'))  # segundos
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.1'))  # segundos
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', '30'))
+    REDIS_RECONNECT_INTERVAL = float(os.getenv('REDIS_RECONNECT_INTERVAL', '5'))
+    REDIS_FAILURE_THRESHOLD = int(os.getenv('REDIS_FAILURE_THRESHOLD', '3'))
+    REDIS_COOLDOWN = float(os.getenv('REDIS_COOLDOWN', '10'))  # segundos con el circuito abierto
     
     # Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
@@ -18,9 +26,70 @@ class Config:
     # Procesamiento
     BATCH_SIZE = int(os.getenv('BATCH_SIZE', '1000'))
     CACHE_TTL = int(os.getenv('CACHE_TTL', '3600'))  # 1 hora
+    CACHE_STALE_GRACE = int(os.getenv('CACHE_STALE_GRACE', '60'))  # segundos sirviendo rankings caducados
+    
+    # Calentamiento del cache
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'True').lower() == 'true'
+    WARMUP_TOP_K = int(os.getenv('WARMUP_TOP_K', '50'))  # claves por tipo
+    WARMUP_CONCURRENCY = int(os.getenv('WARMUP_CONCURRENCY', '4'))
+    ACCESS_LOG_MAX_KEYS = int(os.getenv('ACCESS_LOG_MAX_KEYS', '2000'))
+    ACCESS_LOG_HALF_LIFE = int(os.getenv('ACCESS_LOG_HALF_LIFE', '21600'))  # 6 horas
+    
+    # Ingesta de ratings (write-behind)
+    RATING_BUFFER_MAX_SIZE = int(os.getenv('RATING_BUFFER_MAX_SIZE', '500'))  # ratings antes de forzar escritura
+    RATING_BUFFER_FLUSH_INTERVAL = float(os.getenv('RATING_BUFFER_FLUSH_INTERVAL', '2'))  # segundos
+    RATINGS_MAX_BULK = int(os.getenv('RATINGS_MAX_BULK', '1000'))  # ratings por petición
+    RATINGS_MAX_CLOCK_SKEW = int(os.getenv('RATINGS_MAX_CLOCK_SKEW', '300'))  # segundos de margen para timestamps futuros
+    ENGINE_DELTA_COMPACT_SIZE = int(os.getenv('ENGINE_DELTA_COMPACT_SIZE', '1000'))  # cambios antes de compactar
+    ENGINE_DELTA_MAX_AGE = int(os.getenv('ENGINE_DELTA_MAX_AGE', '30'))  # segundos
     
     # Modelos
+    ENGINE_AUTOLOAD = os.getenv('ENGINE_AUTOLOAD', 'True').lower() == 'true'  # cargar el motor al importar app
     MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', './models')
+    LEADERBOARD_MAX_BOARDS = int(os.getenv('LEADERBOARD_MAX_BOARDS', '64'))  # rankings de popularidad en memoria
+    # Ventanas de tendencias ("24h,7d,30d") y vida media del decaimiento como fracción de la ventana
+    TRENDING_WINDOWS = {
+        window: int(window[:-1]) * (24 if window.endswith('d') else 1)
+        for window in os.getenv('TRENDING_WINDOWS', '24h,7d,30d').split(',')
+    }
+    TRENDING_HALF_LIFE_RATIO = float(os.getenv('TRENDING_HALF_LIFE_RATIO', '0.25'))
+    # Matriz de co-ocurrencia "gustaron juntas": pares con menos usuarios se descartan al construir
+    COOCCURRENCE_MIN_COUNT = int(os.getenv('COOCCURRENCE_MIN_COUNT', '2'))
+    COOCCURRENCE_BLOCK_SIZE = int(os.getenv('COOCCURRENCE_BLOCK_SIZE', '2000'))  # películas por bloque al construir
+    # Kernel top-k por bloques para construcciones offline (0 hilos = uno por núcleo)
+    TOPK_BLOCK_SIZE = int(os.getenv('TOPK_BLOCK_SIZE', '1000'))
+    TOPK_WORKERS = int(os.getenv('TOPK_WORKERS', '0'))
+    # Modelo de contenido TF-IDF (tags + géneros): vecinos precalculados por película
+    CONTENT_NEIGHBORS = int(os.getenv('CONTENT_NEIGHBORS', '50'))
+    CONTENT_BLOCK_SIZE = int(os.getenv('CONTENT_BLOCK_SIZE', '1000'))  # filas por bloque al construir
+    CONTENT_MIN_TAG_MOVIES = int(os.getenv('CONTENT_MIN_TAG_MOVIES', '2'))  # tags en menos películas se ignoran
+    SEARCH_FUZZY_THRESHOLD = float(os.getenv('SEARCH_FUZZY_THRESHOLD', '0.5'))  # fracción mínima de trigramas de la consulta
+    AUTOCOMPLETE_MAX_RESULTS = int(os.getenv('AUTOCOMPLETE_MAX_RESULTS', '20'))
+    ITEM_NEIGHBORS = int(os.getenv('ITEM_NEIGHBORS', '50'))  # vecinos por película para el recomendador item-based
+    USER_NEIGHBORS = int(os.getenv('USER_NEIGHBORS', '50'))  # vecinos por usuario en la tabla precalculada
+    # Top-N por usuario precalculado por el trabajo batch (scripts/build_user_topn.py); 0 procesos = uno por núcleo
+    USER_TOPN_SIZE = int(os.getenv('USER_TOPN_SIZE', '50'))
+    USER_TOPN_SHARD_SIZE = int(os.getenv('USER_TOPN_SHARD_SIZE', '1000'))  # usuarios por tarea del pool
+    USER_TOPN_WORKERS = int(os.getenv('USER_TOPN_WORKERS', '0'))
+    # Factorización ALS implícita (scripts/train_als.py): confianza = 1 + alpha · rating; 0 hilos = uno por núcleo
+    ALS_FACTORS = int(os.getenv('ALS_FACTORS', '64'))
+    ALS_REGULARIZATION = float(os.getenv('ALS_REGULARIZATION', '0.1'))
+    ALS_ALPHA = float(os.getenv('ALS_ALPHA', '10'))
+    ALS_ITERATIONS = int(os.getenv('ALS_ITERATIONS', '15'))
+    ALS_WORKERS = int(os.getenv('ALS_WORKERS', '0'))
+    ALS_BLOCK_SIZE = int(os.getenv('ALS_BLOCK_SIZE', '1000'))  # usuarios/películas por tarea del pool
+    # Paseo aleatorio con reinicio en el grafo usuario-película (método 'graph'); 0 = sin poda
+    GRAPH_RESTART = float(os.getenv('GRAPH_RESTART', '0.15'))
+    GRAPH_MAX_ITERATIONS = int(os.getenv('GRAPH_MAX_ITERATIONS', '20'))  # cota de latencia por petición
+    GRAPH_TOLERANCE = float(os.getenv('GRAPH_TOLERANCE', '1e-6'))  # cambio L1 para parar antes
+    GRAPH_PRUNE_TOP_K = int(os.getenv('GRAPH_PRUNE_TOP_K', '2000'))  # usuarios/películas que conserva cada paso
+    # Índice aproximado de vecinos (LSH) para generar candidatos; con menos películas/usuarios se busca de forma exacta
+    ANN_ENABLED = os.getenv('ANN_ENABLED', 'True').lower() == 'true'
+    ANN_MIN_SIZE = int(os.getenv('ANN_MIN_SIZE', '5000'))
+    ANN_TABLES = int(os.getenv('ANN_TABLES', '8'))
+    ANN_BITS = int(os.getenv('ANN_BITS', '12'))  # bits por tabla: más bits, cubos más pequeños
+    ANN_PROBES = int(os.getenv('ANN_PROBES', '4'))  # cubos vecinos visitados por tabla: más recall, más latencia
+    SIMILARITY_ROW_CACHE_SIZE = int(os.getenv('SIMILARITY_ROW_CACHE_SIZE', '1000'))  # filas película-película en memoria
     SVD_COMPONENTS = int(os.getenv('SVD_COMPONENTS', '50'))
     
     # API
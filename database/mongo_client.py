@@ -2,7 +2,7 @@ import asyncio
 import pandas as pd
 import polars as pl
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from pymongo.errors import DuplicateKeyError
 import os
 from config import Config
@@ -53,6 +53,7 @@ class MongoDBManager:
             self.db.ratings.create_index([("userId", 1), ("movieId", 1)])
             self.db.ratings.create_index([("movieId", 1), ("rating", -1)])
             self.db.ratings.create_index([("userId", 1), ("rating", -1)])
+            self.db.ratings.create_index([("timestamp", 1)])
             
             # Índices para tags
             self.db.tags.create_index([("movieId", 1)])
@@ -151,9 +152,9 @@ class MongoDBManager:
         cursor = self.async_db.ratings.find({'userId': user_id}).limit(limit)
         return await cursor.to_list(length=limit)
     
-    async def get_popular_movies(self, limit=50, min_ratings=10):
-        """Obtener películas populares"""
-        pipeline = [
+    def _popular_pipeline(self, limit, min_ratings):
+        """Pipeline de películas mejor valoradas con al menos `min_ratings` ratings"""
+        return [
             {
                 '$group': {
                     '_id': '$movieId',
@@ -173,10 +174,49 @@ class MongoDBManager:
                 '$limit': limit
             }
         ]
-        
-        cursor = self.async_db.ratings.aggregate(pipeline)
+    
+    async def get_popular_movies(self, limit=50, min_ratings=10):
+        """Obtener películas populares"""
+        cursor = self.async_db.ratings.aggregate(self._popular_pipeline(limit, min_ratings))
         return await cursor.to_list(length=limit)
     
+    def get_popular_movies_sync(self, limit=50, min_ratings=10):
+        """Obtener películas populares (conexión síncrona)"""
+        if self.db is None:
+            self.connect()
+        return list(self.db.ratings.aggregate(self._popular_pipeline(limit, min_ratings)))
+    
+    def get_existing_ratings(self, pairs):
+        """Ratings ya guardados para pares (userId, movieId): {(userId, movieId): rating}"""
+        if not pairs:
+            return {}
+        wanted = set(pairs)
+        query = {
+            'userId': {'$in': list({user_id for user_id, _ in wanted})},
+            'movieId': {'$in': list({movie_id for _, movie_id in wanted})}
+        }
+        existing = {}
+        for doc in self.db.ratings.find(query, {'userId': 1, 'movieId': 1, 'rating': 1}):
+            pair = (doc['userId'], doc['movieId'])
+            if pair in wanted:
+                existing[pair] = doc['rating']
+        return existing
+    
+    def write_ratings(self, new_ratings, updated_ratings):
+        """Persistir un lote de ratings: insert_many para los nuevos y upserts en bloque para los existentes"""
+        if new_ratings:
+            self.db.ratings.insert_many([dict(rating) for rating in new_ratings], ordered=False)
+        if updated_ratings:
+            operations = [
+                UpdateOne(
+                    {'userId': rating['userId'], 'movieId': rating['movieId']},
+                    {'$set': {'rating': rating['rating'], 'timestamp': rating['timestamp']}},
+                    upsert=True
+                )
+                for rating in updated_ratings
+            ]
+            self.db.ratings.bulk_write(operations, ordered=False)
+    
     def close(self):
         """Cerrar conexiones"""
         if self.client:
@@ -0,0 +1,128 @@
+import threading
+import time
+from datetime import datetime
+import logging
+
+from config import Config
+from database.mongo_client import mongo_manager
+
+logger = logging.getLogger(__name__)
+
+class RatingWriteBuffer:
+    """Buffer write-behind para la ingesta de ratings
+
+    Las peticiones solo encolan en memoria (la última escritura de un par usuario-película
+    gana) y un hilo de fondo persiste en MongoDB cuando el buffer alcanza `max_size` o
+    cada `flush_interval` segundos: una consulta para saber qué pares ya existían,
+    insert_many para los nuevos y upserts en bloque para los existentes.
+
+    Tras cada lote persistido se avisa a los suscriptores con los cambios
+    ({userId, movieId, rating, timestamp, previous}) para actualizar el estado derivado.
+    Los ratings aún no persistidos se pierden si el proceso muere sin llamar a flush().
+    """
+
+    def __init__(self, max_size=None, flush_interval=None):
+        self.max_size = max_size or Config.RATING_BUFFER_MAX_SIZE
+        self.flush_interval = flush_interval or Config.RATING_BUFFER_FLUSH_INTERVAL
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._subscribers = []
+        self.stats = {
+            'accepted': 0,
+            'flushed': 0,
+            'inserted': 0,
+            'updated': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'last_flush_at': None,
+            'last_flush_ms': None,
+            'last_error': None
+        }
+
+    def subscribe(self, callback):
+        """Registrar un callback(changes) que se ejecuta tras cada lote persistido"""
+        self._subscribers.append(callback)
+
+    def start(self):
+        """Arrancar el hilo de escritura (idempotente)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='rating-writer', daemon=True)
+        self._thread.start()
+
+    def add(self, ratings):
+        """Encolar ratings ya validados ({userId, movieId, rating, timestamp})"""
+        with self._lock:
+            for rating in ratings:
+                self._pending[(rating['userId'], rating['movieId'])] = rating
+            self.stats['accepted'] += len(ratings)
+            full = len(self._pending) >= self.max_size
+
+        if full:
+            self._wakeup.set()
+        return len(ratings)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Persistir todo lo pendiente; devuelve el número de ratings escritos"""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = {}
+            if not batch:
+                return 0
+
+            start = time.time()
+            try:
+                if mongo_manager.db is None:
+                    mongo_manager.connect()
+
+                existing = mongo_manager.get_existing_ratings(list(batch))
+                new_ratings = [rating for pair, rating in batch.items() if pair not in existing]
+                updated_ratings = [rating for pair, rating in batch.items() if pair in existing]
+                mongo_manager.write_ratings(new_ratings, updated_ratings)
+            except Exception as e:
+                # Devolver el lote al buffer sin pisar escrituras más recientes
+                with self._lock:
+                    for pair, rating in batch.items():
+                        self._pending.setdefault(pair, rating)
+                self.stats['failed_flushes'] += 1
+                self.stats['last_error'] = str(e)
+                logger.error(f"❌ Error persistiendo {len(batch)} ratings: {e}")
+                return 0
+
+            self.stats['flushes'] += 1
+            self.stats['flushed'] += len(batch)
+            self.stats['inserted'] += len(new_ratings)
+            self.stats['updated'] += len(updated_ratings)
+            self.stats['last_flush_at'] = datetime.now().isoformat()
+            self.stats['last_flush_ms'] = round((time.time() - start) * 1000, 2)
+            self.stats['last_error'] = None
+            logger.info(f"✅ {len(batch)} ratings persistidos ({len(new_ratings)} nuevos, "
+                        f"{len(updated_ratings)} actualizados) en {self.stats['last_flush_ms']}ms")
+
+            changes = [{**rating, 'previous': existing.get(pair)} for pair, rating in batch.items()]
+            for callback in self._subscribers:
+                try:
+                    callback(changes)
+                except Exception as e:
+                    logger.error(f"❌ Error aplicando ratings persistidos: {e}")
+            return len(batch)
+
+    def get_stats(self):
+        return {**self.stats, 'pending': self.pending_count()}
+
+# Instancia global
+rating_buffer = RatingWriteBuffer()
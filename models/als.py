@@ -0,0 +1,217 @@
+import os
+import json
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import sparse
+import logging
+
+from config import Config
+from models.item_neighbors import top_n_rows
+
+logger = logging.getLogger(__name__)
+
+class ImplicitALS:
+    """Factorización ALS para feedback implícito (Hu, Koren y Volinsky, 2008)
+
+    Cada rating es una interacción con preferencia p = 1 y confianza c = 1 + alpha · rating;
+    las celdas sin rating tienen p = 0 y c = 1. Se minimiza
+        Σ_u,i c_ui (p_ui - x_u · y_i)² + λ (Σ |x_u|² + Σ |y_i|²)
+    alternando: con Y fijo cada usuario es un sistema d x d independiente
+        (YᵀY + Yᵀ (C_u - I) Y + λI) x_u = Yᵀ C_u p_u
+    donde YᵀY se calcula una vez por iteración y el resto solo recorre las películas del
+    usuario (fila CSR); después lo mismo para las películas con X fijo (CSR de la traspuesta).
+
+    Los usuarios se resuelven por bloques en un pool de hilos (las multiplicaciones y
+    np.linalg.solve sobre la pila de sistemas del bloque liberan el GIL). Los factores se
+    guardan en float32 como .npy en MODEL_CACHE_DIR/als y se abren con memory-mapping.
+    """
+
+    ARRAYS = ('user_ids', 'movie_ids', 'user_factors', 'item_factors')
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(Config.MODEL_CACHE_DIR, 'als')
+        self.loaded = False
+        self.meta = {}
+        self.user_ids = None
+        self.movie_ids = None
+        self.user_factors = None
+        self.item_factors = None
+        self._user_pos = {}
+        self._movie_pos = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def train(cls, ratings, user_ids, movie_ids, factors=None, regularization=None, alpha=None,
+              iterations=None, workers=None, block_size=None, seed=0):
+        """Entrenar sobre la CSR usuarios x películas de ratings; devuelve el modelo con su historial"""
+        factors = factors or Config.ALS_FACTORS
+        regularization = Config.ALS_REGULARIZATION if regularization is None else regularization
+        alpha = alpha or Config.ALS_ALPHA
+        iterations = iterations or Config.ALS_ITERATIONS
+        workers = max(1, workers or Config.ALS_WORKERS or os.cpu_count() or 1)
+        block_size = block_size or Config.ALS_BLOCK_SIZE
+        start = time.time()
+
+        # Confianza extra (c - 1) por interacción, por filas (usuarios) y por columnas (películas)
+        confidence = sparse.csr_matrix(ratings, dtype=np.float64)
+        confidence.data = alpha * confidence.data
+        confidence.eliminate_zeros()
+        confidence_t = confidence.T.tocsr()
+
+        rng = np.random.default_rng(seed)
+        user_factors = (rng.standard_normal((confidence.shape[0], factors)) * 0.01).astype(np.float32)
+        item_factors = (rng.standard_normal((confidence.shape[1], factors)) * 0.01).astype(np.float32)
+
+        history = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for iteration in range(1, iterations + 1):
+                iteration_start = time.time()
+                user_factors = cls._solve(confidence, item_factors, regularization, executor, block_size)
+                item_factors = cls._solve(confidence_t, user_factors, regularization, executor, block_size)
+                seconds = time.time() - iteration_start
+                loss = cls._loss(confidence, user_factors, item_factors, regularization)
+                history.append({'iteration': iteration, 'seconds': round(seconds, 3), 'loss': loss})
+                logger.info(f"⏳ ALS iteración {iteration}/{iterations}: {seconds:.2f}s, loss {loss:.6f}")
+
+        model = cls()
+        model.user_ids, model.movie_ids = np.asarray(user_ids), np.asarray(movie_ids)
+        model.user_factors, model.item_factors = user_factors, item_factors
+        model.meta = {
+            'factors': factors, 'regularization': regularization, 'alpha': alpha,
+            'iterations': iterations, 'workers': workers, 'users': len(model.user_ids),
+            'movies': len(model.movie_ids), 'interactions': int(confidence.nnz),
+            'train_seconds': round(time.time() - start, 3), 'history': history, 'built_at': time.time()
+        }
+        model._index_ids()
+        model.loaded = True
+        logger.info(f"✅ ALS entrenado en {time.time() - start:.2f}s: {len(model.user_ids)} usuarios, "
+                    f"{len(model.movie_ids)} películas, {factors} factores, loss final {history[-1]['loss']:.6f}")
+        return model
+
+    @staticmethod
+    def _solve(confidence, fixed, regularization, executor, block_size):
+        """Factores de todas las filas de `confidence` con los de la otra dimensión fijos"""
+        n_rows, factors = confidence.shape[0], fixed.shape[1]
+        fixed = fixed.astype(np.float64)
+        gram = fixed.T @ fixed + regularization * np.eye(factors)
+        solved = np.zeros((n_rows, factors), dtype=np.float32)
+
+        def run(block_start):
+            block_end = min(block_start + block_size, n_rows)
+            systems = np.empty((block_end - block_start, factors, factors))
+            targets = np.zeros((block_end - block_start, factors))
+            for offset, row in enumerate(range(block_start, block_end)):
+                lo, hi = confidence.indptr[row], confidence.indptr[row + 1]
+                columns, extra = confidence.indices[lo:hi], confidence.data[lo:hi]
+                local = fixed[columns]
+                systems[offset] = gram + (local.T * extra) @ local
+                # Yᵀ C_u p_u: p = 1 solo donde hay interacción, con confianza 1 + extra
+                targets[offset] = local.T @ (1.0 + extra)
+            solved[block_start:block_end] = np.linalg.solve(systems, targets[..., None])[..., 0]
+
+        list(executor.map(run, range(0, n_rows, block_size)))
+        return solved
+
+    @staticmethod
+    def _loss(confidence, user_factors, item_factors, regularization, chunk_size=1000000):
+        """Pérdida ponderada por confianza sobre todas las celdas, normalizada por la confianza total
+
+        Σ_todas s² sale de traza((XᵀX)(YᵀY)); las celdas con interacción se corrigen por lotes.
+        """
+        X, Y = user_factors.astype(np.float64), item_factors.astype(np.float64)
+        loss = float(np.sum((X.T @ X) * (Y.T @ Y)))
+        coo = confidence.tocoo()
+        for start in range(0, coo.nnz, chunk_size):
+            rows, columns = coo.row[start:start + chunk_size], coo.col[start:start + chunk_size]
+            extra = coo.data[start:start + chunk_size]
+            scores = np.einsum('ij,ij->i', X[rows], Y[columns])
+            loss += float(np.sum((1.0 + extra) * (1.0 - scores) ** 2 - scores ** 2))
+        loss += regularization * float(np.sum(X ** 2) + np.sum(Y ** 2))
+        total_confidence = confidence.shape[0] * confidence.shape[1] + float(confidence.data.sum())
+        return loss / total_confidence
+
+    def _index_ids(self):
+        self._user_pos = {user_id: pos for pos, user_id in enumerate(self.user_ids.tolist())}
+        self._movie_pos = {movie_id: pos for pos, movie_id in enumerate(self.movie_ids.tolist())}
+
+    def save(self, path=None):
+        """Guardar factores float32 e ids como .npy (el directorio se reemplaza entero)"""
+        path = path or self.path
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in self.ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+
+        old_path = f"{path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        logger.info(f"✅ Factores ALS guardados en {path}")
+
+    def load(self):
+        """Abrir (memory-mapped) los factores si existen y cambiaron desde la última carga"""
+        try:
+            meta_path = os.path.join(self.path, 'meta.json')
+            if not os.path.exists(meta_path):
+                return False
+            mtime = os.path.getmtime(meta_path)
+            if mtime == self._mtime:
+                return True
+
+            with open(meta_path) as f:
+                meta = json.load(f)
+            arrays = {name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r') for name in self.ARRAYS}
+            with self._lock:
+                for name, array in arrays.items():
+                    setattr(self, name, array)
+                self.meta = meta
+                self._index_ids()
+                self._mtime = mtime
+                self.loaded = True
+            logger.info(f"✅ Factores ALS cargados: {meta['users']} usuarios, {meta['movies']} películas, "
+                        f"{meta['factors']} factores")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error cargando factores ALS: {e}")
+            return False
+
+    def recommend(self, user_id, seen_movie_ids=(), limit=10):
+        """Películas no vistas por x_u · y_i: [(movieId, score)], o None si el usuario no está en el modelo"""
+        with self._lock:
+            position = self._user_pos.get(user_id)
+            if position is None:
+                return None
+            scores = (self.item_factors @ self.user_factors[position])[None, :].astype(np.float64)
+            seen = [self._movie_pos[movie_id] for movie_id in seen_movie_ids if movie_id in self._movie_pos]
+            scores[0, seen] = 0.0
+            top, top_scores = top_n_rows(scores, limit)
+            return [
+                (self.movie_ids[pos].item(), float(score))
+                for pos, score in zip(top[0], top_scores[0]) if pos >= 0
+            ]
+
+    def get_stats(self):
+        history = self.meta.get('history') or []
+        return {
+            'loaded': self.loaded,
+            'path': self.path,
+            'users': self.meta.get('users', 0),
+            'movies': self.meta.get('movies', 0),
+            'factors': self.meta.get('factors'),
+            'iterations': len(history),
+            'final_loss': history[-1]['loss'] if history else None,
+            'train_seconds': self.meta.get('train_seconds'),
+            'built_at': self.meta.get('built_at')
+        }
+
+# Instancia global
+als_model = ImplicitALS()
@@ -0,0 +1,205 @@
+import os
+import json
+import shutil
+import numpy as np
+from scipy import sparse
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class RandomProjectionLSH:
+    """Índice aproximado de vecinos por similitud coseno (LSH con hiperplanos aleatorios)
+
+    Cada tabla asigna a un vector un código de `n_bits` bits: el signo de su proyección
+    sobre otros tantos hiperplanos aleatorios. Dos vectores con ángulo θ coinciden en cada
+    bit con probabilidad 1 - θ/π, así que los parecidos caen en el mismo cubo. Una consulta
+    reúne como candidatos los vectores de su cubo en cada tabla y, con multi-probe, de los
+    `probes` cubos vecinos que resultan de invertir los bits con proyección más cercana a 0.
+
+    Compromiso recall/latencia: más tablas o más probes encuentran más vecinos verdaderos a
+    cambio de más candidatos; más bits hacen cubos más pequeños (menos candidatos y menos recall).
+
+    Con `center=True` cada vector se centra en su media antes de proyectar (Pearson sobre el
+    vector completo es el coseno de los vectores centrados); se hace sin densificar, restando
+    media · Σ hiperplanos a la proyección.
+
+    Por tabla se guardan los códigos ordenados y las posiciones en ese orden; un cubo es un
+    rango que se encuentra por bisección. Se persiste como directorio de ficheros .npy que se
+    pueden abrir con memory-mapping (varios procesos comparten las mismas páginas); la huella
+    (`fingerprint`) identifica los datos con los que se construyó.
+    """
+
+    ARRAYS = ('ids', 'planes', 'codes', 'order')
+
+    def __init__(self, ids, planes, codes, order, n_bits, center=False, vectors=None):
+        self.ids = ids
+        self.planes = planes
+        self.codes = codes
+        self.order = order
+        self.n_bits = n_bits
+        self.n_tables = codes.shape[0]
+        self.center = center
+        self.vectors = vectors
+        self.path = None
+        self.fingerprint = None
+        self._plane_sums = np.asarray(planes.sum(axis=0)) if center else None
+        self._weights = (np.uint32(1) << np.arange(n_bits, dtype=np.uint32)).astype(np.uint32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, vectors, ids, n_tables=None, n_bits=None, center=False, keep_vectors=False,
+              block_size=None, seed=0):
+        """Indexar las filas de `vectors` (densa o dispersa, n x d) con identificadores `ids`
+
+        `keep_vectors` guarda las filas normalizadas para que query() devuelva similitudes
+        exactas; sin ellas el índice solo genera candidatos (para reordenar fuera).
+        """
+        n_tables = n_tables or Config.ANN_TABLES
+        n_bits = n_bits or Config.ANN_BITS
+        block_size = block_size or Config.TOPK_BLOCK_SIZE
+        if not 0 < n_bits <= 31:
+            raise ValueError(f"n_bits debe estar entre 1 y 31: {n_bits}")
+
+        n, dimensions = vectors.shape
+        rng = np.random.default_rng(seed)
+        planes = rng.standard_normal((dimensions, n_tables * n_bits)).astype(np.float32)
+        index = cls(np.asarray(ids), planes, np.zeros((n_tables, 0), dtype=np.uint32),
+                    np.zeros((n_tables, 0), dtype=np.int32), n_bits, center=center)
+
+        # Códigos por bloques de filas: la matriz de proyecciones nunca pasa de block_size x (tablas · bits)
+        codes = np.empty((n, n_tables), dtype=np.uint32)
+        for start in range(0, n, block_size):
+            codes[start:start + block_size] = index._codes(index._project(vectors[start:start + block_size]))
+
+        order = np.argsort(codes, axis=0, kind='stable').T.astype(np.int32)
+        index.codes = np.take_along_axis(codes.T, order, axis=1)
+        index.order = order
+        if keep_vectors:
+            index.vectors = index._normalize(vectors)
+        logger.info(f"✅ Índice LSH construido: {n} vectores de {dimensions} dimensiones, "
+                    f"{n_tables} tablas x {n_bits} bits")
+        return index
+
+    def _project(self, vectors):
+        """Proyecciones (filas x tablas·bits) de un bloque de vectores (o de uno solo)"""
+        if sparse.issparse(vectors):
+            projections = np.asarray((vectors @ self.planes))
+            means = np.asarray(vectors.sum(axis=1)).ravel() / vectors.shape[1] if self.center else None
+        else:
+            vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+            # Dimensiones añadidas después de construir (p. ej. usuarios nuevos) no tienen hiperplano
+            dimensions = self.planes.shape[0]
+            if vectors.shape[1] != dimensions:
+                vectors = vectors[:, :dimensions] if vectors.shape[1] > dimensions else \
+                    np.pad(vectors, ((0, 0), (0, dimensions - vectors.shape[1])))
+            projections = vectors @ self.planes
+            means = vectors.mean(axis=1) if self.center else None
+        if self.center:
+            projections = projections - means[:, None] * self._plane_sums[None, :]
+        return projections.reshape(len(projections), self.n_tables, self.n_bits)
+
+    def _codes(self, projections):
+        return ((projections > 0).astype(np.uint32) * self._weights).sum(axis=2, dtype=np.uint32)
+
+    def _normalize(self, vectors):
+        vectors = vectors.toarray() if sparse.issparse(vectors) else np.array(vectors, dtype=np.float32)
+        vectors = vectors.astype(np.float32)
+        if self.center:
+            vectors -= vectors.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def candidate_positions(self, vector, probes=None):
+        """Posiciones (sin repetir) de los vectores que comparten cubo con `vector` en alguna tabla"""
+        probes = Config.ANN_PROBES if probes is None else probes
+        probes = min(probes, self.n_bits)
+        projections = self._project(vector)[0]
+        codes = self._codes(projections[None])[0]
+
+        # Cubos a visitar por tabla: el propio y los que difieren en los bits menos seguros
+        uncertain = np.argsort(np.abs(projections), axis=1)[:, :probes]
+        flips = self._weights[uncertain]
+        probe_codes = np.concatenate([codes[:, None], codes[:, None] ^ flips], axis=1)
+
+        found = []
+        for table in range(self.n_tables):
+            table_codes = self.codes[table]
+            starts = np.searchsorted(table_codes, probe_codes[table], side='left')
+            ends = np.searchsorted(table_codes, probe_codes[table], side='right')
+            found.extend(self.order[table][start:end] for start, end in zip(starts, ends) if end > start)
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def candidates(self, vector, probes=None):
+        """Identificadores candidatos a vecinos de `vector` (para reordenar con la métrica exacta)"""
+        return self.ids[self.candidate_positions(vector, probes)]
+
+    def query(self, vector, k=10, probes=None, exclude=None):
+        """Top-k aproximado [(id, similitud coseno)] reordenando los candidatos con los vectores guardados"""
+        if self.vectors is None:
+            raise ValueError("El índice no guarda vectores: usar candidates() y reordenar fuera")
+        positions = self.candidate_positions(vector, probes)
+        if exclude is not None:
+            positions = positions[self.ids[positions] != exclude]
+        if not len(positions):
+            return []
+        scores = self.vectors[positions] @ self._normalize(np.atleast_2d(vector)[:, :self.vectors.shape[1]])[0]
+        top = np.argsort(-scores, kind='stable')[:k]
+        return [(self.ids[positions[i]].item(), float(scores[i])) for i in top]
+
+    def save(self, path, fingerprint=None):
+        """Guardar como directorio de .npy (se reemplaza entero, sin dejar un índice a medias)"""
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in self.ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(self, name))
+        if self.vectors is not None:
+            np.save(os.path.join(tmp_path, 'vectors.npy'), self.vectors)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump({'n_bits': self.n_bits, 'center': self.center, 'fingerprint': fingerprint}, f)
+
+        old_path = f"{path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        self.path = path
+        self.fingerprint = fingerprint
+        logger.info(f"✅ Índice LSH guardado en {path}")
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Abrir un índice guardado; con `mmap` los arrays se leen del disco bajo demanda"""
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in cls.ARRAYS}
+        vectors_path = os.path.join(path, 'vectors.npy')
+        vectors = np.load(vectors_path, mmap_mode=mode) if os.path.exists(vectors_path) else None
+        index = cls(arrays['ids'], arrays['planes'], arrays['codes'], arrays['order'], meta['n_bits'],
+                    center=meta['center'], vectors=vectors)
+        index.path = path
+        index.fingerprint = meta.get('fingerprint')
+        logger.info(f"✅ Índice LSH cargado de {path}: {len(index)} vectores")
+        return index
+
+    def get_stats(self):
+        # Tamaño medio de cubo de la primera tabla (cuántos candidatos aporta cada tabla)
+        buckets = len(np.unique(self.codes[0])) if len(self) else 0
+        return {
+            'vectors': len(self),
+            'dimensions': int(self.planes.shape[0]),
+            'tables': self.n_tables,
+            'bits': self.n_bits,
+            'center': self.center,
+            'avg_bucket_size': round(len(self) / buckets, 2) if buckets else 0,
+            'stores_vectors': self.vectors is not None,
+            'path': self.path
+        }
@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+import numpy as np
+from scipy import sparse
+import logging
+
+from config import Config
+from models.title_search import normalize
+from models.topk_kernel import top_k_similar
+
+logger = logging.getLogger(__name__)
+
+class ContentModel:
+    """Modelo de contenido TF-IDF película x término (tags de usuarios y géneros)
+
+    Cada película es un vector disperso de términos "tag:<tag>" (tf = veces que se aplicó el
+    tag, amortiguado con 1 + log) y "genre:<género>" (tf = 1), ponderado con idf suavizado y
+    normalizado L2, así el producto escalar entre filas es la similitud coseno.
+
+    Los vecinos de cada película se precalculan offline (scripts/build_content_model.py)
+    con el kernel top-k por bloques (models/topk_kernel.py); servir recomendaciones es leer
+    una fila de la lista de vecinos. Pedir más de los CONTENT_NEIGHBORS guardados puntúa esa
+    fila contra todo el catálogo bajo demanda, así las páginas siguientes no salen vacías.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(Config.MODEL_CACHE_DIR, 'content_tfidf.npz')
+        self.loaded = False
+        self.built_at = None
+        self.movie_ids = None
+        self.movie_pos = {}
+        self.terms = None
+        self.matrix = None
+        self.neighbors = None
+        self.row_size = 0
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, movies, tags, k=None, block_size=None, min_tag_movies=None):
+        """Construir el modelo desde [{'movieId', 'genres'}] y [{'movieId', 'tag'}]
+
+        Los tags aplicados a menos de `min_tag_movies` películas se descartan (ruido).
+        """
+        k = k or Config.CONTENT_NEIGHBORS
+        block_size = block_size or Config.CONTENT_BLOCK_SIZE
+        min_tag_movies = min_tag_movies or Config.CONTENT_MIN_TAG_MOVIES
+        start = time.time()
+
+        movie_ids = np.array(sorted({movie['movieId'] for movie in movies}), dtype=np.int64)
+        movie_pos = {movie_id: pos for pos, movie_id in enumerate(movie_ids.tolist())}
+
+        counts = {}
+        for tag in tags:
+            position = movie_pos.get(tag.get('movieId'))
+            term = normalize(str(tag.get('tag') or ''))
+            if position is not None and term:
+                key = (position, f"tag:{term}")
+                counts[key] = counts.get(key, 0) + 1
+        tag_movies = {}
+        for _, term in counts:
+            tag_movies[term] = tag_movies.get(term, 0) + 1
+        counts = {key: count for key, count in counts.items() if tag_movies[key[1]] >= min_tag_movies}
+
+        for movie in movies:
+            for genre in (movie.get('genres') or '').split('|'):
+                if genre and genre not in ('Unknown', '(no genres listed)'):
+                    counts[(movie_pos[movie['movieId']], f"genre:{genre.lower()}")] = 1
+
+        terms = np.array(sorted({term for _, term in counts}))
+        term_pos = {term: pos for pos, term in enumerate(terms.tolist())}
+        rows = np.fromiter((position for position, _ in counts), dtype=np.int64, count=len(counts))
+        columns = np.fromiter((term_pos[term] for _, term in counts), dtype=np.int64, count=len(counts))
+        tf = 1 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        matrix = sparse.csr_matrix((tf, (rows, columns)), shape=(len(movie_ids), len(terms)))
+
+        document_frequency = np.bincount(columns, minlength=len(terms))
+        idf = np.log((1 + len(movie_ids)) / (1 + document_frequency)) + 1
+        matrix = sparse.csr_matrix(matrix.multiply(idf[None, :]))
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        matrix = sparse.csr_matrix(sparse.diags(np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)) @ matrix)
+        matrix.data = matrix.data.astype(np.float32)
+
+        model = cls()
+        model.movie_ids, model.movie_pos = movie_ids, movie_pos
+        model.terms, model.matrix = terms, matrix
+        model.neighbors = top_k_similar(matrix, k, block_size=block_size)
+        model.row_size = int(np.diff(model.neighbors.indptr).max(initial=0))
+        model.built_at = time.time()
+        model.loaded = True
+        logger.info(f"✅ Modelo de contenido construido en {time.time() - start:.2f}s: {len(movie_ids)} películas, "
+                    f"{len(terms)} términos, {model.neighbors.nnz} vecinos")
+        return model
+
+    def save(self, path=None):
+        """Guardar matriz TF-IDF y vecinos en npz (escritura atómica)"""
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            movie_ids=self.movie_ids,
+            terms=self.terms,
+            matrix_data=self.matrix.data, matrix_indices=self.matrix.indices, matrix_indptr=self.matrix.indptr,
+            neighbor_scores=self.neighbors.data.astype(np.float32),
+            neighbor_indices=self.neighbors.indices.astype(np.int32),
+            neighbor_indptr=self.neighbors.indptr,
+            built_at=np.array(self.built_at)
+        )
+        os.replace(tmp_path, path)
+        logger.info(f"✅ Modelo de contenido guardado en {path}")
+
+    def load(self):
+        """Cargar desde disco si el fichero existe y cambió desde la última carga"""
+        try:
+            if not os.path.exists(self.path):
+                return False
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return True
+
+            with np.load(self.path) as data:
+                movie_ids, terms = data['movie_ids'], data['terms']
+                matrix = sparse.csr_matrix(
+                    (data['matrix_data'], data['matrix_indices'], data['matrix_indptr']),
+                    shape=(len(movie_ids), len(terms))
+                )
+                neighbors = sparse.csr_matrix(
+                    (data['neighbor_scores'], data['neighbor_indices'], data['neighbor_indptr']),
+                    shape=(len(movie_ids), len(movie_ids))
+                )
+                built_at = float(data['built_at'])
+
+            with self._lock:
+                self.movie_ids, self.terms = movie_ids, terms
+                self.movie_pos = {movie_id: pos for pos, movie_id in enumerate(movie_ids.tolist())}
+                self.matrix, self.neighbors = matrix, neighbors
+                self.row_size = int(np.diff(neighbors.indptr).max(initial=0))
+                self.built_at = built_at
+                self._mtime = mtime
+                self.loaded = True
+            logger.info(f"✅ Modelo de contenido cargado: {len(movie_ids)} películas, {len(terms)} términos")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error cargando modelo de contenido: {e}")
+            return False
+
+    def similar(self, movie_id, limit=10):
+        """Películas más parecidas por contenido: [(movieId, similitud)] o None si no está en el modelo"""
+        with self._lock:
+            position = self.movie_pos.get(movie_id)
+            if position is None:
+                return None
+            start, end = self.neighbors.indptr[position], self.neighbors.indptr[position + 1]
+            stored = list(zip(self.neighbors.indices[start:end].tolist(), self.neighbors.data[start:end].tolist()))
+            # Una fila más corta que las completas ya tiene todos los vecinos con similitud > 0
+            if limit > len(stored) and len(stored) == self.row_size:
+                stored += self._scan(position, [other for other, _ in stored], limit - len(stored))
+            return [(self.movie_ids[other].item(), float(score)) for other, score in stored[:limit]]
+
+    def _scan(self, position, exclude, limit):
+        """Siguientes `limit` vecinos de una fila puntuándola contra todo el catálogo (sin los ya listados)"""
+        scores = np.asarray((self.matrix[position] @ self.matrix.T).todense(), dtype=np.float64).ravel()
+        scores[[position] + exclude] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if limit < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(other, float(scores[other])) for other in candidates.tolist()]
+
+    def top_terms(self, movie_id, limit=5):
+        """Términos con más peso de una película (para explicar las recomendaciones)"""
+        with self._lock:
+            position = self.movie_pos.get(movie_id)
+            if position is None:
+                return []
+            row = self.matrix.getrow(position)
+            order = np.argsort(-row.data)[:limit]
+            return [self.terms[row.indices[i]].item() for i in order]
+
+    def get_stats(self):
+        return {
+            'loaded': self.loaded,
+            'path': self.path,
+            'movies': len(self.movie_ids) if self.movie_ids is not None else 0,
+            'terms': len(self.terms) if self.terms is not None else 0,
+            'neighbors': int(self.neighbors.nnz) if self.neighbors is not None else 0,
+            'built_at': self.built_at
+        }
+
+# Instancia global
+content_model = ContentModel()
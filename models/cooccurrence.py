@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+import numpy as np
+from scipy import sparse
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class CooccurrenceModel:
+    """Matriz dispersa película-película de "gustaron juntas"
+
+    Con L = matriz binaria usuario x película de ratings >= LIKE_THRESHOLD:
+      counts[x, y] = usuarios a los que les gustaron x e y   (Lᵀ L)
+      sums[x, y]   = suma de los ratings de y de esos usuarios (Lᵀ (R ∘ L))
+    así "a quienes les gustó X también les gustó" es leer la fila de X y quedarse con el
+    top-k por rating medio sums / counts.
+
+    Se construye offline por bloques de columnas (scripts/build_cooccurrence.py), descartando
+    pares con menos de `min_count` usuarios en común, y se guarda en MODEL_CACHE_DIR como npz.
+    """
+
+    LIKE_THRESHOLD = 4.0
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(Config.MODEL_CACHE_DIR, 'cooccurrence.npz')
+        self.loaded = False
+        self.built_at = None
+        self.movie_ids = None
+        self.movie_pos = {}
+        self.counts = None
+        self.sums = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, user_ids, movie_ids, ratings, block_size=None, min_count=None):
+        """Construir el modelo a partir de arrays paralelos (userId, movieId, rating)
+
+        Solo se usan los ratings >= LIKE_THRESHOLD. El producto se calcula por bloques de
+        `block_size` películas para acotar la memoria intermedia.
+        """
+        block_size = block_size or Config.COOCCURRENCE_BLOCK_SIZE
+        min_count = min_count or Config.COOCCURRENCE_MIN_COUNT
+        start = time.time()
+
+        ratings = np.asarray(ratings, dtype=np.float32)
+        liked = ratings >= cls.LIKE_THRESHOLD
+        user_index, users = np.unique(np.asarray(user_ids)[liked], return_inverse=True)
+        movie_index, movies = np.unique(np.asarray(movie_ids)[liked], return_inverse=True)
+        shape = (len(user_index), len(movie_index))
+
+        liked_matrix = sparse.csc_matrix((np.ones(len(users), dtype=np.float32), (users, movies)), shape=shape)
+        rating_matrix = sparse.csc_matrix((ratings[liked], (users, movies)), shape=shape)
+        liked_t = liked_matrix.T.tocsr()
+
+        count_blocks, sum_blocks = [], []
+        for block_start in range(0, shape[1], block_size):
+            columns = slice(block_start, min(block_start + block_size, shape[1]))
+            # Filas = todas las películas x, columnas = bloque de películas y
+            counts = (liked_t @ liked_matrix[:, columns]).tocsr()
+            sums = (liked_t @ rating_matrix[:, columns]).tocsr()
+            # Ambos productos tienen el mismo patrón (los ratings >= umbral nunca son 0)
+            counts.sort_indices()
+            sums.sort_indices()
+            rare = counts.data < min_count
+            counts.data[rare] = 0
+            sums.data[rare] = 0
+            counts.eliminate_zeros()
+            sums.eliminate_zeros()
+            count_blocks.append(counts)
+            sum_blocks.append(sums)
+            logger.info(f"⏳ Co-ocurrencias: {columns.stop}/{shape[1]} películas")
+
+        model = cls()
+        model.movie_ids = movie_index
+        model.movie_pos = {movie_id: pos for pos, movie_id in enumerate(movie_index.tolist())}
+        model.counts, model.sums = (
+            cls._stack(blocks, shape[1]) for blocks in (count_blocks, sum_blocks)
+        )
+        model.built_at = time.time()
+        model.loaded = True
+        logger.info(f"✅ Matriz de co-ocurrencia construida en {time.time() - start:.2f}s: "
+                    f"{len(movie_index)} películas, {model.counts.nnz} pares")
+        return model
+
+    @staticmethod
+    def _stack(blocks, n_movies):
+        """Unir los bloques de columnas sin la diagonal (una película consigo misma)"""
+        matrix = sparse.hstack(blocks, format='csr') if blocks else sparse.csr_matrix((n_movies, n_movies))
+        matrix.setdiag(0)
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        return matrix
+
+    def save(self, path=None):
+        """Guardar en npz (escritura atómica)"""
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            movie_ids=self.movie_ids,
+            indptr=self.counts.indptr,
+            indices=self.counts.indices,
+            counts=self.counts.data.astype(np.uint32),
+            sums=self.sums.data.astype(np.float32),
+            built_at=np.array(self.built_at)
+        )
+        os.replace(tmp_path, path)
+        logger.info(f"✅ Matriz de co-ocurrencia guardada en {path}")
+
+    def load(self):
+        """Cargar desde disco si el fichero existe y cambió desde la última carga"""
+        try:
+            if not os.path.exists(self.path):
+                return False
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return True
+
+            with np.load(self.path) as data:
+                movie_ids = data['movie_ids']
+                shape = (len(movie_ids), len(movie_ids))
+                structure = (data['indices'], data['indptr'])
+                counts = sparse.csr_matrix((data['counts'], *structure), shape=shape)
+                sums = sparse.csr_matrix((data['sums'], *structure), shape=shape)
+                built_at = float(data['built_at'])
+
+            with self._lock:
+                self.movie_ids = movie_ids
+                self.movie_pos = {movie_id: pos for pos, movie_id in enumerate(movie_ids.tolist())}
+                self.counts, self.sums = counts, sums
+                self.built_at = built_at
+                self._mtime = mtime
+                self.loaded = True
+            logger.info(f"✅ Matriz de co-ocurrencia cargada: {len(movie_ids)} películas, {counts.nnz} pares")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error cargando matriz de co-ocurrencia: {e}")
+            return False
+
+    def also_liked(self, movie_id, limit=10, min_count=2):
+        """Películas que gustaron a quienes les gustó `movie_id`
+
+        Devuelve [{'movieId', 'avg_rating', 'count'}] ordenado por rating medio, o None si
+        la película no está en el modelo.
+        """
+        with self._lock:
+            position = self.movie_pos.get(movie_id)
+            if position is None:
+                return None
+            start, end = self.counts.indptr[position], self.counts.indptr[position + 1]
+            others = self.counts.indices[start:end]
+            counts = self.counts.data[start:end]
+            sums = self.sums.data[start:end]
+            movie_ids = self.movie_ids
+
+        keep = counts >= min_count
+        others, counts, averages = others[keep], counts[keep], sums[keep] / counts[keep]
+        if 0 < limit < len(averages):
+            # Candidatas: las que llegan a la k-ésima media (incluidos empates, que desempata el conteo)
+            kth = -np.partition(-averages, limit - 1)[limit - 1]
+            top = np.flatnonzero(averages >= kth)
+        else:
+            top = np.arange(len(averages))
+        top = top[np.lexsort((-counts[top], -averages[top]))][:limit]
+        return [
+            {'movieId': movie_ids[other].item(), 'avg_rating': float(averages[i]), 'count': int(counts[i])}
+            for i, other in zip(top, others[top])
+        ]
+
+    def get_stats(self):
+        return {
+            'loaded': self.loaded,
+            'path': self.path,
+            'movies': len(self.movie_ids) if self.movie_ids is not None else 0,
+            'pairs': int(self.counts.nnz) if self.counts is not None else 0,
+            'built_at': self.built_at
+        }
+
+# Instancia global
+cooccurrence = CooccurrenceModel()
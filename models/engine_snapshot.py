@@ -0,0 +1,55 @@
+import itertools
+import time
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Contador global de versiones de instantánea
+_versions = itertools.count(1)
+
+class EngineSnapshot:
+    """Instantánea inmutable de los datos del motor de recomendaciones
+
+    Agrupa todo lo que los endpoints leen (películas, ratings, matriz usuario-película
+    e índices, incluida la matriz multi-hot de géneros, los vecinos película-película, el grafo usuario-película y los índices LSH) para que una petición trabaje siempre sobre una versión coherente.
+    Una reconstrucción crea una instantánea nueva y el motor cambia la referencia de
+    forma atómica; las peticiones en curso terminan con la que tenían.
+
+    Los ratings nuevos tampoco la modifican: al compactarlos se crea otra instantánea con su
+    propia copia de la matriz y del índice de similitud.
+    """
+
+    def __init__(self, movies_data, ratings_data, user_movie_matrix, movie_index, similarity_index,
+                 genre_bitsets, item_neighbors, graph, ann_indexes, build_seconds=0.0):
+        object.__setattr__(self, 'version', next(_versions))
+        object.__setattr__(self, 'built_at', datetime.now().isoformat())
+        object.__setattr__(self, 'created', time.time())
+        object.__setattr__(self, 'build_seconds', build_seconds)
+        object.__setattr__(self, 'movies_data', movies_data)
+        object.__setattr__(self, 'ratings_data', ratings_data)
+        object.__setattr__(self, 'user_movie_matrix', user_movie_matrix)
+        object.__setattr__(self, 'movie_index', movie_index)
+        object.__setattr__(self, 'similarity_index', similarity_index)
+        object.__setattr__(self, 'genre_bitsets', genre_bitsets)
+        object.__setattr__(self, 'item_neighbors', item_neighbors)
+        object.__setattr__(self, 'graph', graph)
+        object.__setattr__(self, 'ann_indexes', ann_indexes)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"EngineSnapshot es inmutable (atributo '{name}')")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"EngineSnapshot es inmutable (atributo '{name}')")
+
+    def get_info(self):
+        """Resumen de la instantánea para /api/stats"""
+        return {
+            'version': self.version,
+            'built_at': self.built_at,
+            'build_seconds': round(self.build_seconds, 3),
+            'age_seconds': round(time.time() - self.created, 1),
+            'movies': len(self.movies_data),
+            'ratings': len(self.ratings_data),
+            'matrix_shape': list(self.user_movie_matrix.shape)
+        }
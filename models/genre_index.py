@@ -0,0 +1,255 @@
+import functools
+import threading
+from bisect import bisect_left, insort
+import numpy as np
+import logging
+
+from models.movie_stats import movie_stats
+
+logger = logging.getLogger(__name__)
+
+# Número de bits a 1 de cada valor de 16 bits (popcount por tabla si numpy no trae bitwise_count)
+POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(1 << 16)], dtype=np.uint8)
+
+def popcount(bits):
+    """Bits a 1 de cada elemento de un array uint32"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bits)
+    return POPCOUNT_TABLE[bits & 0xFFFF] + POPCOUNT_TABLE[bits >> 16]
+
+class GenreBitsets:
+    """Matriz multi-hot de géneros: un uint32 por película, un bit por género
+
+    Se construye al cargar el catálogo; puntuar una película semilla contra todo el
+    catálogo es un AND + popcount vectorizado. Con más de 32 géneros distintos los que
+    sobran (los menos frecuentes) se ignoran.
+    """
+
+    METRICS = ('overlap', 'jaccard')
+    MAX_GENRES = 32
+
+    def __init__(self, movie_index):
+        genre_lists = [self._split(movie.get('genres')) for movie in movie_index.values()]
+        frequency = {}
+        for genres in genre_lists:
+            for genre in genres:
+                frequency[genre] = frequency.get(genre, 0) + 1
+        vocabulary = sorted(frequency, key=lambda genre: (-frequency[genre], genre))
+        if len(vocabulary) > self.MAX_GENRES:
+            logger.warning(f"⚠️ {len(vocabulary)} géneros; se ignoran {len(vocabulary) - self.MAX_GENRES}")
+        self.genres = vocabulary[:self.MAX_GENRES]
+        self.genre_bit = {genre: np.uint32(1 << bit) for bit, genre in enumerate(self.genres)}
+
+        self.movie_ids = np.fromiter(movie_index.keys(), dtype=np.int64, count=len(movie_index))
+        self.movie_pos = {movie_id: pos for pos, movie_id in enumerate(movie_index)}
+        self.bits = np.zeros(len(movie_index), dtype=np.uint32)
+        for position, genres in enumerate(genre_lists):
+            for genre in genres:
+                self.bits[position] |= self.genre_bit.get(genre, np.uint32(0))
+        self.sizes = popcount(self.bits)
+
+    @staticmethod
+    def _split(genres):
+        return {genre for genre in (genres or '').split('|') if genre}
+
+    def mask_for(self, genres):
+        """Bitmask de un conjunto de géneros (los desconocidos no aportan bits)"""
+        mask = np.uint32(0)
+        for genre in genres:
+            mask |= self.genre_bit.get(genre, np.uint32(0))
+        return mask
+
+    def scores(self, mask, metric='overlap'):
+        """Puntuación de todo el catálogo frente a un bitmask
+
+        'overlap' es compartidos / max(tamaños), la fórmula que ya usaban las recomendaciones
+        por contenido; 'jaccard' es compartidos / unión.
+        """
+        if metric not in self.METRICS:
+            raise ValueError(f"Métrica de géneros no válida: {metric}")
+        shared = popcount(self.bits & mask).astype(np.float32)
+        if metric == 'overlap':
+            denominator = np.maximum(self.sizes, popcount(np.array([mask], dtype=np.uint32))[0])
+        else:
+            denominator = popcount(self.bits | mask)
+        return np.divide(shared, denominator, out=np.zeros_like(shared), where=denominator > 0)
+
+    def similar(self, movie_id, limit=10, metric='overlap'):
+        """Top-k de películas por géneros compartidos con `movie_id`: [(movieId, score)]
+
+        Empates por orden del catálogo. Devuelve None si la película no está indexada.
+        """
+        position = self.movie_pos.get(movie_id)
+        if position is None:
+            return None
+        scores = self.scores(self.bits[position], metric)
+        scores[position] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if 0 < limit < len(candidates):
+            kth = -np.partition(-scores[candidates], limit - 1)[limit - 1]
+            candidates = candidates[scores[candidates] >= kth]
+        top = candidates[np.argsort(-scores[candidates], kind='stable')][:limit]
+        return [(self.movie_ids[pos].item(), float(scores[pos])) for pos in top]
+
+    def get_stats(self):
+        return {
+            'movies': len(self.bits),
+            'genres': len(self.genres),
+            'memory_bytes': int(self.bits.nbytes)
+        }
+
+class GenreInvertedIndex:
+    """Índice invertido género -> películas, con listas pre-ordenadas por rating y por popularidad
+
+    Cada género guarda sus películas como array ordenado de posiciones del catálogo
+    (para intersección/unión de arrays ordenados en consultas AND/OR) y, bajo demanda,
+    una lista ordenada de claves (-media, -ratings, posición) o (-ratings, -media, posición)
+    por cada orden. Las estadísticas se mantienen con cada lote de ratings y cada película
+    que cambia se recoloca con búsqueda binaria en las listas ya ordenadas de sus géneros.
+    """
+
+    SORTS = ('rating', 'popularity')
+    MATCHES = ('any', 'all')
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.ready = False
+        self.movie_ids = np.zeros(0, dtype=np.int64)
+        self.movie_pos = {}
+        self.genre_names = {}
+        self._postings = {}
+        self._movie_genres = []
+        self._avg = np.zeros(0)
+        self._count = np.zeros(0, dtype=np.int64)
+        self._ranked = {}
+        self._lock = threading.Lock()
+
+    def set_catalog(self, movie_index):
+        """Construir las listas de cada género desde el catálogo (al cargar o reconstruir el motor)"""
+        movie_ids = np.array(sorted(movie_index), dtype=np.int64)
+        movie_pos = {movie_id: pos for pos, movie_id in enumerate(movie_ids.tolist())}
+        genre_names, members, movie_genres = {}, {}, []
+        for movie_id, position in movie_pos.items():
+            keys = []
+            for genre in GenreBitsets._split(movie_index[movie_id].get('genres')):
+                key = genre.lower()
+                genre_names.setdefault(key, genre)
+                members.setdefault(key, []).append(position)
+                keys.append(key)
+            movie_genres.append(keys)
+        postings = {key: np.array(positions, dtype=np.int32) for key, positions in members.items()}
+
+        stats = self.stats.get_many(movie_ids.tolist())
+        count = np.zeros(len(movie_ids), dtype=np.int64)
+        total = np.zeros(len(movie_ids))
+        for movie_id, (movie_count, movie_sum) in stats.items():
+            count[movie_pos[movie_id]] = movie_count
+            total[movie_pos[movie_id]] = movie_sum
+
+        with self._lock:
+            self.movie_ids, self.movie_pos = movie_ids, movie_pos
+            self.genre_names, self._postings = genre_names, postings
+            self._movie_genres = movie_genres
+            self._count = count
+            self._avg = np.divide(total, count, out=np.zeros(len(count)), where=count > 0)
+            self._ranked = {}
+            self.ready = True
+        logger.info(f"✅ Índice invertido de géneros: {len(postings)} géneros, {len(movie_ids)} películas")
+
+    def _key(self, position, sort):
+        """Clave de orden de una película (ascendente = primero la mejor; empates por movieId)"""
+        avg, count = float(self._avg[position]), int(self._count[position])
+        if sort == 'rating':
+            return (-avg, -count, position)
+        return (-count, -avg, position)
+
+    def update(self, movie_ids):
+        """Actualizar las estadísticas de las películas que cambiaron y recolocarlas en sus listas"""
+        if not self.ready or not movie_ids:
+            return
+        stats = self.stats.get_many(movie_ids)
+        with self._lock:
+            for movie_id in movie_ids:
+                position = self.movie_pos.get(movie_id)
+                if position is None:
+                    continue
+                ranked = [(self._ranked[key, sort], sort) for key in self._movie_genres[position]
+                          for sort in self.SORTS if (key, sort) in self._ranked]
+                for entries, sort in ranked:
+                    old_key = self._key(position, sort)
+                    index = bisect_left(entries, old_key)
+                    if index < len(entries) and entries[index] == old_key:
+                        del entries[index]
+
+                movie_count, movie_sum = stats.get(movie_id, (0, 0.0))
+                self._count[position] = movie_count
+                self._avg[position] = movie_sum / movie_count if movie_count else 0.0
+                for entries, sort in ranked:
+                    insort(entries, self._key(position, sort))
+
+    def _ranked_posting(self, genre, sort):
+        """Lista ordenada de claves de un género (se ordena una vez y luego se mantiene)"""
+        ranked = self._ranked.get((genre, sort))
+        if ranked is None:
+            positions = self._postings.get(genre, np.zeros(0, dtype=np.int32))
+            ranked = sorted(self._key(position, sort) for position in positions.tolist())
+            self._ranked[(genre, sort)] = ranked
+        return ranked
+
+    def _sorted_positions(self, positions, sort):
+        """Posiciones ordenadas por rating o popularidad (empates por movieId)"""
+        avg, count = self._avg[positions], self._count[positions]
+        if sort == 'rating':
+            order = np.lexsort((positions, -count, -avg))
+        else:
+            order = np.lexsort((positions, -avg, -count))
+        return positions[order]
+
+    def query(self, genres, match='any', sort='rating', limit=20, offset=0):
+        """Página de películas de uno o varios géneros: (movieIds, total)
+
+        match='any' es la unión de las listas (OR) y match='all' la intersección (AND).
+        """
+        if sort not in self.SORTS:
+            raise ValueError(f"Orden no válido: {sort}. Disponibles: {list(self.SORTS)}")
+        if match not in self.MATCHES:
+            raise ValueError(f"Modo no válido: {match}. Disponibles: {list(self.MATCHES)}")
+        keys = list(dict.fromkeys(genre.strip().lower() for genre in genres if genre.strip()))
+
+        with self._lock:
+            if len(keys) == 1:
+                ranked = self._ranked_posting(keys[0], sort)
+                page = [key[-1] for key in ranked[offset:offset + limit]]
+                return self.movie_ids[page].tolist(), len(ranked)
+
+            empty = np.zeros(0, dtype=np.int32)
+            postings = [self._postings.get(key, empty) for key in keys]
+            if not postings:
+                positions = empty
+            elif match == 'all':
+                positions = functools.reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), postings)
+            else:
+                positions = functools.reduce(np.union1d, postings)
+            ranked = self._sorted_positions(positions, sort)
+            page = ranked[offset:offset + limit]
+            return self.movie_ids[page].tolist(), len(ranked)
+
+    def genre_counts(self):
+        """[{'genre', 'count'}] ordenado por número de películas"""
+        with self._lock:
+            counts = [(self.genre_names[key], len(positions)) for key, positions in self._postings.items()]
+        counts.sort(key=lambda item: (-item[1], item[0]))
+        return [{'genre': genre, 'count': count} for genre, count in counts]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'genres': len(self._postings),
+                'movies': len(self.movie_ids),
+                'ranked_lists': len(self._ranked),
+                'memory_bytes': int(sum(positions.nbytes for positions in self._postings.values()))
+            }
+
+# Instancia global
+genre_index = GenreInvertedIndex(movie_stats)
@@ -0,0 +1,130 @@
+import time
+import numpy as np
+from scipy import sparse
+import logging
+
+from config import Config
+from models.item_neighbors import top_n_rows
+
+logger = logging.getLogger(__name__)
+
+class BipartiteGraph:
+    """Recomendador por paseo aleatorio con reinicio (PageRank personalizado) en el grafo usuario-película
+
+    La matriz de ratings es un grafo bipartito: cada rating es una arista usuario-película con
+    peso igual al rating. Un paso del paseo va de las películas a los usuarios que las
+    puntuaron y vuelve a las películas de esos usuarios, repartiendo la masa en proporción al
+    peso de las aristas; con probabilidad `restart` se vuelve a las semillas (las películas
+    del usuario o la película de partida). Por iteración:
+        m ← (1 - restart) · T_pu · T_up · m + restart · semilla
+    con dos productos dispersos matriz-vector (T_up = R normalizada por columnas, T_pu = Rᵀ
+    normalizada por usuario), sin materializar la matriz película x película.
+
+    La iteración termina al converger (cambio L1 < tolerance) o al agotar max_iterations, así la
+    latencia tiene una cota fija. Con `prune` cada paso conserva solo los `prune` usuarios y
+    películas con más masa: los productos tocan solo sus columnas (coste acotado por sus
+    grados en lugar de por el número de ratings) a cambio de una aproximación.
+
+    Las aristas se construyen en cada carga completa del motor; entre cargas, la semilla de un
+    usuario sale de sus ratings actuales en la instantánea (recommend).
+    """
+
+    def __init__(self, ratings, user_ids, movie_ids):
+        start = time.time()
+        ratings = sparse.csr_matrix(ratings, dtype=np.float64)
+        self.ratings = ratings
+        self.user_ids = np.asarray(user_ids)
+        self.movie_ids = np.asarray(movie_ids)
+        self.user_pos = {user_id: pos for pos, user_id in enumerate(self.user_ids.tolist())}
+        self.movie_pos = {movie_id: pos for pos, movie_id in enumerate(self.movie_ids.tolist())}
+
+        def inverse(degree):
+            return np.divide(1.0, degree, out=np.zeros_like(degree), where=degree > 0)
+
+        movie_degree = np.asarray(ratings.sum(axis=0)).ravel()
+        user_degree = np.asarray(ratings.sum(axis=1)).ravel()
+        # Columnas estocásticas: de cada película a sus usuarios y de cada usuario a sus películas
+        self._to_users = sparse.csc_matrix(ratings @ sparse.diags(inverse(movie_degree)))
+        self._to_movies = sparse.csc_matrix(ratings.T @ sparse.diags(inverse(user_degree)))
+        self.walks = 0
+        self.iterations = 0
+        logger.info(f"✅ Grafo usuario-película: {len(self.user_ids)} usuarios, {len(self.movie_ids)} películas, "
+                    f"{ratings.nnz} aristas en {time.time() - start:.3f}s")
+
+    @staticmethod
+    def _prune(vector, prune):
+        """Dejar solo las `prune` entradas con más masa"""
+        if prune and np.count_nonzero(vector) > prune:
+            keep = np.argpartition(-vector, prune - 1)[:prune]
+            pruned = np.zeros_like(vector)
+            pruned[keep] = vector[keep]
+            return pruned
+        return vector
+
+    @staticmethod
+    def _step(transition, vector):
+        """transition · vector; si el vector es disperso solo se leen las columnas con masa"""
+        active = np.flatnonzero(vector)
+        if len(active) < len(vector) // 4:
+            return transition[:, active] @ vector[active]
+        return transition @ vector
+
+    def random_walk(self, seed, restart=None, max_iterations=None, tolerance=None, prune=None):
+        """Puntuación estacionaria de cada película para una semilla (vector sobre películas)"""
+        restart = restart or Config.GRAPH_RESTART
+        max_iterations = max_iterations or Config.GRAPH_MAX_ITERATIONS
+        tolerance = tolerance or Config.GRAPH_TOLERANCE
+        prune = Config.GRAPH_PRUNE_TOP_K if prune is None else prune
+
+        seed = seed / seed.sum()
+        scores = seed.copy()
+        for iteration in range(1, max_iterations + 1):
+            users = self._prune(self._step(self._to_users, scores), prune)
+            updated = (1 - restart) * self._step(self._to_movies, users) + restart * seed
+            updated = self._prune(updated, prune)
+            change = np.abs(updated - scores).sum()
+            scores = updated
+            if change < tolerance:
+                break
+        self.walks += 1
+        self.iterations += iteration
+        return scores
+
+    def _top(self, scores, exclude, limit):
+        scores[exclude] = 0.0
+        top, top_scores = top_n_rows(scores[None, :], limit)
+        return [(self.movie_ids[pos].item(), float(score)) for pos, score in zip(top[0], top_scores[0]) if pos >= 0]
+
+    def recommend_for_movie(self, movie_id, limit=10, **params):
+        """Películas más alcanzables desde `movie_id`: [(movieId, score)], o None si no está en el grafo"""
+        position = self.movie_pos.get(movie_id)
+        if position is None:
+            return None
+        seed = np.zeros(len(self.movie_ids))
+        seed[position] = 1.0
+        return self._top(self.random_walk(seed, **params), [position], limit)
+
+    def recommend(self, rated, limit=10, **params):
+        """Películas no vistas más alcanzables desde las puntuadas ({movieId: rating}, semilla ponderada por rating)
+
+        Las puntuaciones vienen de la instantánea, así los ratings posteriores a la construcción
+        del grafo ya cuentan en la semilla y en las películas excluidas.
+        """
+        positions = np.fromiter((self.movie_pos.get(movie_id, -1) for movie_id in rated),
+                                dtype=np.int64, count=len(rated))
+        weights = np.fromiter(rated.values(), dtype=np.float64, count=len(rated))
+        known = positions >= 0
+        if not (weights[known] > 0).any():
+            return []
+        seed = np.zeros(len(self.movie_ids))
+        seed[positions[known]] = weights[known]
+        return self._top(self.random_walk(seed, **params), positions[known], limit)
+
+    def get_stats(self):
+        return {
+            'users': len(self.user_ids),
+            'movies': len(self.movie_ids),
+            'edges': int(self.ratings.nnz),
+            'walks': self.walks,
+            'avg_iterations': round(self.iterations / self.walks, 2) if self.walks else 0
+        }
@@ -0,0 +1,119 @@
+import time
+import numpy as np
+from scipy import sparse
+import logging
+
+from config import Config
+from models.topk_kernel import top_k_similar
+
+logger = logging.getLogger(__name__)
+
+def top_n_rows(scores, n):
+    """Las n columnas con mayor score > 0 de cada fila, ordenadas (-1 donde no hay suficientes)
+
+    Devuelve (posiciones, scores) de forma filas x n; los empates se deshacen por posición.
+    """
+    rows, columns = scores.shape
+    size = min(n, columns)
+    top = np.argpartition(-scores, size - 1, axis=1)[:, :size] if size < columns else \
+        np.tile(np.arange(columns), (rows, 1))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.lexsort((top, -top_scores), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    top[top_scores <= 0] = -1
+    if size < n:
+        top = np.pad(top, ((0, 0), (0, n - size)), constant_values=-1)
+        top_scores = np.pad(top_scores, ((0, 0), (0, n - size)))
+    return top, top_scores
+
+def top_n_sparse(scores, n):
+    """Como top_n_rows para una CSR: solo ordena las entradas guardadas, sin densificar las filas"""
+    scores = sparse.csr_matrix(scores)
+    rows = np.repeat(np.arange(scores.shape[0]), np.diff(scores.indptr))
+    positive = scores.data > 0
+    rows, columns, data = rows[positive], scores.indices[positive], scores.data[positive]
+    order = np.lexsort((columns, -data, rows))
+    rows, columns, data = rows[order], columns[order], data[order]
+    # Puesto de cada entrada dentro de su fila (ya ordenadas por fila)
+    starts = np.searchsorted(rows, np.arange(scores.shape[0]))
+    rank = np.arange(len(rows)) - starts[rows]
+    keep = rank < n
+    top = np.full((scores.shape[0], n), -1, dtype=np.int64)
+    top_scores = np.zeros((scores.shape[0], n))
+    top[rows[keep], rank[keep]] = columns[keep]
+    top_scores[rows[keep], rank[keep]] = data[keep]
+    return top, top_scores
+
+class ItemNeighborMatrix:
+    """Matriz dispersa película x película con los k vecinos más similares (coseno) de cada película
+
+    Es la base del recomendador item-based: con r = fila de ratings del usuario (CSR 1 x n),
+    score = r · N puntúa de una vez todas las películas vecinas de las que ya vio, ponderando
+    cada similitud por su rating (score_users hace lo mismo para un bloque de usuarios en el
+    trabajo batch). Se calcula con el kernel top-k por bloques al construir la
+    instantánea; las compactaciones la reutilizan (la fila del usuario sí es la actual).
+    """
+
+    def __init__(self, ratings, movie_ids, k=None, block_size=None):
+        """`ratings`: matriz dispersa usuarios x películas; `movie_ids`: id de cada columna"""
+        start = time.time()
+        k = k or Config.ITEM_NEIGHBORS
+        self.movie_ids = np.asarray(movie_ids)
+        self.movie_pos = {movie_id: pos for pos, movie_id in enumerate(self.movie_ids.tolist())}
+
+        items = sparse.csr_matrix(ratings.T)
+        norms = np.sqrt(np.asarray(items.multiply(items).sum(axis=1)).ravel())
+        items = sparse.csr_matrix(sparse.diags(np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)) @ items)
+        self.neighbors = top_k_similar(items, k, block_size=block_size)
+        self.k = k
+        self.build_seconds = time.time() - start
+        logger.info(f"✅ Matriz de vecinos película-película: {len(self.movie_ids)} películas, "
+                    f"{self.neighbors.nnz} vecinos en {self.build_seconds:.2f}s")
+
+    def score_users(self, rows):
+        """Puntuar todas las películas para un bloque de usuarios (CSR usuarios x películas)
+
+        Devuelve (scores, rating estimado) como CSR: solo hay entradas en las películas vecinas
+        de las ya vistas, y ninguna en las que cada usuario ya vio. Así un bloque grande de
+        usuarios no ocupa usuarios x películas en memoria.
+        """
+        rows = sparse.csr_matrix(rows)
+        indicator = rows.copy()
+        indicator.data = np.ones_like(indicator.data)
+        # Filas de ratings y filas indicadoras apiladas: un solo producto da numerador y soporte
+        product = sparse.csr_matrix(sparse.vstack([rows, indicator], format='csr') @ self.neighbors)
+        scores, support = product[:rows.shape[0]], product[rows.shape[0]:]
+
+        # Las películas ya vistas (columnas de cada fila CSR) no se recomiendan
+        scores = sparse.csr_matrix(scores - scores.multiply(indicator))
+        scores.eliminate_zeros()
+        support.data = 1.0 / support.data
+        predicted = sparse.csr_matrix(scores.multiply(support))
+        return scores, predicted
+
+    def recommend(self, rated, limit=10):
+        """Películas no vistas por orden de Σ similitud · rating sobre las películas puntuadas
+
+        `rated` es {movieId: rating} del usuario. Devuelve [(movieId, score, rating estimado)],
+        donde el rating estimado es la media de sus ratings ponderada por similitud.
+        """
+        positions = [self.movie_pos[movie_id] for movie_id in rated if movie_id in self.movie_pos]
+        if not positions:
+            return []
+        values = [rated[self.movie_ids[pos].item()] for pos in positions]
+        row = sparse.csr_matrix((values, positions, [0, len(positions)]), shape=(1, len(self.movie_ids)))
+        scores, predicted = self.score_users(row)
+        top, top_scores = top_n_sparse(scores, limit)
+        return [
+            (self.movie_ids[pos].item(), float(score), float(predicted[0, pos]))
+            for pos, score in zip(top[0], top_scores[0]) if pos >= 0
+        ]
+
+    def get_stats(self):
+        return {
+            'movies': len(self.movie_ids),
+            'k': self.k,
+            'neighbors': int(self.neighbors.nnz),
+            'build_seconds': round(self.build_seconds, 3)
+        }
@@ -0,0 +1,444 @@
+import copy
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy import sparse
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class ItemSimilarityIndex:
+    """Índice de similitud película-película con estadísticas suficientes
+
+    Por película guarda n (número de ratings), s (suma) y q (suma de cuadrados), y para
+    las películas consultadas su fila de productos escalares G[i, :] = R[:, i]ᵀ R.
+    Con eso cosine, pearson y euclidean salen en O(1) por par (sobre el vector completo
+    de usuarios, con ceros donde no hay rating, igual que calculate_similarity);
+    manhattan se calcula directamente a partir de las columnas.
+
+    Un rating nuevo o modificado (u, j) actualiza n/s/q de j, la fila de j y la entrada j
+    de las filas cacheadas de las películas que u ya había puntuado: O(ratings de u) por
+    cambio, independiente del tamaño del catálogo. Las listas de vecinos afectadas se
+    descartan y se recalculan al pedirse.
+
+    Un índice publicado en una instantánea no se modifica: los cambios se aplican a una copia
+    (updated) que va en la instantánea compactada. Mientras se aplican viven en un overlay
+    sobre la matriz base (CSR), y al terminar se incorporan a ella.
+    """
+
+    METHODS = ('cosine', 'euclidean', 'manhattan', 'pearson')
+
+    def __init__(self, user_movie_matrix, max_rows=None):
+        self.max_rows = max_rows or Config.SIMILARITY_ROW_CACHE_SIZE
+        self._lock = threading.RLock()
+        self._rows = OrderedDict()
+        self._shared_rows = set()
+        self._neighbors = {}
+        self._listed_in = {}
+        self.updates = 0
+        self._set_base(user_movie_matrix)
+
+        matrix = self._base_csc
+        self.n = np.diff(matrix.indptr).astype(np.float64)
+        self.s = np.asarray(matrix.sum(axis=0)).ravel()
+        self.q = np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel()
+
+    @property
+    def n_users(self):
+        return len(self.user_pos)
+
+    def _set_base(self, user_movie_matrix):
+        self.user_pos = {user_id: pos for pos, user_id in enumerate(user_movie_matrix.index)}
+        self.movie_pos = {movie_id: pos for pos, movie_id in enumerate(user_movie_matrix.columns)}
+        self.movie_ids = list(user_movie_matrix.columns)
+        self._base = sparse.csr_matrix(user_movie_matrix.values)
+        self._base_csc = self._base.tocsc()
+        self._overlay_by_user = {}
+        self._overlay_by_item = {}
+
+    def updated(self, changes):
+        """Copia del índice con los cambios aplicados, para la instantánea siguiente
+
+        Este índice no se toca (lo siguen leyendo las peticiones en curso). La copia comparte
+        la CSR base y las filas cacheadas hasta que las modifica; estadísticas, posiciones y
+        listas de vecinos se copian.
+        """
+        with self._lock:
+            index = copy.copy(self)
+            index._lock = threading.RLock()
+            index._rows = OrderedDict(self._rows)
+            index._shared_rows = set(self._rows)
+            index._neighbors = dict(self._neighbors)
+            index._listed_in = {movie_id: set(keys) for movie_id, keys in self._listed_in.items()}
+            index.user_pos, index.movie_pos = dict(self.user_pos), dict(self.movie_pos)
+            index.movie_ids = list(self.movie_ids)
+            index.n, index.s, index.q = self.n.copy(), self.s.copy(), self.q.copy()
+            index._overlay_by_user = {user: dict(items) for user, items in self._overlay_by_user.items()}
+            index._overlay_by_item = {item: dict(users) for item, users in self._overlay_by_item.items()}
+        index.apply(changes)
+        index._compact(changes)
+        return index
+
+    def _compact(self, changes):
+        """Pasar a la base los cambios del overlay
+
+        Solo se parchean esas celdas de la CSR base (una suma dispersa que crea una CSR nueva),
+        sin reconstruirla desde la matriz densa; las estadísticas y filas cacheadas ya incluían
+        los cambios.
+        """
+        with self._lock:
+            cells = {}
+            for change in changes:
+                user, item = self.user_pos.get(change['userId']), self.movie_pos.get(change['movieId'])
+                overlay = self._overlay_by_user.get(user)
+                if overlay and item in overlay:
+                    cells[user, item] = overlay[item]
+            if not cells:
+                return
+
+            users = np.fromiter((user for user, _ in cells), dtype=np.int64, count=len(cells))
+            items = np.fromiter((item for _, item in cells), dtype=np.int64, count=len(cells))
+            values = np.fromiter(cells.values(), dtype=np.float64, count=len(cells))
+            shape = (len(self.user_pos), len(self.movie_ids))
+            base = self._base
+            if base.shape != shape:
+                base = base.copy()
+                base.resize(shape)
+            current = np.asarray(base[users, items]).ravel()
+            base = (base + sparse.csr_matrix((values - current, (users, items)), shape=shape)).tocsr()
+            base.eliminate_zeros()
+            self._base, self._base_csc = base, base.tocsc()
+
+            for user, item in cells:
+                for overlay, key, other in ((self._overlay_by_user, user, item), (self._overlay_by_item, item, user)):
+                    overlay[key].pop(other, None)
+                    if not overlay[key]:
+                        del overlay[key]
+
+    # --- Acceso a la matriz efectiva (base + overlay) ---
+
+    def _base_value(self, user, item):
+        if user >= self._base.shape[0] or item >= self._base.shape[1]:
+            return 0.0
+        return float(self._base[user, item])
+
+    def _user_items(self, user):
+        """Películas (posiciones) y ratings de un usuario"""
+        items = {}
+        if user < self._base.shape[0]:
+            start, end = self._base.indptr[user], self._base.indptr[user + 1]
+            items = dict(zip(self._base.indices[start:end], self._base.data[start:end]))
+        items.update(self._overlay_by_user.get(user, {}))
+        return np.fromiter(items.keys(), dtype=np.int64, count=len(items)), \
+            np.fromiter(items.values(), dtype=np.float64, count=len(items))
+
+    def _item_users(self, item):
+        """Usuarios (posiciones) y ratings de una película"""
+        users = {}
+        if item < self._base_csc.shape[1]:
+            start, end = self._base_csc.indptr[item], self._base_csc.indptr[item + 1]
+            users = dict(zip(self._base_csc.indices[start:end], self._base_csc.data[start:end]))
+        users.update(self._overlay_by_item.get(item, {}))
+        return np.fromiter(users.keys(), dtype=np.int64, count=len(users)), \
+            np.fromiter(users.values(), dtype=np.float64, count=len(users))
+
+    def _value(self, user, item):
+        overlay = self._overlay_by_user.get(user)
+        if overlay and item in overlay:
+            return overlay[item]
+        return self._base_value(user, item)
+
+    def _set_overlay(self, user, item, value):
+        self._overlay_by_user.setdefault(user, {})[item] = value
+        self._overlay_by_item.setdefault(item, {})[user] = value
+
+    def _ensure_positions(self, user_id, movie_id):
+        """Posiciones de usuario y película, ampliando el índice si son nuevos"""
+        user = self.user_pos.get(user_id)
+        if user is None:
+            user = self.user_pos[user_id] = len(self.user_pos)
+        item = self.movie_pos.get(movie_id)
+        if item is None:
+            item = self.movie_pos[movie_id] = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+            self.n = np.append(self.n, 0.0)
+            self.s = np.append(self.s, 0.0)
+            self.q = np.append(self.q, 0.0)
+        return user, item
+
+    # --- Filas de productos escalares ---
+
+    def _row(self, item):
+        """Fila G[item, :] (cacheada con LRU)"""
+        row = self._rows.get(item)
+        if row is None:
+            row = self._compute_row(item)
+            self._rows[item] = row
+            self._shared_rows.discard(item)
+            if len(self._rows) > self.max_rows:
+                self._rows.popitem(last=False)
+        else:
+            self._rows.move_to_end(item)
+
+        if len(row) < len(self.movie_ids):
+            row = np.concatenate([row, np.zeros(len(self.movie_ids) - len(row))])
+            self._rows[item] = row
+            self._shared_rows.discard(item)
+        return row
+
+    def _writable_row(self, item):
+        """Fila G[item, :] propia de este índice (copia la compartida con el índice original)"""
+        row = self._row(item)
+        if item in self._shared_rows:
+            row = self._rows[item] = row.copy()
+            self._shared_rows.discard(item)
+        return row
+
+    def _compute_row(self, item):
+        users, values = self._item_users(item)
+        row = np.zeros(len(self.movie_ids))
+        in_base = users < self._base.shape[0]
+        if in_base.any():
+            row[:self._base.shape[1]] += self._base[users[in_base]].T @ values[in_base]
+        # Corregir las entradas que el overlay ha cambiado respecto a la base
+        for user, value in zip(users, values):
+            for other, new_value in self._overlay_by_user.get(user, {}).items():
+                row[other] += value * (new_value - self._base_value(user, other))
+        return row
+
+    # --- Actualización incremental ---
+
+    def apply(self, changes):
+        """Aplicar ratings nuevos o modificados [{'userId', 'movieId', 'rating'}]
+
+        Modifica este índice: para uno ya publicado usar updated(). Devuelve los movieIds cuya fila de similitud cambió.
+        """
+        affected = set()
+        with self._lock:
+            for change in changes:
+                user, item = self._ensure_positions(change['userId'], change['movieId'])
+                new_value = float(change['rating'])
+                old_value = self._value(user, item)
+                delta = new_value - old_value
+                if delta == 0:
+                    continue
+
+                items, values = self._user_items(user)
+                if old_value == 0:
+                    self.n[item] += 1
+                self.s[item] += delta
+                self.q[item] += new_value ** 2 - old_value ** 2
+
+                # G[item, k] y G[k, item] cambian en delta * R[u, k] para cada k puntuada por u
+                if item in self._rows:
+                    row = self._writable_row(item)
+                    row[items] += delta * values
+                    row[item] += delta * new_value
+                for other, value in zip(items, values):
+                    if other != item and other in self._rows:
+                        self._writable_row(other)[item] += delta * value
+
+                self._set_overlay(user, item, new_value)
+                affected.add(item)
+                affected.update(items.tolist())
+                self.updates += 1
+
+            affected_ids = {self.movie_ids[item] for item in affected}
+            self._invalidate_neighbors(affected_ids)
+        return affected_ids
+
+    def _invalidate_neighbors(self, movie_ids):
+        """Descartar las listas de vecinos de las películas afectadas y las que las contienen"""
+        stale = set()
+        for movie_id in movie_ids:
+            stale.update(self._listed_in.pop(movie_id, ()))
+            for method in self.METHODS:
+                if (movie_id, method) in self._neighbors:
+                    stale.add((movie_id, method))
+        for key in stale:
+            neighbors = self._neighbors.pop(key, None)
+            for neighbor_id, _ in neighbors or ():
+                listed = self._listed_in.get(neighbor_id)
+                if listed:
+                    listed.discard(key)
+
+    # --- Consultas ---
+
+    def _scores(self, item, method):
+        """Similitud de `item` con todas las películas (vectorizado)"""
+        if method == 'manhattan':
+            users, values = self._item_users(item)
+            # Σ_u |R[u,k] - R[u,item]|: usuarios que no puntuaron item aportan R[u,k] (suma de columna)
+            if len(users):
+                block = np.vstack([self._dense_user_row(user) for user in users])
+                distance = self.s - block.sum(axis=0) + np.abs(block - values[:, None]).sum(axis=0)
+            else:
+                distance = self.s.copy()
+            distance = np.maximum(distance, 0.0)
+            scores = np.where(distance > 0, 1 / (1 + distance), 1.0)
+            return scores
+
+        row = self._row(item)
+        if method == 'cosine':
+            norms = np.sqrt(self.q[item] * self.q)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(norms > 0, row / norms, 0.0)
+
+        if method == 'euclidean':
+            distance = np.sqrt(np.maximum(self.q[item] + self.q - 2 * row, 0.0))
+            return np.where(distance > 0, 1 / (1 + distance), 1.0)
+
+        if method == 'pearson':
+            if self.n_users < 2:
+                return np.zeros(len(self.movie_ids))
+            variance = self.q - self.s ** 2 / self.n_users
+            covariance = row - self.s[item] * self.s / self.n_users
+            denominator = np.sqrt(np.maximum(variance[item], 0.0) * np.maximum(variance, 0.0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(denominator > 1e-12, covariance / denominator, 0.0)
+
+        raise ValueError(f"Método de similitud no válido: {method}")
+
+    def _dense_user_row(self, user):
+        row = np.zeros(len(self.movie_ids))
+        items, values = self._user_items(user)
+        row[items] = values
+        return row
+
+    def similarity(self, movie_id1, movie_id2, method='cosine'):
+        """Similitud entre dos películas (0.0 si alguna no tiene ratings)"""
+        with self._lock:
+            item1, item2 = self.movie_pos.get(movie_id1), self.movie_pos.get(movie_id2)
+            if item1 is None or item2 is None:
+                return 0.0
+            if method == 'manhattan':
+                v1, v2 = self._dense_column(item1), self._dense_column(item2)
+                distance = np.abs(v1 - v2).sum()
+                return 1 / (1 + distance) if distance > 0 else 1.0
+            return float(self._scores(item1, method)[item2])
+
+    def pairwise(self, movie_ids, method='cosine'):
+        """Matriz (m x m) de similitudes entre varias películas con un solo producto disperso
+
+        Coincide par a par con similarity(); las películas sin ratings tienen similitud 0.
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Método de similitud no válido: {method}")
+        with self._lock:
+            positions = [self.movie_pos.get(movie_id) for movie_id in movie_ids]
+            known = np.array([item is not None for item in positions], dtype=bool)
+            items = np.array([item for item in positions if item is not None], dtype=np.int64)
+            similarity = np.zeros((len(movie_ids), len(movie_ids)))
+            if not len(items):
+                return similarity
+            columns = self._columns(items)
+            n_users = self.n_users
+            s, q = self.s[items], self.q[items]
+
+        similarity[np.ix_(known, known)] = self._block_scores(columns, s, q, columns, s, q, n_users, method)
+        return similarity
+
+    @staticmethod
+    def _block_scores(left, left_s, left_q, right, right_s, right_q, n_users, method):
+        """Similitudes entre dos grupos de columnas (usuarios x a, usuarios x b) -> a x b"""
+        if method == 'manhattan':
+            # |a - b| = a + b - 2·min(a, b) con ratings >= 0, y Σ_u min(a, b) se descompone por
+            # niveles: Σ_k (l_k - l_k-1) · #{u: a >= l_k y b >= l_k} (un producto por valor distinto)
+            shared_min = np.zeros((left.shape[1], right.shape[1]))
+            previous = 0.0
+            for level in np.union1d(left.data, right.data):
+                left_above = (left >= level).astype(np.float64)
+                right_above = (right >= level).astype(np.float64)
+                shared_min += (level - previous) * (left_above.T @ right_above).toarray()
+                previous = level
+            distance = np.maximum(left_s[:, None] + right_s[None, :] - 2 * shared_min, 0.0)
+            return np.where(distance > 0, 1 / (1 + distance), 1.0)
+
+        products = (left.T @ right).toarray()
+        if method == 'cosine':
+            norms = np.sqrt(np.outer(left_q, right_q))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(norms > 0, products / norms, 0.0)
+        if method == 'euclidean':
+            distance = np.sqrt(np.maximum(left_q[:, None] + right_q[None, :] - 2 * products, 0.0))
+            return np.where(distance > 0, 1 / (1 + distance), 1.0)
+        if n_users < 2:
+            return np.zeros(products.shape)
+        left_variance = np.maximum(left_q - left_s ** 2 / n_users, 0.0)
+        right_variance = np.maximum(right_q - right_s ** 2 / n_users, 0.0)
+        covariance = products - np.outer(left_s, right_s) / n_users
+        denominator = np.sqrt(np.outer(left_variance, right_variance))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denominator > 1e-12, covariance / denominator, 0.0)
+
+    def _columns(self, items):
+        """Columnas efectivas (base + overlay) de varias películas como matriz CSC usuarios x m"""
+        indices, data, indptr = [], [], [0]
+        for item in items:
+            users, values = self._item_users(item)
+            indices.append(users)
+            data.append(values)
+            indptr.append(indptr[-1] + len(users))
+        matrix = sparse.csc_matrix((np.concatenate(data), np.concatenate(indices), indptr),
+                                   shape=(self.n_users, len(items)))
+        matrix.sort_indices()
+        return matrix
+
+    def _dense_column(self, item):
+        column = np.zeros(self.n_users)
+        users, values = self._item_users(item)
+        column[users] = values
+        return column
+
+    def neighbors(self, movie_id, method='cosine', k=None, candidates=None):
+        """Top-k películas más similares [(movieId, similitud)] con similitud > 0
+
+        Con `candidates` (movieIds de un índice aproximado) solo se puntúan esas películas
+        en lugar del catálogo entero. Esas listas aproximadas no se cachean: la cache solo
+        guarda listas exactas, que sirven a ambos tipos de llamada.
+        """
+        k = k or Config.MAX_RECOMMENDATIONS
+        key = (movie_id, method)
+        with self._lock:
+            cached = self._neighbors.get(key)
+            if cached is not None and k <= Config.MAX_RECOMMENDATIONS:
+                return cached[:k]
+
+            item = self.movie_pos.get(movie_id)
+            if item is None:
+                return []
+            limit, k = k, max(k, Config.MAX_RECOMMENDATIONS)
+            if candidates is None:
+                items = np.arange(len(self.movie_ids))
+                scores = self._scores(item, method)
+            else:
+                items = np.array(sorted({self.movie_pos[other] for other in candidates if other in self.movie_pos}),
+                                 dtype=np.int64)
+                if not len(items):
+                    return []
+                scores = self._block_scores(self._columns([item]), self.s[[item]], self.q[[item]],
+                                            self._columns(items), self.s[items], self.q[items],
+                                            self.n_users, method)[0]
+            scores[items == item] = -np.inf
+            top = np.argpartition(-scores, min(k, len(scores) - 1))[:k] if len(scores) > k else np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind='stable')]
+            neighbors = [(self.movie_ids[items[other]], float(scores[other])) for other in top if scores[other] > 0]
+
+            if candidates is None:
+                self._neighbors[key] = neighbors
+                for neighbor_id, _ in neighbors:
+                    self._listed_in.setdefault(neighbor_id, set()).add(key)
+            return neighbors[:limit]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'movies': len(self.movie_ids),
+                'users': self.n_users,
+                'cached_rows': len(self._rows),
+                'cached_neighbor_lists': len(self._neighbors),
+                'overlay_ratings': sum(len(items) for items in self._overlay_by_user.values()),
+                'updates': self.updates
+            }
@@ -0,0 +1,183 @@
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+import logging
+
+from config import Config
+from database.mongo_client import mongo_manager
+from models.movie_stats import movie_stats
+
+logger = logging.getLogger(__name__)
+
+class Leaderboard:
+    """Ranking de películas para una combinación de reglas
+
+    `entries` es una lista ordenada de (-puntuación, movieId) con solo las películas que
+    cumplen el filtro, así una página es un slice O(limit). Cada cambio de estadísticas
+    recoloca la película con búsqueda binaria.
+    """
+
+    def __init__(self, min_ratings, formula, genre=None, decade=None, prior_mean=0.0):
+        self.min_ratings = min_ratings
+        self.formula = formula
+        self.genre = genre
+        self.decade = decade
+        self.prior_mean = prior_mean
+        self.entries = []
+        self.keys = {}
+
+    def score(self, count, total):
+        """Puntuación según la fórmula del ranking"""
+        average = total / count
+        if self.formula == 'average':
+            return average
+        if self.formula == 'bayesian':
+            # Media bayesiana (estilo IMDb): tira hacia la media global a las películas con pocos ratings
+            weight = self.min_ratings or 1
+            return (count * average + weight * self.prior_mean) / (count + weight)
+        if self.formula == 'count':
+            return float(count)
+        raise ValueError(f"Fórmula de ranking no válida: {self.formula}")
+
+    def update(self, movie_id, stats):
+        """Recolocar una película con sus estadísticas actuales ((count, sum) o None)"""
+        old_key = self.keys.pop(movie_id, None)
+        if old_key is not None:
+            position = bisect_left(self.entries, old_key)
+            if position < len(self.entries) and self.entries[position] == old_key:
+                del self.entries[position]
+
+        if stats and stats[0] >= self.min_ratings:
+            key = (-self.score(*stats), movie_id)
+            insort(self.entries, key)
+            self.keys[movie_id] = key
+
+class LeaderboardService:
+    """Rankings de popularidad en memoria compartidos por todos los caminos "populares"
+
+    Un ranking por (min_ratings, fórmula, género, década), construido bajo demanda desde
+    las estadísticas por película y mantenido de forma incremental con cada lote de
+    ratings. Mientras las estadísticas no están cargadas se recurre a MongoDB.
+    """
+
+    FORMULAS = ('average', 'bayesian', 'count')
+
+    def __init__(self, stats, max_boards=None):
+        self.stats = stats
+        self.max_boards = max_boards or Config.LEADERBOARD_MAX_BOARDS
+        self._boards = OrderedDict()
+        self._catalog = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.stats.loaded
+
+    def set_catalog(self, movie_index):
+        """Metadatos (géneros, década) de las películas para los rankings filtrados"""
+        catalog = {}
+        for movie_id, movie in movie_index.items():
+            year = movie.get('year')
+            catalog[movie_id] = (
+                {genre.lower() for genre in (movie.get('genres') or '').split('|') if genre},
+                int(year) // 10 * 10 if year and year == year else None
+            )
+        with self._lock:
+            self._catalog = catalog
+            self._boards.clear()
+
+    def _matches(self, board, movie_id):
+        if board.genre is None and board.decade is None:
+            return True
+        genres, decade = self._catalog.get(movie_id, (set(), None))
+        if board.genre is not None and board.genre not in genres:
+            return False
+        return board.decade is None or board.decade == decade
+
+    def _get_board(self, min_ratings, formula, genre, decade):
+        key = (min_ratings, formula, genre, decade)
+        board = self._boards.get(key)
+        if board is not None:
+            self._boards.move_to_end(key)
+            return board
+
+        board = Leaderboard(min_ratings, formula, genre, decade, prior_mean=self.stats.global_mean())
+        board.entries = sorted(
+            (-board.score(count, total), movie_id)
+            for movie_id, (count, total) in self.stats.items().items()
+            if count >= min_ratings and self._matches(board, movie_id)
+        )
+        board.keys = {movie_id: (score, movie_id) for score, movie_id in board.entries}
+
+        self._boards[key] = board
+        if len(self._boards) > self.max_boards:
+            self._boards.popitem(last=False)
+        logger.info(f"✅ Ranking {key} construido: {len(board.entries)} películas")
+        return board
+
+    def update(self, movie_ids):
+        """Recolocar en todos los rankings las películas cuyas estadísticas cambiaron"""
+        if not movie_ids:
+            return
+        stats = self.stats.get_many(movie_ids)
+        with self._lock:
+            for board in self._boards.values():
+                for movie_id in movie_ids:
+                    if self._matches(board, movie_id):
+                        board.update(movie_id, stats.get(movie_id))
+
+    def top(self, limit=10, offset=0, min_ratings=10, formula='average', genre=None, decade=None, min_avg=None):
+        """Página de un ranking: [{'movieId', 'avg_rating', 'rating_count', 'score'}]
+
+        `min_avg` corta el ranking en cuanto el rating medio baja del umbral (solo aplica
+        como corte exacto con la fórmula 'average'; con las demás filtra la página).
+        """
+        if formula not in self.FORMULAS:
+            raise ValueError(f"Fórmula de ranking no válida: {formula}")
+
+        if not self.ready:
+            return self._top_from_database(limit, offset, min_ratings, min_avg, genre, decade, formula)
+
+        genre = genre.lower() if genre else None
+        with self._lock:
+            board = self._get_board(min_ratings, formula, genre, decade)
+            page = board.entries[offset:offset + limit]
+        stats = self.stats.get_many([movie_id for _, movie_id in page])
+
+        results = []
+        for neg_score, movie_id in page:
+            count, total = stats.get(movie_id, (0, 0.0))
+            if not count:
+                continue
+            average = total / count
+            if min_avg is not None and average < min_avg:
+                if formula == 'average':
+                    break
+                continue
+            results.append({'movieId': movie_id, 'avg_rating': average, 'rating_count': count, 'score': -neg_score})
+        return results
+
+    def _top_from_database(self, limit, offset, min_ratings, min_avg, genre, decade, formula):
+        """Respaldo mientras las estadísticas no están cargadas (solo ranking por media, sin filtros)"""
+        if genre or decade or formula != 'average':
+            return []
+        rows = mongo_manager.get_popular_movies_sync(limit=offset + limit, min_ratings=min_ratings)[offset:]
+        return [
+            {'movieId': row['_id'], 'avg_rating': float(row['avg_rating']), 'rating_count': row['count'],
+             'score': float(row['avg_rating'])}
+            for row in rows if min_avg is None or row['avg_rating'] >= min_avg
+        ]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'boards': [
+                    {'min_ratings': key[0], 'formula': key[1], 'genre': key[2], 'decade': key[3],
+                     'size': len(board.entries)}
+                    for key, board in self._boards.items()
+                ]
+            }
+
+# Instancia global
+leaderboards = LeaderboardService(movie_stats)
@@ -0,0 +1,103 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class MovieStatsStore:
+    """Estadísticas de rating por película mantenidas de forma incremental
+
+    Se cargan una vez con una agregación de MongoDB y después se actualizan con cada
+    lote de ratings persistido (nuevo rating o cambio de uno existente), sin recalcular.
+    Los rankings de popularidad se construyen encima (models/leaderboards.py).
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.version = 0
+        self._counts = {}
+        self._sums = {}
+        self._lock = threading.Lock()
+
+    async def load(self, db):
+        """Cargar conteos y sumas con una sola agregación sobre la colección de ratings"""
+        pipeline = [
+            {'$group': {
+                '_id': '$movieId',
+                'count': {'$sum': 1},
+                'sum': {'$sum': '$rating'}
+            }}
+        ]
+        rows = await db.ratings.aggregate(pipeline).to_list(length=None)
+
+        counts = {row['_id']: int(row['count']) for row in rows}
+        sums = {row['_id']: float(row['sum']) for row in rows}
+
+        with self._lock:
+            self._counts = counts
+            self._sums = sums
+            self.loaded = True
+            self.version += 1
+        logger.info(f"✅ Estadísticas de {len(counts)} películas cargadas")
+
+    def apply(self, changes):
+        """Aplicar ratings persistidos: [{'movieId', 'rating', 'previous'}], con previous=None si es nuevo
+
+        Devuelve el conjunto de movieIds cuyas estadísticas cambiaron.
+        """
+        changed = set()
+        with self._lock:
+            for change in changes:
+                movie_id = change['movieId']
+                previous = change.get('previous')
+                if previous is not None and previous == change['rating']:
+                    continue
+
+                if previous is None or movie_id not in self._counts:
+                    self._counts[movie_id] = self._counts.get(movie_id, 0) + 1
+                    self._sums[movie_id] = self._sums.get(movie_id, 0.0) + change['rating']
+                else:
+                    self._sums[movie_id] += change['rating'] - previous
+                changed.add(movie_id)
+
+            if changed:
+                self.version += 1
+        return changed
+
+    def get(self, movie_id):
+        """Estadísticas de una película o None"""
+        with self._lock:
+            count = self._counts.get(movie_id)
+            if not count:
+                return None
+            return {'avg_rating': self._sums[movie_id] / count, 'rating_count': count}
+
+    def get_many(self, movie_ids):
+        """(conteo, suma) de varias películas bajo un único bloqueo: {movieId: (count, sum)}"""
+        with self._lock:
+            return {
+                movie_id: (self._counts[movie_id], self._sums[movie_id])
+                for movie_id in movie_ids if self._counts.get(movie_id)
+            }
+
+    def items(self):
+        """Copia de (conteo, suma) de todas las películas"""
+        with self._lock:
+            return {movie_id: (count, self._sums[movie_id]) for movie_id, count in self._counts.items()}
+
+    def global_mean(self):
+        """Rating medio de todo el catálogo"""
+        with self._lock:
+            total = sum(self._counts.values())
+            return sum(self._sums.values()) / total if total else 0.0
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'loaded': self.loaded,
+                'version': self.version,
+                'movies': len(self._counts),
+                'ratings': sum(self._counts.values())
+            }
+
+# Instancia global
+movie_stats = MovieStatsStore()
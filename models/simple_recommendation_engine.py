@@ -1,69 +1,517 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
 import numpy as np
 import pandas as pd
 from scipy.spatial.distance import cosine, euclidean, cityblock
 from scipy.stats import pearsonr
+from scipy import sparse
 import logging
+from config import Config
 from database.mongo_client import mongo_manager
 from cache.redis_cache import redis_cache
+from models.engine_snapshot import EngineSnapshot
+from models.movie_stats import movie_stats
+from models.leaderboards import leaderboards
+from models.trending import trending
+from models.cooccurrence import cooccurrence
+from models.content_engine import content_model
+from models.user_topn import user_topn
+from models.user_neighbors import user_neighbors
+from models.als import als_model
+from models.item_similarity import ItemSimilarityIndex
+from models.item_neighbors import ItemNeighborMatrix
+from models.ann_index import RandomProjectionLSH
+from models.graph_engine import BipartiteGraph
+from models.genre_index import GenreBitsets, genre_index
+from models.title_search import title_search
 
 logger = logging.getLogger(__name__)
 
 class SimpleRecommendationEngine:
+    # Etapas de carga y su peso en el porcentaje de progreso
+    LOAD_STAGES = [('movies', 15), ('ratings', 55), ('matrix', 20), ('indexes', 10)]
+    # Métodos con índice aproximado de vecinos (angulares) y si sus vectores se centran (pearson)
+    ANN_METHODS = {'cosine': False, 'pearson': True}
+    
     def __init__(self):
-        self.is_loaded = False
-        self.movies_data = None
-        self.ratings_data = None
-        self.user_movie_matrix = None
-        self.movie_similarity_cache = {}
+        # Instantánea activa (None hasta la primera carga); se reemplaza entera, nunca se muta
+        self.snapshot = None
+        self._load_thread = None
+        self._rebuild_thread = None
+        self._load_lock = threading.Lock()
+        # Ratings persistidos aún no incorporados a la matriz: {(userId, movieId): rating}
+        self._deltas = {}
+        self._compact_timer = None
+        self._replay = None
+        self._swap_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self.load_progress = {
+            'state': 'idle',
+            'stage': None,
+            'completed_stages': [],
+            'percent': 0,
+            'started_at': None,
+            'finished_at': None,
+            'error': None
+        }
+    
+    @property
+    def is_loaded(self):
+        return self.snapshot is not None
+    
+    # Accesos de solo lectura a la instantánea activa
+    @property
+    def movies_data(self):
+        return self.snapshot.movies_data if self.snapshot else None
+    
+    @property
+    def ratings_data(self):
+        return self.snapshot.ratings_data if self.snapshot else None
+    
+    @property
+    def user_movie_matrix(self):
+        return self.snapshot.user_movie_matrix if self.snapshot else None
+    
+    @property
+    def movie_index(self):
+        return self.snapshot.movie_index if self.snapshot else {}
         
     async def initialize(self):
         """Inicializar el motor de recomendaciones simple"""
         try:
+            self.load_progress.update({
+                'state': 'loading',
+                'stage': None,
+                'completed_stages': [],
+                'percent': 0,
+                'started_at': datetime.now().isoformat(),
+                'finished_at': None,
+                'error': None
+            })
+            
             # Conectar a MongoDB
             await mongo_manager.async_connect()
             
             # Cargar datos necesarios
-            await self._load_data()
-            
-            self.is_loaded = True
+            self._swap_snapshot(await self._load_data())
+            
+            # Ratings que llegaron durante la carga: puede que la instantánea recién construida aún
+            # no los tenga (reaplicarlos es idempotente)
+            if self._deltas:
+                self.compact_deltas()
+            
+            self.load_progress.update({
+                'state': 'ready',
+                'stage': None,
+                'percent': 100,
+                'finished_at': datetime.now().isoformat()
+            })
             logger.info("✅ Motor de recomendaciones simple inicializado")
             return True
         except Exception as e:
             logger.error(f"❌ Error inicializando motor: {e}")
+            self.load_progress.update({
+                'state': 'error',
+                'error': str(e),
+                'finished_at': datetime.now().isoformat()
+            })
             return False
     
-    async def _load_data(self):
-        """Cargar datos de MongoDB"""
+    def initialize_in_background(self, on_ready=None):
+        """Cargar el motor en un hilo de fondo sin bloquear al llamador
+        
+        Devuelve False si ya está cargado o hay una carga en curso. `on_ready` se
+        ejecuta en el hilo de carga cuando el motor queda listo.
+        """
+        with self._load_lock:
+            if self.is_loaded or (self._load_thread and self._load_thread.is_alive()):
+                return False
+            
+            def run():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                try:
+                    success = loop.run_until_complete(self.initialize())
+                finally:
+                    loop.close()
+                if success and on_ready:
+                    on_ready()
+            
+            self.load_progress.update({'state': 'loading', 'percent': 0, 'error': None})
+            self._load_thread = threading.Thread(target=run, name='engine-loader', daemon=True)
+            self._load_thread.start()
+            return True
+    
+    def _swap_snapshot(self, snapshot):
+        """Publicar una instantánea nueva (la asignación de la referencia es atómica)"""
+        previous = self.snapshot
+        self.snapshot = snapshot
+        logger.info(f"✅ Instantánea del motor v{snapshot.version} activa"
+                    + (f" (reemplaza v{previous.version})" if previous else ""))
+    
+    async def rebuild(self):
+        """Reconstruir la instantánea con los datos actuales de MongoDB y publicarla
+        
+        La instantánea anterior sigue sirviendo peticiones mientras se construye la nueva.
+        """
         try:
-            # Cargar películas
-            movies = await mongo_manager.get_movies_batch(limit=10000)
-            self.movies_data = pd.DataFrame(movies)
+            self.load_progress.update({
+                'state': 'rebuilding',
+                'stage': None,
+                'completed_stages': [],
+                'percent': 0,
+                'started_at': datetime.now().isoformat(),
+                'finished_at': None,
+                'error': None
+            })
             
-            # Cargar ratings
-            ratings = await mongo_manager.async_db.ratings.find().limit(100000).to_list(length=100000)
-            self.ratings_data = pd.DataFrame(ratings)
-            
-            # Crear matriz usuario-película
-            self._create_user_movie_matrix()
-            
-            logger.info(f"✅ Datos cargados: {len(self.movies_data)} películas, {len(self.ratings_data)} ratings")
+            await mongo_manager.async_connect()
             
+            # Los ratings que lleguen mientras se construye se reaplican sobre la nueva instantánea
+            with self._swap_lock:
+                self._replay = {}
+            try:
+                snapshot = await self._load_data()
+                with self._swap_lock:
+                    if self._replay:
+                        snapshot = self._apply_deltas(snapshot, self._replay)
+                    self._swap_snapshot(snapshot)
+            finally:
+                with self._swap_lock:
+                    self._replay = None
+            
+            # Los rankings cacheados se calcularon con la instantánea anterior
+            redis_cache.invalidate_recommendations()
+            redis_cache.clear_pattern("popular:*")
+            
+            self.load_progress.update({
+                'state': 'ready',
+                'stage': None,
+                'percent': 100,
+                'finished_at': datetime.now().isoformat()
+            })
+            return True
         except Exception as e:
-            logger.error(f"❌ Error cargando datos: {e}")
+            logger.error(f"❌ Error reconstruyendo motor: {e}")
+            self.load_progress.update({
+                'state': 'ready' if self.is_loaded else 'error',
+                'stage': None,
+                'error': str(e),
+                'finished_at': datetime.now().isoformat()
+            })
+            return False
+    
+    def rebuild_in_background(self, on_done=None):
+        """Reconstruir el motor en un hilo de fondo
+        
+        Devuelve False si el motor aún no está cargado o ya hay una carga/reconstrucción
+        en curso. `on_done(success)` se ejecuta en el hilo de reconstrucción al terminar.
+        """
+        with self._load_lock:
+            if not self.is_loaded:
+                return False
+            if any(thread and thread.is_alive() for thread in (self._load_thread, self._rebuild_thread)):
+                return False
+            
+            def run():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                try:
+                    success = loop.run_until_complete(self.rebuild())
+                finally:
+                    loop.close()
+                if on_done:
+                    on_done(success)
+            
+            self.load_progress.update({'state': 'rebuilding', 'percent': 0, 'error': None})
+            self._rebuild_thread = threading.Thread(target=run, name='engine-rebuild', daemon=True)
+            self._rebuild_thread.start()
+            return True
+    
+    def _start_stage(self, stage):
+        """Marcar el inicio de una etapa de carga"""
+        self.load_progress['stage'] = stage
+        logger.info(f"⏳ Cargando motor: {stage}...")
     
-    def _create_user_movie_matrix(self):
+    def _finish_stage(self, stage):
+        """Marcar una etapa como completada y actualizar el porcentaje"""
+        self.load_progress['completed_stages'].append(stage)
+        weights = dict(self.LOAD_STAGES)
+        self.load_progress['percent'] = sum(weights[name] for name in self.load_progress['completed_stages'])
+    
+    async def _load_data(self):
+        """Cargar datos de MongoDB por etapas (movies, ratings, matrix, indexes) y construir una instantánea"""
+        start = time.time()
+        
+        # Cargar películas
+        self._start_stage('movies')
+        movies = await mongo_manager.get_movies_batch(limit=10000)
+        movies_data = pd.DataFrame(movies)
+        self._finish_stage('movies')
+        
+        # Cargar ratings
+        self._start_stage('ratings')
+        ratings = await mongo_manager.async_db.ratings.find().limit(100000).to_list(length=100000)
+        ratings_data = pd.DataFrame(ratings)
+        self._finish_stage('ratings')
+        
+        # Crear matriz usuario-película
+        self._start_stage('matrix')
+        user_movie_matrix = self._create_user_movie_matrix(ratings_data)
+        similarity_index = ItemSimilarityIndex(user_movie_matrix)
+        ratings = sparse.csr_matrix(user_movie_matrix.values)
+        item_neighbors = ItemNeighborMatrix(ratings, user_movie_matrix.columns)
+        graph = BipartiteGraph(ratings, user_movie_matrix.index, user_movie_matrix.columns)
+        ann_indexes = self._build_ann_indexes(user_movie_matrix)
+        self._finish_stage('matrix')
+        
+        # Índices en memoria y estadísticas por película (se cargan una vez y luego son incrementales)
+        self._start_stage('indexes')
+        movie_index = self._build_indexes(movies_data)
+        genre_bitsets = GenreBitsets(movie_index)
+        leaderboards.set_catalog(movie_index)
+        if not movie_stats.loaded:
+            await movie_stats.load(mongo_manager.async_db)
+        genre_index.set_catalog(movie_index)
+        title_search.set_catalog(movie_index)
+        if not trending.loaded:
+            # Los ratings más recientes de la ventana, no los de la muestra de la matriz
+            recent = await mongo_manager.async_db.ratings.find(
+                {'timestamp': {'$gte': trending.window_start()}}, {'_id': 0, 'movieId': 1, 'timestamp': 1}
+            ).sort('timestamp', -1).to_list(length=None)
+            trending.load(pd.DataFrame(recent), movie_index)
+        # Modelos construidos offline (scripts/build_*.py); se releen si cambiaron
+        cooccurrence.load()
+        content_model.load()
+        user_neighbors.load()
+        als_model.load()
+        if user_topn.load():
+            # Usuarios con ratings posteriores al cálculo batch: se puntúan online
+            changed = await mongo_manager.async_db.ratings.distinct('userId', {'timestamp': {'$gte': user_topn.built_at()}})
+            user_topn.mark_changed(changed)
+        self._finish_stage('indexes')
+        
+        logger.info(f"✅ Datos cargados: {len(movies_data)} películas, {len(ratings_data)} ratings")
+        return EngineSnapshot(movies_data, ratings_data, user_movie_matrix, movie_index, similarity_index,
+                              genre_bitsets, item_neighbors, graph, ann_indexes, build_seconds=time.time() - start)
+    
+    def _create_user_movie_matrix(self, ratings_data):
         """Crear matriz usuario-película para cálculos de similitud"""
+        # Crear matriz pivote
+        user_movie_matrix = ratings_data.pivot_table(
+            index='userId',
+            columns='movieId',
+            values='rating',
+            fill_value=0
+        )
+        logger.info(f"✅ Matriz usuario-película creada: {user_movie_matrix.shape}")
+        return user_movie_matrix
+    
+    def _build_ann_indexes(self, user_movie_matrix):
+        """Índices LSH de películas (columnas de la matriz) y usuarios (filas) para cosine y pearson
+        
+        Solo para el lado que tenga al menos ANN_MIN_SIZE vectores: con menos, puntuar todo es
+        igual de rápido y exacto. Se guardan en MODEL_CACHE_DIR/ann y en la siguiente carga se
+        abren con memory-mapping si se construyeron con la misma matriz (misma huella); si no,
+        se reconstruyen y se vuelven a guardar.
+        """
+        ann_indexes = {}
+        if not Config.ANN_ENABLED:
+            return ann_indexes
+        values = sparse.csr_matrix(user_movie_matrix.values)
+        sides = {
+            'movies': (values.T.tocsr(), user_movie_matrix.columns.values),
+            'users': (values, user_movie_matrix.index.values)
+        }
+        fingerprint = self._ann_fingerprint(values, user_movie_matrix)
+        for side, (vectors, ids) in sides.items():
+            if vectors.shape[0] < Config.ANN_MIN_SIZE:
+                continue
+            for method, center in self.ANN_METHODS.items():
+                key = f"{side}:{method}"
+                path = os.path.join(Config.MODEL_CACHE_DIR, 'ann', f"{side}_{method}")
+                index = self._load_ann_index(path, fingerprint)
+                if index is None:
+                    index = RandomProjectionLSH.build(vectors, ids, center=center)
+                    try:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        index.save(path, fingerprint)
+                    except OSError as e:
+                        logger.warning(f"⚠️ No se pudo guardar el índice LSH {key}: {e}")
+                ann_indexes[key] = index
+        return ann_indexes
+    
+    @staticmethod
+    def _ann_fingerprint(values, user_movie_matrix):
+        """Huella de la matriz y de los parámetros LSH con los que se construyen los índices"""
+        digest = hashlib.sha1(f"{Config.ANN_TABLES}:{Config.ANN_BITS}".encode())
+        for array in (user_movie_matrix.index.values, user_movie_matrix.columns.values,
+                      values.indptr, values.indices, values.data):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _load_ann_index(path, fingerprint):
+        """Índice LSH guardado en `path` (memory-mapped) o None si no existe o es de otra matriz"""
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
         try:
-            # Crear matriz pivote
-            self.user_movie_matrix = self.ratings_data.pivot_table(
-                index='userId',
-                columns='movieId',
-                values='rating',
-                fill_value=0
-            )
-            logger.info(f"✅ Matriz usuario-película creada: {self.user_movie_matrix.shape}")
-        except Exception as e:
-            logger.error(f"❌ Error creando matriz: {e}")
+            index = RandomProjectionLSH.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ Índice LSH en {path} ilegible, se reconstruye: {e}")
+            return None
+        if index.fingerprint != fingerprint:
+            logger.info(f"📦 Índice LSH en {path} desactualizado, se reconstruye")
+            return None
+        return index
+    
+    def _ann_candidates(self, snapshot, side, key_id, method, min_candidates):
+        """Candidatos a vecinos de una película o usuario según el índice LSH, o None para buscar en todo
+        
+        También None si salen `min_candidates` o menos (cubos casi vacíos): ahí la búsqueda
+        exacta es barata y no pierde vecinos.
+        """
+        index = snapshot.ann_indexes.get(f"{side}:{method}")
+        if index is None:
+            return None
+        matrix = snapshot.user_movie_matrix
+        if side == 'movies':
+            if key_id not in matrix.columns:
+                return None
+            vector = matrix[key_id].values
+        else:
+            vector = matrix.loc[key_id].values
+        candidates = index.candidates(vector)
+        return candidates if len(candidates) > min_candidates else None
+    
+    def _build_indexes(self, movies_data):
+        """Índice movieId -> datos básicos de la película (evita filtrar el DataFrame por cada búsqueda)"""
+        movie_index = {}
+        for movie in movies_data.to_dict('records'):
+            movie_id = movie['movieId']
+            if movie_id not in movie_index:
+                movie_index[movie_id] = {
+                    'movieId': int(movie_id),
+                    'title': movie['title'],
+                    'genres': movie.get('genres', ''),
+                    'year': movie.get('year')
+                }
+        logger.info(f"✅ Índice de películas creado: {len(movie_index)} películas")
+        return movie_index
+    
+    def apply_ratings(self, changes):
+        """Registrar ratings ya persistidos como deltas sobre la instantánea activa
+        
+        La instantánea activa no se modifica: matriz e índice de similitud (solo las películas
+        afectadas) se actualizan en una instantánea nueva al acumular ENGINE_DELTA_COMPACT_SIZE
+        cambios o, como mucho, ENGINE_DELTA_MAX_AGE segundos después del primero.
+        """
+        with self._swap_lock:
+            for change in changes:
+                pair = (change['userId'], change['movieId'])
+                self._deltas[pair] = change
+                if self._replay is not None:
+                    self._replay[pair] = change
+            pending = len(self._deltas)
+            if pending and self._compact_timer is None:
+                self._compact_timer = threading.Timer(Config.ENGINE_DELTA_MAX_AGE, self.compact_deltas)
+                self._compact_timer.daemon = True
+                self._compact_timer.start()
+        
+        if pending >= Config.ENGINE_DELTA_COMPACT_SIZE:
+            self.compact_deltas()
+    
+    def compact_deltas(self):
+        """Incorporar los deltas pendientes en una instantánea nueva y publicarla"""
+        with self._compact_lock:
+            with self._swap_lock:
+                if self._compact_timer is not None:
+                    self._compact_timer.cancel()
+                    self._compact_timer = None
+                snapshot = self.snapshot
+                if snapshot is None or not self._deltas:
+                    return False
+                deltas, self._deltas = self._deltas, {}
+            
+            try:
+                compacted = self._apply_deltas(snapshot, deltas)
+            except Exception as e:
+                logger.error(f"❌ Error compactando {len(deltas)} ratings: {e}")
+                compacted = None
+            
+            with self._swap_lock:
+                if compacted is not None and self.snapshot is snapshot:
+                    self._swap_snapshot(compacted)
+                    return True
+                # Falló o una reconstrucción publicó otra instantánea: reintentar sobre la nueva
+                for pair, change in deltas.items():
+                    self._deltas.setdefault(pair, change)
+                return False
+    
+    def _apply_deltas(self, snapshot, deltas):
+        """Nueva instantánea = la dada + ratings nuevos o modificados (sin recargar de MongoDB)
+        
+        Copy-on-write: la instantánea dada no se modifica porque puede haber peticiones
+        leyéndola. La matriz nueva es una copia con las celdas de los deltas escritas (y las
+        filas/columnas de usuarios o películas nuevos), y el índice de similitud una copia que
+        solo recalcula las películas afectadas (ItemSimilarityIndex.updated).
+        
+        Los ratings cargados, el grafo, los vecinos película-película y los índices LSH pasan tal
+        cual y se reconstruyen en la siguiente carga completa (rebuild): el grafo toma la semilla
+        de la fila actual del usuario y el LSH solo propone candidatos, que se puntúan con la matriz.
+        """
+        start = time.time()
+        changes = list(deltas.values())
+        user_ids = np.fromiter((change['userId'] for change in changes), dtype=np.int64, count=len(changes))
+        movie_ids = np.fromiter((change['movieId'] for change in changes), dtype=np.int64, count=len(changes))
+        values = np.fromiter((change['rating'] for change in changes), dtype=np.float64, count=len(changes))
+        
+        # Ampliar los índices con usuarios/películas nuevos
+        matrix = snapshot.user_movie_matrix
+        new_users = pd.Index(np.unique(user_ids)).difference(matrix.index)
+        new_movies = pd.Index(np.unique(movie_ids)).difference(matrix.columns)
+        index = matrix.index.append(new_users) if len(new_users) else matrix.index
+        columns = matrix.columns.append(new_movies) if len(new_movies) else matrix.columns
+        
+        matrix_values = np.zeros((len(index), len(columns)), dtype=np.float64)
+        matrix_values[:matrix.shape[0], :matrix.shape[1]] = matrix.values
+        matrix_values[index.get_indexer(user_ids), columns.get_indexer(movie_ids)] = values
+        user_movie_matrix = pd.DataFrame(matrix_values, index=index.rename('userId'),
+                                         columns=columns.rename('movieId'), copy=False)
+        similarity_index = snapshot.similarity_index.updated(changes)
+        
+        compacted = EngineSnapshot(snapshot.movies_data, snapshot.ratings_data, user_movie_matrix, snapshot.movie_index,
+                                   similarity_index, snapshot.genre_bitsets, snapshot.item_neighbors, snapshot.graph,
+                                   snapshot.ann_indexes, build_seconds=time.time() - start)
+        logger.info(f"✅ {len(changes)} ratings incorporados a la matriz en {compacted.build_seconds:.3f}s")
+        return compacted
+    
+    def get_load_progress(self):
+        """Progreso de carga para /api/health"""
+        snapshot = self.snapshot
+        return {
+            **self.load_progress,
+            'ready': snapshot is not None,
+            'snapshot_version': snapshot.version if snapshot else None
+        }
+    
+    def get_snapshot_info(self):
+        """Versión y momento de construcción de la instantánea activa (para /api/stats)"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        return {
+            **snapshot.get_info(),
+            'pending_deltas': len(self._deltas),
+            'similarity_index': snapshot.similarity_index.get_stats(),
+            'item_neighbors': snapshot.item_neighbors.get_stats(),
+            'graph': snapshot.graph.get_stats(),
+            'ann_indexes': {name: index.get_stats() for name, index in snapshot.ann_indexes.items()}
+        }
     
     def calculate_similarity(self, vector1, vector2, method='cosine'):
         """Calcular similitud entre dos vectores usando diferentes métricas"""
@@ -104,38 +552,41 @@ class SimpleRecommendationEngine:
             logger.error(f"❌ Error calculando similitud {method}: {e}")
             return 0.0
     
-    def get_movie_similarity(self, movie_id1, movie_id2, method='cosine'):
-        """Calcular similitud entre dos películas"""
+    def get_movie_similarity(self, movie_id1, movie_id2, method='cosine', snapshot=None):
+        """Calcular similitud entre dos películas (a partir del índice de estadísticas suficientes)"""
         try:
-            # Verificar cache
-            cache_key = f"{movie_id1}_{movie_id2}_{method}"
-            if cache_key in self.movie_similarity_cache:
-                return self.movie_similarity_cache[cache_key]
-            
-            # Obtener vectores de ratings para ambas películas
-            if movie_id1 in self.user_movie_matrix.columns and movie_id2 in self.user_movie_matrix.columns:
-                vector1 = self.user_movie_matrix[movie_id1].values
-                vector2 = self.user_movie_matrix[movie_id2].values
-                
-                similarity = self.calculate_similarity(vector1, vector2, method)
-                
-                # Guardar en cache
-                self.movie_similarity_cache[cache_key] = similarity
-                
-                return similarity
-            else:
-                return 0.0
-                
+            snapshot = snapshot or self.snapshot
+            return snapshot.similarity_index.similarity(movie_id1, movie_id2, method)
         except Exception as e:
             logger.error(f"❌ Error calculando similitud entre películas: {e}")
             return 0.0
     
-    def get_user_similarity(self, user_id1, user_id2, method='cosine'):
+    def get_similarity_matrix(self, movie_ids, method='cosine', snapshot=None):
+        """Similitudes entre todas las parejas de `movie_ids` (matriz m x m, un solo producto disperso)"""
+        try:
+            snapshot = snapshot or self.snapshot
+            return snapshot.similarity_index.pairwise(movie_ids, method)
+        except Exception as e:
+            logger.error(f"❌ Error calculando matriz de similitud: {e}")
+            return np.zeros((len(movie_ids), len(movie_ids)))
+    
+    def get_similar_by_genres(self, movie_id, limit=10, metric='overlap', snapshot=None):
+        """Películas con más géneros en común con `movie_id` sobre todo el catálogo: [(movieId, score)]
+        
+        Devuelve None si el motor no está cargado o la película no está en el catálogo.
+        """
+        snapshot = snapshot or self.snapshot
+        if snapshot is None:
+            return None
+        return snapshot.genre_bitsets.similar(movie_id, limit, metric)
+    
+    def get_user_similarity(self, user_id1, user_id2, method='cosine', snapshot=None):
         """Calcular similitud entre dos usuarios"""
         try:
-            if user_id1 in self.user_movie_matrix.index and user_id2 in self.user_movie_matrix.index:
-                vector1 = self.user_movie_matrix.loc[user_id1].values
-                vector2 = self.user_movie_matrix.loc[user_id2].values
+            matrix = (snapshot or self.snapshot).user_movie_matrix
+            if user_id1 in matrix.index and user_id2 in matrix.index:
+                vector1 = matrix.loc[user_id1].values
+                vector2 = matrix.loc[user_id2].values
                 
                 return self.calculate_similarity(vector1, vector2, method)
             else:
@@ -145,88 +596,105 @@ class SimpleRecommendationEngine:
             logger.error(f"❌ Error calculando similitud entre usuarios: {e}")
             return 0.0
     
-    async def get_recommendations(self, movie_id, method='cosine', limit=10):
+    async def get_recommendations(self, movie_id, method='cosine', limit=10, offset=0):
         """Obtener recomendaciones usando métricas de similitud básicas"""
         try:
-            # Verificar cache
-            cached_recs = redis_cache.get_cached_recommendations(movie_id, method)
+            # Verificar cache (se guarda el ranking completo y se lee solo la página pedida)
+            cached_recs = redis_cache.get_cached_recommendations(movie_id, method, offset, limit)
             if cached_recs:
                 logger.info(f"✅ Recomendaciones obtenidas de cache para {movie_id}")
-                return cached_recs[:limit]
+                return cached_recs['items']
+            
+            # Toda la petición trabaja sobre la misma instantánea aunque se publique otra
+            snapshot = self.snapshot
             
             # Obtener película de referencia
             movie = await mongo_manager.get_movie_by_id(movie_id)
             if not movie:
                 return []
             
-            # Calcular similitud con todas las películas
-            similarities = []
-            seen_movies = set()  # Para evitar duplicados
-            for _, row in self.movies_data.iterrows():
-                other_movie_id = row['movieId']
-                if other_movie_id != movie_id and other_movie_id not in seen_movies:
-                    similarity = self.get_movie_similarity(movie_id, other_movie_id, method)
-                    similarities.append({
-                        'movieId': other_movie_id,
-                        'title': row['title'],
-                        'genres': row.get('genres', ''),
-                        'year': row.get('year'),
-                        'similarity': similarity
-                    })
-                    seen_movies.add(other_movie_id)
-            
-            # Ordenar por similitud
-            similarities.sort(key=lambda x: x['similarity'], reverse=True)
-            
-            # Filtrar solo películas con similitud > 0
-            recommendations = [rec for rec in similarities[:limit] if rec['similarity'] > 0]
+            # Vecinos más similares (similitud > 0) desde el índice, ranking completo hasta MAX_RECOMMENDATIONS;
+            # con catálogos grandes solo se puntúan los candidatos del índice LSH
+            candidates = self._ann_candidates(snapshot, 'movies', movie_id, method, Config.MAX_RECOMMENDATIONS)
+            recommendations = []
+            for other_movie_id, similarity in snapshot.similarity_index.neighbors(movie_id, method, candidates=candidates):
+                movie_info = snapshot.movie_index.get(other_movie_id)
+                if movie_info:
+                    recommendations.append({**movie_info, 'similarity': similarity})
             
             # Guardar en cache
             if recommendations:
                 redis_cache.cache_movie_recommendations(movie_id, method, recommendations)
             
-            return recommendations
+            return recommendations[offset:offset + limit]
             
         except Exception as e:
             logger.error(f"❌ Error obteniendo recomendaciones: {e}")
             return []
     
     async def get_user_based_recommendations(self, user_id, method='cosine', limit=10):
-        """Recomendaciones basadas en usuarios similares"""
+        """Recomendaciones basadas en usuarios similares
+        
+        Otros métodos: 'item' (item-based), 'als' (factores ALS) y 'graph' (paseo aleatorio con reinicio).
+        """
         try:
             # Convertir user_id a entero para comparación correcta
             user_id_int = int(user_id)
             
-            if user_id_int not in self.user_movie_matrix.index:
+            snapshot = self.snapshot
+            matrix = snapshot.user_movie_matrix
+            
+            if user_id_int not in matrix.index:
                 logger.warning(f"⚠️ Usuario {user_id} no encontrado en la matriz")
                 # Fallback: devolver películas populares
                 return await self.get_popular_movies(limit)
             
-            # Encontrar usuarios similares
-            user_similarities = []
-            for other_user_id in self.user_movie_matrix.index:
-                if other_user_id != user_id_int:
-                    similarity = self.get_user_similarity(user_id_int, other_user_id, method)
-                    # Reducir umbral para incluir más usuarios
-                    if similarity >= 0:
-                        user_similarities.append({
-                            'userId': other_user_id,
-                            'similarity': similarity
-                        })
-            
-            # Ordenar por similitud
-            user_similarities.sort(key=lambda x: x['similarity'], reverse=True)
+            # Top-N precalculado por el trabajo batch si el usuario no ha cambiado desde entonces
+            stored = user_topn.get(method, user_id_int, limit)
+            if stored is not None:
+                return self._scored_recommendations(snapshot, stored, limit)
+            
+            if method == 'item':
+                return await self._get_item_based_recommendations(snapshot, user_id_int, limit)
+            if method == 'als':
+                return await self._get_als_recommendations(snapshot, user_id_int, limit)
+            if method == 'graph':
+                return await self._get_graph_recommendations(snapshot, user_id_int, limit)
+            
+            # Vecinos precalculados (scripts/build_user_neighbors.py): solo queda agregar sus ratings
+            precomputed = user_neighbors.neighbors(method, user_id_int)
+            if precomputed is not None:
+                user_similarities = [
+                    {'userId': other_user_id, 'similarity': similarity}
+                    for other_user_id, similarity in precomputed if other_user_id in matrix.index
+                ]
+            else:
+                # Encontrar usuarios similares (entre los candidatos del índice LSH si hay muchos usuarios)
+                candidates = self._ann_candidates(snapshot, 'users', user_id_int, method, 50)
+                user_similarities = []
+                for other_user_id in (matrix.index if candidates is None else candidates):
+                    if other_user_id != user_id_int:
+                        similarity = self.get_user_similarity(user_id_int, other_user_id, method, snapshot)
+                        # Reducir umbral para incluir más usuarios
+                        if similarity >= 0:
+                            user_similarities.append({
+                                'userId': other_user_id,
+                                'similarity': similarity
+                            })
+                
+                # Ordenar por similitud
+                user_similarities.sort(key=lambda x: x['similarity'], reverse=True)
             
             logger.info(f"📊 Encontrados {len(user_similarities)} usuarios similares para usuario {user_id}")
             
             # Obtener películas mejor calificadas por usuarios similares
             recommendations = []
             seen_movies = set()  # Para evitar duplicados
-            user_movies = set(self.user_movie_matrix.columns[self.user_movie_matrix.loc[user_id_int] > 0])
+            user_movies = set(matrix.columns[matrix.loc[user_id_int] > 0])
             
             for similar_user in user_similarities[:50]:  # Aumentar a top 50 usuarios similares
                 similar_user_id = similar_user['userId']
-                similar_user_ratings = self.user_movie_matrix.loc[similar_user_id]
+                similar_user_ratings = matrix.loc[similar_user_id]
                 
                 # Reducir umbral de rating de 4.0 a 3.0
                 high_rated_movies = similar_user_ratings[
@@ -237,16 +705,12 @@ class SimpleRecommendationEngine:
                 for movie_id, rating in high_rated_movies.items():
                     # Evitar duplicados
                     if movie_id not in seen_movies:
-                        movie_info = self.movies_data[self.movies_data['movieId'] == movie_id]
-                        if not movie_info.empty:
-                            movie_info = movie_info.iloc[0]
+                        movie_info = snapshot.movie_index.get(movie_id)
+                        if movie_info:
                             recommendations.append({
-                                'movieId': movie_id,
-                                'title': movie_info['title'],
-                                'genres': movie_info.get('genres', ''),
-                                'year': movie_info.get('year'),
-                                'rating': rating,
-                                'user_similarity': similar_user['similarity']
+                                **movie_info,
+                                'rating': float(rating),
+                                'user_similarity': float(similar_user['similarity'])
                             })
                             seen_movies.add(movie_id)
             
@@ -267,53 +731,101 @@ class SimpleRecommendationEngine:
             # Fallback: devolver películas populares
             return await self.get_popular_movies(limit)
     
-    async def get_popular_movies(self, limit=10):
+    def _scored_recommendations(self, snapshot, scored, limit):
+        """[(movieId, score[, rating estimado])] -> datos de película con score (y predicted_rating)"""
+        recommendations = []
+        for movie_id, score, *predicted_rating in scored:
+            movie_info = snapshot.movie_index.get(movie_id)
+            if movie_info:
+                recommendation = {**movie_info, 'score': score}
+                if predicted_rating:
+                    recommendation['predicted_rating'] = predicted_rating[0]
+                recommendations.append(recommendation)
+                if len(recommendations) >= limit:
+                    break
+        return recommendations
+    
+    async def _get_item_based_recommendations(self, snapshot, user_id, limit=10):
+        """Recomendaciones item-based: fila de ratings del usuario x matriz de vecinos película-película"""
+        row = snapshot.user_movie_matrix.loc[user_id]
+        rated = row[row > 0]
+        scored = snapshot.item_neighbors.recommend(dict(zip(rated.index.tolist(), rated.values.tolist())), limit * 2)
+        recommendations = self._scored_recommendations(snapshot, scored, limit)
+        
+        logger.info(f"📊 Generadas {len(recommendations)} recomendaciones item-based para usuario {user_id}")
+        if not recommendations:
+            logger.info(f"⚠️ Sin vecinos para las películas del usuario {user_id}, usando películas populares")
+            return await self.get_popular_movies(limit)
+        return recommendations
+    
+    async def _get_als_recommendations(self, snapshot, user_id, limit=10):
+        """Recomendaciones por factores ALS (scripts/train_als.py): x_u · y_i sobre películas no vistas"""
+        row = snapshot.user_movie_matrix.loc[user_id]
+        scored = als_model.recommend(user_id, row.index[row > 0].tolist(), limit * 2) if als_model.loaded else None
+        recommendations = self._scored_recommendations(snapshot, scored or [], limit)
+        
+        if not recommendations:
+            logger.info(f"⚠️ Sin factores ALS para el usuario {user_id}, usando películas populares")
+            return await self.get_popular_movies(limit)
+        logger.info(f"📊 Generadas {len(recommendations)} recomendaciones ALS para usuario {user_id}")
+        return recommendations
+    
+    async def _get_graph_recommendations(self, snapshot, user_id, limit=10):
+        """Recomendaciones por paseo aleatorio con reinicio desde las películas del usuario"""
+        row = snapshot.user_movie_matrix.loc[user_id]
+        rated = row[row > 0]
+        scored = snapshot.graph.recommend(dict(zip(rated.index.tolist(), rated.values.tolist())), limit * 2)
+        recommendations = self._scored_recommendations(snapshot, scored or [], limit)
+        
+        if not recommendations:
+            logger.info(f"⚠️ El paseo desde el usuario {user_id} no alcanzó películas nuevas, usando películas populares")
+            return await self.get_popular_movies(limit)
+        logger.info(f"📊 Generadas {len(recommendations)} recomendaciones por grafo para usuario {user_id}")
+        return recommendations
+    
+    def get_graph_recommendations(self, movie_id, limit=10, snapshot=None):
+        """Películas más alcanzables desde `movie_id` en el grafo: [(movieId, score)]
+        
+        Devuelve None si el motor no está cargado o la película no tiene ratings en la matriz.
+        """
+        snapshot = snapshot or self.snapshot
+        if snapshot is None:
+            return None
+        return snapshot.graph.recommend_for_movie(movie_id, limit)
+    
+    async def get_popular_movies(self, limit=10, min_ratings=10, offset=0):
         """Obtener películas populares basadas en ratings promedio"""
         try:
-            # Verificar cache
-            cached_popular = redis_cache.get_cached_popular_movies()
+            # Verificar cache (la clave lleva la versión de las estadísticas: un lote de ratings la cambia)
+            stats_version = movie_stats.version
+            cached_popular = redis_cache.get_cached_popular_movies(min_ratings, offset, limit, version=stats_version)
             if cached_popular:
-                return cached_popular[:limit]
-            
-            # Calcular ratings promedio por película
-            movie_stats = self.ratings_data.groupby('movieId').agg({
-                'rating': ['mean', 'count']
-            }).reset_index()
+                return cached_popular['items']
             
-            movie_stats.columns = ['movieId', 'avg_rating', 'rating_count']
+            snapshot = self.snapshot
             
-            # Filtrar películas con suficientes ratings
-            popular_movies = movie_stats[
-                (movie_stats['rating_count'] >= 10) & 
-                (movie_stats['avg_rating'] >= 3.5)
-            ].sort_values('avg_rating', ascending=False)
+            # Ranking de popularidad compartido (filtrado por rating promedio >= 3.5)
+            max_items = Config.MAX_RECOMMENDATIONS
+            popular_movies = leaderboards.top(limit=max_items * 2, min_ratings=min_ratings, min_avg=3.5)
             
             # Obtener información de películas
             recommendations = []
-            seen_movies = set()  # Para evitar duplicados
-            for _, row in popular_movies.head(limit * 2).iterrows():  # Obtener más para compensar duplicados
-                movie_id = row['movieId']
-                if movie_id not in seen_movies:
-                    movie_info = self.movies_data[self.movies_data['movieId'] == movie_id]
-                    if not movie_info.empty:
-                        movie_info = movie_info.iloc[0]
-                        recommendations.append({
-                            'movieId': movie_id,
-                            'title': movie_info['title'],
-                            'genres': movie_info.get('genres', ''),
-                            'year': movie_info.get('year'),
-                            'avg_rating': float(row['avg_rating']),
-                            'rating_count': int(row['rating_count'])
-                        })
-                        seen_movies.add(movie_id)
-                        if len(recommendations) >= limit:
-                            break
+            for popular in popular_movies:
+                movie_info = snapshot.movie_index.get(popular['movieId'])
+                if movie_info:
+                    recommendations.append({
+                        **movie_info,
+                        'avg_rating': float(popular['avg_rating']),
+                        'rating_count': int(popular['rating_count'])
+                    })
+                    if len(recommendations) >= max_items:
+                        break
             
             # Guardar en cache
             if recommendations:
-                redis_cache.cache_popular_movies(recommendations)
+                redis_cache.cache_popular_movies(recommendations, min_ratings, version=stats_version)
             
-            return recommendations
+            return recommendations[offset:offset + limit]
             
         except Exception as e:
             logger.error(f"❌ Error obteniendo películas populares: {e}")
@@ -0,0 +1,199 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+import numpy as np
+import logging
+
+from config import Config
+from models.movie_stats import movie_stats
+
+logger = logging.getLogger(__name__)
+
+YEAR_PATTERN = re.compile(r'\s*\((\d{4})[^)]*\)\s*$')
+# "Matrix, The" -> "The Matrix" (también con título alternativo detrás: "City of Lost Children, The (Cité...)")
+ARTICLE_PATTERN = re.compile(r"^(.*?), (the|a|an|les|la|le|l'|el|il|der|die|das|los|las)( \(.*\))?$", re.IGNORECASE)
+NON_ALNUM_PATTERN = re.compile(r'[^a-z0-9]+')
+
+def normalize(text):
+    """Texto en minúsculas, sin acentos ni signos, con espacios simples"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return NON_ALNUM_PATTERN.sub(' ', text.lower()).strip()
+
+def split_title(title):
+    """Separar el año del título y recolocar el artículo final: (título normalizado, año o None)"""
+    title = title or ''
+    year = None
+    match = YEAR_PATTERN.search(title)
+    if match:
+        year = int(match.group(1))
+        title = title[:match.start()]
+    article = ARTICLE_PATTERN.match(title)
+    if article:
+        title = f"{article.group(2)} {article.group(1)}{article.group(3) or ''}"
+    return normalize(title), year
+
+def trigrams(text):
+    """Trigramas de cada palabra con relleno (estilo pg_trgm)"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class TitleSearchIndex:
+    """Índice en memoria de títulos para búsqueda y autocompletado
+
+    Sobre los títulos normalizados (sin acentos, con el año aparte y el artículo final
+    recolocado) guarda:
+      - los títulos ordenados, para encontrar por bisección los que empiezan por la consulta;
+      - los pares (palabra, película) ordenados por palabra, para que cada palabra de la
+        consulta sea prefijo de alguna palabra del título ("star w" -> "Star Wars");
+      - listas de trigramas, para la búsqueda aproximada con erratas.
+    Los resultados se ordenan por popularidad (número de ratings), que se mantiene con
+    cada lote de ratings.
+    """
+
+    MIN_FUZZY_LENGTH = 3
+
+    def __init__(self, stats, fuzzy_threshold=None):
+        self.stats = stats
+        self.fuzzy_threshold = fuzzy_threshold or Config.SEARCH_FUZZY_THRESHOLD
+        self.ready = False
+        self.movie_ids = np.zeros(0, dtype=np.int64)
+        self.movie_pos = {}
+        self._titles = []
+        self._sorted_titles = []
+        self._sorted_title_positions = np.zeros(0, dtype=np.int32)
+        self._words = []
+        self._word_positions = np.zeros(0, dtype=np.int32)
+        self._trigrams = {}
+        self._popularity = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def set_catalog(self, movie_index):
+        """Construir el índice desde el catálogo (al cargar o reconstruir el motor)"""
+        catalog_ids = list(movie_index)
+        movie_ids = np.array(catalog_ids, dtype=np.int64)
+        titles = [split_title(movie_index[movie_id].get('title'))[0] for movie_id in catalog_ids]
+
+        title_order = sorted(range(len(titles)), key=titles.__getitem__)
+        pairs = sorted((word, position) for position, title in enumerate(titles) for word in set(title.split()))
+
+        members = {}
+        for position, title in enumerate(titles):
+            for gram in trigrams(title):
+                members.setdefault(gram, []).append(position)
+
+        counts = self.stats.get_many(catalog_ids)
+        popularity = np.array([counts.get(movie_id, (0, 0.0))[0] for movie_id in catalog_ids], dtype=np.int64)
+
+        with self._lock:
+            self.movie_ids = movie_ids
+            self.movie_pos = {movie_id: pos for pos, movie_id in enumerate(catalog_ids)}
+            self._titles = titles
+            self._sorted_titles = [titles[position] for position in title_order]
+            self._sorted_title_positions = np.array(title_order, dtype=np.int32)
+            self._words = [word for word, _ in pairs]
+            self._word_positions = np.array([position for _, position in pairs], dtype=np.int32)
+            self._trigrams = {gram: np.array(positions, dtype=np.int32) for gram, positions in members.items()}
+            self._popularity = popularity
+            self.ready = True
+        logger.info(f"✅ Índice de títulos: {len(titles)} películas, {len(pairs)} palabras, "
+                    f"{len(members)} trigramas")
+
+    def update(self, movie_ids):
+        """Actualizar la popularidad de las películas que recibieron ratings"""
+        if not self.ready or not movie_ids:
+            return
+        counts = self.stats.get_many(movie_ids)
+        with self._lock:
+            for movie_id in movie_ids:
+                position = self.movie_pos.get(movie_id)
+                if position is not None:
+                    self._popularity[position] = counts.get(movie_id, (0, 0.0))[0]
+
+    @staticmethod
+    def _prefix_range(sorted_values, prefix):
+        return bisect_left(sorted_values, prefix), bisect_left(sorted_values, prefix + '\uffff')
+
+    def _most_popular(self, positions, k):
+        """Las k posiciones más populares (empates por orden del catálogo)"""
+        if k <= 0 or not len(positions):
+            return positions[:0]
+        popularity = self._popularity[positions]
+        if len(positions) > k:
+            kth = -np.partition(-popularity, k - 1)[k - 1]
+            keep = popularity >= kth
+            positions, popularity = positions[keep], popularity[keep]
+        order = np.lexsort((positions, -popularity))[:k]
+        return positions[order]
+
+    def search(self, query, limit=10, fuzzy=True):
+        """Películas cuyo título encaja con la consulta: [(movieId, tipo de coincidencia, puntuación)]
+
+        Primero los títulos que empiezan por la consulta, después los que tienen todas sus
+        palabras como prefijos de palabras del título (ambos por popularidad) y, si faltan
+        resultados, coincidencias aproximadas por trigramas.
+        """
+        text = normalize(query)
+        if not text or limit <= 0:
+            return []
+
+        with self._lock:
+            lo, hi = self._prefix_range(self._sorted_titles, text)
+            title_matches = self._sorted_title_positions[lo:hi]
+
+            word_mask = None
+            for token in text.split():
+                lo, hi = self._prefix_range(self._words, token)
+                token_mask = np.zeros(len(self._titles), dtype=bool)
+                token_mask[self._word_positions[lo:hi]] = True
+                word_mask = token_mask if word_mask is None else word_mask & token_mask
+            word_mask[title_matches] = False
+
+            selected = self._most_popular(title_matches, limit)
+            results = [(position, 'prefix', 1.0) for position in selected.tolist()]
+            selected = self._most_popular(np.flatnonzero(word_mask), limit - len(results))
+            results += [(position, 'word', 1.0) for position in selected.tolist()]
+
+            if fuzzy and len(results) < limit:
+                seen = {position for position, _, _ in results}
+                results += [match for match in self._fuzzy(text, limit) if match[0] not in seen][:limit - len(results)]
+
+            return [(self.movie_ids[position].item(), kind, score) for position, kind, score in results]
+
+    def _fuzzy(self, text, limit):
+        """Coincidencias aproximadas: fracción de los trigramas de la consulta presentes en el título
+
+        Como word_similarity de pg_trgm, no penaliza los títulos largos que contienen la consulta.
+        """
+        if len(text) < self.MIN_FUZZY_LENGTH:
+            return []
+        grams = trigrams(text)
+        postings = [self._trigrams[gram] for gram in grams if gram in self._trigrams]
+        if not postings:
+            return []
+        hits = np.bincount(np.concatenate(postings), minlength=len(self._titles))
+        candidates = np.flatnonzero(hits >= self.fuzzy_threshold * len(grams))
+        similarity = hits[candidates] / len(grams)
+        order = np.lexsort((candidates, -self._popularity[candidates], -similarity))[:limit]
+        return [(candidates[i].item(), 'fuzzy', round(float(similarity[i]), 4)) for i in order]
+
+    def popularity(self, movie_id):
+        position = self.movie_pos.get(movie_id)
+        return int(self._popularity[position]) if position is not None else 0
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'movies': len(self._titles),
+                'words': len(self._words),
+                'trigrams': len(self._trigrams),
+                'fuzzy_threshold': self.fuzzy_threshold
+            }
+
+# Instancia global
+title_search = TitleSearchIndex(movie_stats)
@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import sparse
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def top_k_similar(matrix, k, other=None, block_size=None, workers=None, exclude_self=None, min_score=0.0):
+    """Top-k por fila de matrix · otherᵀ sin materializar la matriz n x m completa
+
+    Procesa las filas por bloques (en paralelo entre hilos: los productos de scipy/numpy y
+    argpartition liberan el GIL) y de cada bloque se queda solo con los k mayores valores
+    por fila. Entre todos los hilos hay como mucho block_size filas en curso, así la memoria
+    temporal está acotada a block_size x m sea cual sea el tamaño del catálogo.
+
+    Con filas normalizadas L2 el producto es la similitud coseno. Devuelve una CSR n x m
+    con los vecinos de cada fila ordenados de mayor a menor y solo valores > min_score;
+    `exclude_self` descarta la diagonal (por defecto solo si no se pasa `other`; con True también
+    cuando `other` es otra representación de las mismas filas).
+    """
+    exclude_self = other is None if exclude_self is None else exclude_self
+    other = matrix if other is None else other
+    block_size = block_size or Config.TOPK_BLOCK_SIZE
+    workers = max(1, workers or Config.TOPK_WORKERS or os.cpu_count() or 1)
+    n, m = matrix.shape[0], other.shape[0]
+    size = min(k, m)
+
+    other_t = other.T.tocsr() if sparse.issparse(other) else np.ascontiguousarray(other.T)
+    rows_per_task = max(1, block_size // workers)
+
+    def run(start):
+        end = min(start + rows_per_task, n)
+        block = matrix[start:end] @ other_t
+        block = block.toarray() if sparse.issparse(block) else np.asarray(block)
+        if exclude_self:
+            block[np.arange(end - start), np.arange(start, end)] = -np.inf
+        top = np.argpartition(-block, size - 1, axis=1)[:, :size] if size < m else np.tile(np.arange(m), (end - start, 1))
+        scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        keep = scores > min_score
+        return keep.sum(axis=1), top[keep], scores[keep].astype(np.float32)
+
+    if n == 0 or size <= 0:
+        return sparse.csr_matrix((n, m), dtype=np.float32)
+
+    starts = range(0, n, rows_per_task)
+    if workers == 1:
+        results = [run(start) for start in starts]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run, starts))
+
+    counts = np.concatenate([result[0] for result in results])
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    indices = np.concatenate([result[1] for result in results]).astype(np.int32)
+    scores = np.concatenate([result[2] for result in results])
+    logger.info(f"✅ Top-{k} calculado: {n} filas x {m} columnas, {len(scores)} vecinos ({workers} hilos)")
+    return sparse.csr_matrix((scores, indices, indptr), shape=(n, m))
@@ -0,0 +1,224 @@
+import threading
+import time
+import numpy as np
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+
+class TrendingCounters:
+    """Contadores de ratings por película y hora para las ventanas de tendencias
+
+    Por cada hora de la ventana más larga se guarda un diccionario disperso {posición de
+    película: ratings en esa hora} solo con las películas que recibieron alguno, así la
+    memoria crece con los pares (película, hora) con actividad y no con películas x horas
+    (la cola larga apenas ocupa). Cada ventana (24h, 7d, 30d por defecto) pondera las horas
+    con decaimiento exponencial (vida media proporcional a la ventana) y mantiene sus
+    vectores de puntuaciones y de ratings recientes: registrar un rating es O(número de
+    ventanas) y solo al avanzar de hora se recalculan desde las horas guardadas.
+
+    El reloj es la hora actual del servidor: avanza al registrar ratings y al consultar, y
+    los timestamps futuros se cuentan en la hora actual, así un rating con la fecha mal
+    no puede adelantar el reloj y vaciar el buffer.
+    """
+
+    def __init__(self, windows=None, max_hours=None, half_life_ratio=None):
+        self.windows = windows or Config.TRENDING_WINDOWS
+        self.max_hours = max_hours or max(self.windows.values())
+        ratio = half_life_ratio or Config.TRENDING_HALF_LIFE_RATIO
+        self.half_lives = {name: max(hours * ratio, 1.0) for name, hours in self.windows.items()}
+        self.loaded = False
+        self.head = None
+        self.version = 0
+        self.movie_pos = {}
+        self.movie_ids = []
+        self._capacity = 0
+        self._buckets = {}
+        self._scores = {name: np.zeros(0) for name in self.windows}
+        self._recent = {name: np.zeros(0, dtype=np.int64) for name in self.windows}
+        self._genres = {}
+        self._genre_masks = {}
+        self._rankings = {}
+        self._lock = threading.Lock()
+
+    def _weights(self, name):
+        """Peso por antigüedad en horas (0 = hora actual) para una ventana"""
+        ages = np.arange(self.windows[name])
+        return 0.5 ** (ages / self.half_lives[name])
+
+    def window_start(self):
+        """Timestamp más antiguo que cae dentro de la ventana más larga (para cargar desde la base)"""
+        return (int(time.time()) // HOUR - self.max_hours + 1) * HOUR
+
+    def _ensure_movie(self, movie_id):
+        position = self.movie_pos.get(movie_id)
+        if position is None:
+            position = self.movie_pos[movie_id] = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+            if position >= self._capacity:
+                self._capacity = max(2 * self._capacity, 1024)
+                for vectors in (self._scores, self._recent):
+                    for name, vector in vectors.items():
+                        grown = np.zeros(self._capacity, dtype=vector.dtype)
+                        grown[:len(vector)] = vector
+                        vectors[name] = grown
+            self._genre_masks.clear()
+        return position
+
+    def load(self, ratings_data, movie_index):
+        """Llenar los contadores con los ratings de la ventana (columnas movieId y timestamp)
+
+        `ratings_data` debe cubrir la ventana más larga (ver window_start); lo que quede fuera se ignora.
+        """
+        with self._lock:
+            self._genres = {
+                movie_id: {genre.lower() for genre in (movie.get('genres') or '').split('|') if genre}
+                for movie_id, movie in movie_index.items()
+            }
+            self._genre_masks.clear()
+            self._rankings.clear()
+            self._buckets = {}
+            self.head = int(time.time()) // HOUR
+
+            if ratings_data is None or not len(ratings_data) or 'timestamp' not in ratings_data:
+                self._recompute_scores()
+                self.loaded = True
+                return
+
+            hours = np.minimum(ratings_data['timestamp'].fillna(0).to_numpy(dtype=np.int64) // HOUR, self.head)
+            recent = hours > self.head - self.max_hours
+            movie_ids = ratings_data['movieId'].to_numpy()[recent]
+            hours = hours[recent]
+
+            for movie_id in np.unique(movie_ids):
+                self._ensure_movie(movie_id.item())
+            positions = np.fromiter((self.movie_pos[movie_id.item()] for movie_id in movie_ids),
+                                    dtype=np.int64, count=len(movie_ids))
+            if len(positions):
+                pairs, counts = np.unique(np.stack([hours, positions]), axis=1, return_counts=True)
+                for hour, position, count in zip(pairs[0].tolist(), pairs[1].tolist(), counts.tolist()):
+                    self._buckets.setdefault(hour, {})[position] = count
+
+            self._recompute_scores()
+            self.loaded = True
+            self.version += 1
+        logger.info(f"✅ Contadores de tendencias cargados: {len(movie_ids)} ratings en {len(self.movie_ids)} películas")
+
+    def _recompute_scores(self):
+        """Puntuaciones y ratings recientes de todas las ventanas a partir de las horas guardadas"""
+        scores = {name: np.zeros(self._capacity) for name in self.windows}
+        recent = {name: np.zeros(self._capacity, dtype=np.int64) for name in self.windows}
+        if self.head is not None:
+            weights = {name: self._weights(name) for name in self.windows}
+            for hour, bucket in self._buckets.items():
+                age = self.head - hour
+                positions = np.fromiter(bucket.keys(), dtype=np.int64, count=len(bucket))
+                counts = np.fromiter(bucket.values(), dtype=np.int64, count=len(bucket))
+                for name, hours in self.windows.items():
+                    if age < hours:
+                        scores[name][positions] += counts * weights[name][age]
+                        recent[name][positions] += counts
+        self._scores, self._recent = scores, recent
+
+    def _advance(self, hour):
+        """Mover el reloj hasta `hour`, descartando las horas que salen de la ventana más larga"""
+        if self.head is None:
+            self.head = hour
+            return
+        if hour <= self.head:
+            return
+        self.head = hour
+        oldest = hour - self.max_hours
+        for expired in [bucket_hour for bucket_hour in self._buckets if bucket_hour <= oldest]:
+            del self._buckets[expired]
+        self._recompute_scores()
+        self.version += 1
+
+    def record(self, movie_id, timestamp):
+        """Registrar un rating (O(1) salvo cuando el reloj avanza de hora)"""
+        with self._lock:
+            self._record(movie_id, timestamp)
+
+    def record_many(self, events):
+        """Registrar varios ratings [{'movieId', 'timestamp'}]"""
+        with self._lock:
+            for event in events:
+                self._record(event['movieId'], event.get('timestamp'))
+
+    def _record(self, movie_id, timestamp):
+        now = int(time.time()) // HOUR
+        self._advance(now)
+        hour = min(int(timestamp or 0) // HOUR, now)
+
+        age = self.head - hour
+        if age >= self.max_hours:
+            return
+
+        position = self._ensure_movie(movie_id)
+        bucket = self._buckets.setdefault(hour, {})
+        bucket[position] = bucket.get(position, 0) + 1
+        for name, hours in self.windows.items():
+            if age < hours:
+                self._scores[name][position] += 0.5 ** (age / self.half_lives[name])
+                self._recent[name][position] += 1
+        self.version += 1
+
+    def _genre_mask(self, genre):
+        mask = self._genre_masks.get(genre)
+        if mask is None:
+            mask = np.zeros(self._capacity, dtype=bool)
+            for position, movie_id in enumerate(self.movie_ids):
+                if genre in self._genres.get(movie_id, ()):
+                    mask[position] = True
+            self._genre_masks[genre] = mask
+        return mask
+
+    def top(self, window='7d', limit=10, offset=0, genre=None):
+        """Películas en tendencia: [{'movieId', 'trend_score', 'recent_ratings'}]"""
+        if window not in self.windows:
+            raise ValueError(f"Ventana no válida: {window}. Disponibles: {list(self.windows)}")
+        genre = genre.lower() if genre else None
+
+        with self._lock:
+            self._advance(int(time.time()) // HOUR)
+            key = (window, genre)
+            cached = self._rankings.get(key)
+            if cached is None or cached[0] != self.version or len(cached[1]) < offset + limit:
+                scores = self._scores[window][:len(self.movie_ids)].copy()
+                if genre:
+                    scores[~self._genre_mask(genre)[:len(scores)]] = 0
+                k = min(max(offset + limit, Config.MAX_RECOMMENDATIONS), len(scores))
+                top = np.argpartition(-scores, k - 1)[:k] if 0 < k < len(scores) else np.arange(len(scores))
+                top = top[np.argsort(-scores[top], kind='stable')]
+                top = top[scores[top] > 0]
+                self._rankings[key] = cached = (self.version, top, scores[top])
+
+            _, positions, scores = cached
+            recent = self._recent[window]
+            results = []
+            for position, score in zip(positions[offset:offset + limit], scores[offset:offset + limit]):
+                results.append({
+                    'movieId': self.movie_ids[position],
+                    'trend_score': round(float(score), 4),
+                    'recent_ratings': int(recent[position])
+                })
+            return results
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'loaded': self.loaded,
+                'movies': len(self.movie_ids),
+                'clock': self.head * HOUR if self.head is not None else None,
+                'windows': {name: {'hours': hours, 'half_life_hours': self.half_lives[name]}
+                            for name, hours in self.windows.items()},
+                'counted_pairs': sum(len(bucket) for bucket in self._buckets.values()),
+                'memory_bytes': int(sum(vector.nbytes for vectors in (self._scores, self._recent)
+                                        for vector in vectors.values()))
+            }
+
+# Instancia global
+trending = TrendingCounters()
@@ -0,0 +1,182 @@
+import os
+import json
+import shutil
+import threading
+import time
+import numpy as np
+from scipy import sparse
+import logging
+
+from config import Config
+from models.topk_kernel import top_k_similar
+
+logger = logging.getLogger(__name__)
+
+def _row_scale(matrix, factors):
+    return sparse.csr_matrix(sparse.diags(factors) @ matrix)
+
+def _column(values):
+    return sparse.csr_matrix(np.asarray(values, dtype=np.float64)[:, None])
+
+def user_similarity_top_k(ratings, method, k, block_size=None):
+    """Top-k usuarios más similares de cada usuario para un método, como CSR usuarios x usuarios
+
+    Igual que calculate_similarity sobre las filas completas (ceros donde no hay rating). Cada
+    método se escribe como un producto escalar entre dos versiones ampliadas de la matriz,
+    para que el kernel top-k por bloques lo calcule sin densificar:
+      - cosine: filas normalizadas L2;
+      - pearson: coseno de las filas centradas, [X, -√d·μ]·[X, √d·μ]ᵀ = X Xᵀ - d·μ μᵀ;
+      - euclidean: se ordena por 2·u·v - |v|² (= |u|² - distancia², mismo orden por fila);
+      - manhattan: Σ|u - v| = Σu + Σv - 2·Σ min(u, v), y Σ min se descompone por niveles de
+        rating en productos de indicadores (como ItemSimilarityIndex.pairwise).
+    """
+    ratings = sparse.csr_matrix(ratings, dtype=np.float64)
+    n_users, dimensions = ratings.shape
+    squares = np.asarray(ratings.multiply(ratings).sum(axis=1)).ravel()
+    sums = np.asarray(ratings.sum(axis=1)).ravel()
+
+    def inverse(values):
+        return np.divide(1.0, values, out=np.zeros_like(values), where=values > 0)
+
+    if method == 'cosine':
+        left = _row_scale(ratings, inverse(np.sqrt(squares)))
+        return top_k_similar(left, k, block_size=block_size)
+
+    if method == 'pearson':
+        means = sums / dimensions
+        deviation = inverse(np.sqrt(np.maximum(squares - dimensions * means ** 2, 0.0)))
+        shift = np.sqrt(dimensions) * means
+        left = _row_scale(sparse.hstack([ratings, _column(-shift)], format='csr'), deviation)
+        right = _row_scale(sparse.hstack([ratings, _column(shift)], format='csr'), deviation)
+        return top_k_similar(left, k, other=right, block_size=block_size, exclude_self=True)
+
+    if method == 'euclidean':
+        left = sparse.hstack([2 * ratings, _column(np.ones(n_users))], format='csr')
+        right = sparse.hstack([ratings, _column(-squares)], format='csr')
+        top = top_k_similar(left, k, other=right, block_size=block_size, exclude_self=True, min_score=-np.inf)
+        rows = np.repeat(np.arange(n_users), np.diff(top.indptr))
+        distance = np.sqrt(np.maximum(squares[rows] - top.data, 0.0))
+        top.data = (1 / (1 + distance)).astype(np.float32)
+        return top
+
+    if method == 'manhattan':
+        levels = np.unique(ratings.data)
+        steps = np.diff(np.concatenate([[0.0], levels]))
+        above = [(ratings >= level).astype(np.float64) for level in levels]
+        left = sparse.hstack([2 * step * indicator for step, indicator in zip(steps, above)] +
+                             [_column(np.ones(n_users))], format='csr')
+        right = sparse.hstack(above + [_column(-sums)], format='csr')
+        top = top_k_similar(left, k, other=right, block_size=block_size, exclude_self=True, min_score=-np.inf)
+        rows = np.repeat(np.arange(n_users), np.diff(top.indptr))
+        distance = np.maximum(sums[rows] - top.data, 0.0)
+        top.data = np.where(distance > 0, 1 / (1 + distance), 1.0).astype(np.float32)
+        return top
+
+    raise ValueError(f"Método de similitud no válido: {method}")
+
+class UserNeighborTable:
+    """Tabla de vecinos usuario-usuario precalculada (scripts/build_user_neighbors.py)
+
+    Por método, un directorio en MODEL_CACHE_DIR/user_neighbors/<método> con los usuarios
+    ordenados (user_ids.npy) y, por usuario, sus K vecinos más similares de mayor a menor
+    (neighbor_ids.npy int32, -1 donde hay menos de K; similarities.npy float32) más meta.json.
+    Se abre con memory-mapping al arrancar: las recomendaciones usuario-usuario solo tienen
+    que agregar los ratings de esos vecinos en lugar de recorrer todos los usuarios.
+    """
+
+    ARRAYS = ('user_ids', 'neighbor_ids', 'similarities')
+
+    def __init__(self, base_dir=None):
+        self.base_dir = base_dir or os.path.join(Config.MODEL_CACHE_DIR, 'user_neighbors')
+        self._tables = {}
+        self._mtimes = {}
+        self._lock = threading.Lock()
+
+    def build(self, method, ratings, user_ids, k=None, block_size=None):
+        """Calcular y guardar la tabla de un método (`ratings`: CSR usuarios x películas)"""
+        k = k or Config.USER_NEIGHBORS
+        start = time.time()
+        user_ids = np.asarray(user_ids)
+        order = np.argsort(user_ids, kind='stable')
+        top = user_similarity_top_k(sparse.csr_matrix(ratings)[order], method, k, block_size)
+        user_ids = user_ids[order]
+
+        # De CSR (filas de longitud variable) a tabla de ancho fijo rellena con -1
+        counts = np.diff(top.indptr)
+        rows = np.repeat(np.arange(len(user_ids)), counts)
+        columns = np.arange(top.nnz) - np.repeat(top.indptr[:-1], counts)
+        neighbor_ids = np.full((len(user_ids), k), -1, dtype=np.int32)
+        similarities = np.zeros((len(user_ids), k), dtype=np.float32)
+        neighbor_ids[rows, columns] = user_ids[top.indices]
+        similarities[rows, columns] = top.data
+
+        path = os.path.join(self.base_dir, method)
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, 'user_ids.npy'), user_ids.astype(np.int64))
+        np.save(os.path.join(tmp_path, 'neighbor_ids.npy'), neighbor_ids)
+        np.save(os.path.join(tmp_path, 'similarities.npy'), similarities)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump({'method': method, 'k': k, 'users': len(user_ids), 'built_at': start,
+                       'build_seconds': time.time() - start}, f)
+
+        old_path = f"{path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        logger.info(f"✅ Vecinos de usuarios ({method}): {len(user_ids)} usuarios x {k} en "
+                    f"{time.time() - start:.2f}s: {path}")
+
+    def load(self):
+        """Abrir (memory-mapped) las tablas nuevas o que cambiaron en disco"""
+        try:
+            if not os.path.isdir(self.base_dir):
+                return False
+            for method in os.listdir(self.base_dir):
+                path = os.path.join(self.base_dir, method)
+                meta_path = os.path.join(path, 'meta.json')
+                if method.endswith(('.tmp', '.old')) or not os.path.exists(meta_path):
+                    continue
+                mtime = os.path.getmtime(meta_path)
+                if self._mtimes.get(method) == mtime:
+                    continue
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in self.ARRAYS}
+                with self._lock:
+                    self._tables[method] = {**arrays, 'meta': meta}
+                    self._mtimes[method] = mtime
+                logger.info(f"✅ Vecinos de usuarios ({method}) cargados: {meta['users']} usuarios x {meta['k']}")
+            return bool(self._tables)
+        except Exception as e:
+            logger.error(f"❌ Error cargando vecinos de usuarios: {e}")
+            return False
+
+    def neighbors(self, method, user_id):
+        """[(userId, similitud)] de mayor a menor, o None si no hay tabla o el usuario no está"""
+        with self._lock:
+            table = self._tables.get(method)
+        if table is None:
+            return None
+        user_ids = table['user_ids']
+        row = np.searchsorted(user_ids, user_id)
+        if row >= len(user_ids) or user_ids[row] != user_id:
+            return None
+        return [
+            (int(neighbor_id), float(similarity))
+            for neighbor_id, similarity in zip(table['neighbor_ids'][row], table['similarities'][row])
+            if neighbor_id >= 0
+        ]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                method: {key: table['meta'][key] for key in ('k', 'users', 'built_at')}
+                for method, table in self._tables.items()
+            }
+
+# Instancia global
+user_neighbors = UserNeighborTable()
@@ -0,0 +1,204 @@
+import os
+import json
+import shutil
+import threading
+import time
+import multiprocessing
+import numpy as np
+import logging
+
+from config import Config
+from models.item_neighbors import top_n_sparse
+
+logger = logging.getLogger(__name__)
+
+# Estado de cada proceso del pool del trabajo batch (se fija en _init_worker)
+_worker = {}
+
+def _init_worker(ratings, neighbors, movie_ids, path, n):
+    _worker.update(ratings=ratings, neighbors=neighbors, movie_ids=movie_ids, n=n, arrays={
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r+')
+        for name in ('movie_ids', 'scores', 'predicted')
+    })
+
+def _score_shard(bounds):
+    """Top-N de un tramo de usuarios, escrito directamente en los arrays mapeados de la salida"""
+    start, end = bounds
+    scores, predicted = _worker['neighbors'].score_users(_worker['ratings'][start:end])
+    top, top_scores = top_n_sparse(scores, _worker['n'])
+    valid = top >= 0
+    top_predicted = np.zeros(top.shape)
+    if valid.any():
+        top_predicted[valid] = np.asarray(predicted[np.nonzero(valid)[0], top[valid]]).ravel()
+    arrays = _worker['arrays']
+    arrays['movie_ids'][start:end] = np.where(valid, _worker['movie_ids'][np.where(valid, top, 0)], -1)
+    arrays['scores'][start:end] = top_scores
+    arrays['predicted'][start:end] = top_predicted
+    for array in arrays.values():
+        array.flush()
+    return end - start
+
+class UserTopNStore:
+    """Recomendaciones top-N precalculadas por usuario (trabajo batch scripts/build_user_topn.py)
+
+    Por método, un directorio en MODEL_CACHE_DIR/user_topn/<método> con:
+      - user_ids.npy: usuarios ordenados (la fila de cada uno se busca por bisección);
+      - movie_ids.npy: int32 usuarios x N (-1 donde no hay más recomendaciones);
+      - scores.npy / predicted.npy: float16 usuarios x N;
+      - meta.json: método, N y momento en que empezó el cálculo.
+    Los arrays se abren con memory-mapping: leer un usuario son unas pocas páginas.
+
+    Un usuario con ratings nuevos desde que empezó el cálculo (avisado por el flush de
+    ratings o detectado al cargar) deja de servirse desde aquí y se puntúa online.
+    """
+
+    ARRAYS = ('user_ids', 'movie_ids', 'scores', 'predicted')
+
+    def __init__(self, base_dir=None):
+        self.base_dir = base_dir or os.path.join(Config.MODEL_CACHE_DIR, 'user_topn')
+        self._stores = {}
+        self._mtimes = {}
+        # userId -> momento del último rating recibido
+        self._changed = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, method, ratings, user_ids, neighbors, n=None, shard_size=None, workers=None, base_dir=None):
+        """Calcular el top-N de todos los usuarios con un pool de procesos por tramos de usuarios
+
+        `ratings` es la CSR usuarios x películas (columnas en el orden de neighbors.movie_ids) y
+        `user_ids` el id de cada fila. Cada proceso escribe sus filas en los .npy de salida.
+        """
+        n = n or Config.USER_TOPN_SIZE
+        shard_size = shard_size or Config.USER_TOPN_SHARD_SIZE
+        workers = max(1, workers or Config.USER_TOPN_WORKERS or os.cpu_count() or 1)
+        started_at = time.time()
+
+        store = cls(base_dir)
+        path = os.path.join(store.base_dir, method)
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        order = np.argsort(user_ids, kind='stable')
+        ratings, user_ids = ratings[order], np.asarray(user_ids)[order]
+        n_users = len(user_ids)
+        np.save(os.path.join(tmp_path, 'user_ids.npy'), user_ids.astype(np.int64))
+        for name, dtype in (('movie_ids', np.int32), ('scores', np.float16), ('predicted', np.float16)):
+            np.lib.format.open_memmap(os.path.join(tmp_path, f"{name}.npy"), mode='w+', dtype=dtype,
+                                      shape=(n_users, n)).flush()
+
+        shards = [(start, min(start + shard_size, n_users)) for start in range(0, n_users, shard_size)]
+        init_args = (ratings, neighbors, neighbors.movie_ids, tmp_path, n)
+        done = 0
+        if workers == 1:
+            _init_worker(*init_args)
+            results = map(_score_shard, shards)
+        else:
+            pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=init_args)
+            results = pool.imap_unordered(_score_shard, shards)
+        try:
+            for count in results:
+                done += count
+                logger.info(f"⏳ Top-{n} por usuario ({method}): {done}/{n_users} usuarios")
+        finally:
+            if workers > 1:
+                pool.close()
+                pool.join()
+
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump({'method': method, 'n': n, 'users': n_users, 'built_at': started_at,
+                       'build_seconds': time.time() - started_at}, f)
+
+        old_path = f"{path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        logger.info(f"✅ Top-{n} de {n_users} usuarios ({method}) en {time.time() - started_at:.2f}s "
+                    f"con {workers} procesos: {path}")
+        store.load()
+        return store
+
+    def load(self):
+        """Abrir (memory-mapped) los métodos precalculados nuevos o que cambiaron en disco"""
+        try:
+            if not os.path.isdir(self.base_dir):
+                return False
+            for method in os.listdir(self.base_dir):
+                path = os.path.join(self.base_dir, method)
+                meta_path = os.path.join(path, 'meta.json')
+                if method.endswith(('.tmp', '.old')) or not os.path.exists(meta_path):
+                    continue
+                mtime = os.path.getmtime(meta_path)
+                if self._mtimes.get(method) == mtime:
+                    continue
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in self.ARRAYS}
+                with self._lock:
+                    self._stores[method] = {**arrays, 'meta': meta}
+                    self._mtimes[method] = mtime
+                logger.info(f"✅ Top-{meta['n']} precalculado ({method}) cargado: {meta['users']} usuarios")
+            # Los cambios anteriores a todos los cálculos cargados ya están incluidos
+            oldest = self.built_at()
+            with self._lock:
+                self._changed = {user_id: when for user_id, when in self._changed.items()
+                                 if oldest is None or when >= oldest}
+            return bool(self._stores)
+        except Exception as e:
+            logger.error(f"❌ Error cargando recomendaciones precalculadas: {e}")
+            return False
+
+    def built_at(self):
+        """Momento del cálculo más antiguo cargado (para buscar usuarios con ratings posteriores)"""
+        with self._lock:
+            return min((store['meta']['built_at'] for store in self._stores.values()), default=None)
+
+    def mark_changed(self, user_ids, when=None):
+        """Los usuarios con ratings nuevos se puntúan online hasta el siguiente cálculo"""
+        when = when or time.time()
+        with self._lock:
+            for user_id in user_ids:
+                self._changed[user_id] = when
+
+    def get(self, method, user_id, limit=10):
+        """[(movieId, score, rating estimado)] precalculado, o None si hay que puntuar online"""
+        with self._lock:
+            store = self._stores.get(method)
+            stale = store is not None and self._changed.get(user_id, 0) >= store['meta']['built_at']
+        if store is None:
+            return None
+        if stale or limit > store['meta']['n']:
+            self.misses += 1
+            return None
+        user_ids = store['user_ids']
+        row = np.searchsorted(user_ids, user_id)
+        if row >= len(user_ids) or user_ids[row] != user_id:
+            self.misses += 1
+            return None
+        self.hits += 1
+        movie_ids = store['movie_ids'][row, :limit]
+        return [
+            (int(movie_id), float(score), float(predicted))
+            for movie_id, score, predicted in zip(movie_ids, store['scores'][row, :limit], store['predicted'][row, :limit])
+            if movie_id >= 0
+        ]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'methods': {
+                    method: {key: store['meta'][key] for key in ('n', 'users', 'built_at')}
+                    for method, store in self._stores.items()
+                },
+                'changed_users': len(self._changed),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+# Instancia global
+user_topn = UserTopNStore()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script para construir el modelo de contenido TF-IDF (tags + géneros) y sus vecinos
+Uso: python scripts/build_content_model.py [--neighbors K] [--block-size N]
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mongo_client import mongo_manager
+from models.content_engine import ContentModel
+from config import Config
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    """Función principal de construcción"""
+    parser = argparse.ArgumentParser(description='Construir el modelo de contenido TF-IDF')
+    parser.add_argument('--neighbors', type=int, default=Config.CONTENT_NEIGHBORS)
+    parser.add_argument('--block-size', type=int, default=Config.CONTENT_BLOCK_SIZE)
+    parser.add_argument('--min-tag-movies', type=int, default=Config.CONTENT_MIN_TAG_MOVIES)
+    args = parser.parse_args()
+
+    try:
+        logger.info("🚀 Construyendo modelo de contenido...")
+
+        # Conectar a MongoDB
+        if not mongo_manager.connect():
+            logger.error("❌ No se pudo conectar a MongoDB")
+            return False
+
+        logger.info("📦 Leyendo películas y tags...")
+        movies = list(mongo_manager.db.movies.find({}, {'_id': 0, 'movieId': 1, 'genres': 1}))
+        tags = list(mongo_manager.db.tags.find({}, {'_id': 0, 'movieId': 1, 'tag': 1}).batch_size(100000))
+        logger.info(f"📊 {len(movies)} películas, {len(tags)} tags")
+        if not movies:
+            logger.error("❌ No hay películas para construir el modelo")
+            return False
+
+        model = ContentModel.build(movies, tags, k=args.neighbors, block_size=args.block_size,
+                                   min_tag_movies=args.min_tag_movies)
+        model.save()
+
+        stats = model.get_stats()
+        logger.info(f"📈 Modelo de contenido:")
+        logger.info(f"   - Películas: {stats['movies']}")
+        logger.info(f"   - Términos: {stats['terms']}")
+        logger.info(f"   - Vecinos: {stats['neighbors']}")
+        logger.info(f"   - Fichero: {stats['path']}")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Error construyendo modelo de contenido: {e}")
+        return False
+    finally:
+        mongo_manager.close()
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Script para construir la matriz de co-ocurrencia película-película ("gustaron juntas")
+Uso: python scripts/build_cooccurrence.py [--block-size N] [--min-count N]
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from database.mongo_client import mongo_manager
+from models.cooccurrence import CooccurrenceModel
+from config import Config
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def load_liked_ratings(batch_size=100000):
+    """Leer de MongoDB los ratings >= umbral como arrays (userId, movieId, rating)"""
+    cursor = mongo_manager.db.ratings.find(
+        {'rating': {'$gte': CooccurrenceModel.LIKE_THRESHOLD}},
+        {'_id': 0, 'userId': 1, 'movieId': 1, 'rating': 1}
+    ).batch_size(batch_size)
+
+    users, movies, ratings = [], [], []
+    for rating in cursor:
+        users.append(rating['userId'])
+        movies.append(rating['movieId'])
+        ratings.append(rating['rating'])
+    return np.array(users), np.array(movies), np.array(ratings, dtype=np.float32)
+
+def main():
+    """Función principal de construcción"""
+    parser = argparse.ArgumentParser(description='Construir la matriz de co-ocurrencia')
+    parser.add_argument('--block-size', type=int, default=Config.COOCCURRENCE_BLOCK_SIZE)
+    parser.add_argument('--min-count', type=int, default=Config.COOCCURRENCE_MIN_COUNT)
+    args = parser.parse_args()
+
+    try:
+        logger.info("🚀 Construyendo matriz de co-ocurrencia...")
+
+        # Conectar a MongoDB
+        if not mongo_manager.connect():
+            logger.error("❌ No se pudo conectar a MongoDB")
+            return False
+
+        logger.info("📦 Leyendo ratings altos...")
+        users, movies, ratings = load_liked_ratings()
+        logger.info(f"📊 {len(ratings)} ratings >= {CooccurrenceModel.LIKE_THRESHOLD}")
+        if not len(ratings):
+            logger.error("❌ No hay ratings para construir la matriz")
+            return False
+
+        model = CooccurrenceModel.build(users, movies, ratings, block_size=args.block_size, min_count=args.min_count)
+        model.save()
+
+        stats = model.get_stats()
+        logger.info(f"📈 Matriz de co-ocurrencia:")
+        logger.info(f"   - Películas: {stats['movies']}")
+        logger.info(f"   - Pares: {stats['pairs']}")
+        logger.info(f"   - Fichero: {stats['path']}")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Error construyendo matriz de co-ocurrencia: {e}")
+        return False
+    finally:
+        mongo_manager.close()
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
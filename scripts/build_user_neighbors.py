@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Script para precalcular los K usuarios más similares de cada usuario, por método
+Uso: python scripts/build_user_neighbors.py [--methods cosine,pearson,...] [--neighbors K] [--block-size N]
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mongo_client import mongo_manager
+from models.user_neighbors import UserNeighborTable
+from config import Config
+from build_user_topn import load_rating_matrix
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+METHODS = ('cosine', 'euclidean', 'manhattan', 'pearson')
+
+def main():
+    """Función principal de construcción"""
+    parser = argparse.ArgumentParser(description='Precalcular la tabla de vecinos usuario-usuario')
+    parser.add_argument('--methods', default=','.join(METHODS))
+    parser.add_argument('--neighbors', type=int, default=Config.USER_NEIGHBORS)
+    parser.add_argument('--block-size', type=int, default=Config.TOPK_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    methods = [method.strip() for method in args.methods.split(',') if method.strip()]
+    invalid = [method for method in methods if method not in METHODS]
+    if invalid:
+        logger.error(f"❌ Métodos no válidos: {invalid}. Disponibles: {list(METHODS)}")
+        return False
+
+    try:
+        logger.info("🚀 Construyendo tabla de vecinos de usuarios...")
+
+        # Conectar a MongoDB
+        if not mongo_manager.connect():
+            logger.error("❌ No se pudo conectar a MongoDB")
+            return False
+
+        logger.info("📦 Leyendo ratings...")
+        matrix, user_ids, movie_ids = load_rating_matrix()
+        logger.info(f"📊 {matrix.nnz} ratings de {len(user_ids)} usuarios sobre {len(movie_ids)} películas")
+        if not matrix.nnz:
+            logger.error("❌ No hay ratings para calcular vecinos")
+            return False
+
+        table = UserNeighborTable()
+        for method in methods:
+            table.build(method, matrix, user_ids, k=args.neighbors, block_size=args.block_size)
+
+        logger.info(f"📈 Tabla de vecinos:")
+        logger.info(f"   - Métodos: {', '.join(methods)}")
+        logger.info(f"   - Usuarios: {len(user_ids)} x {args.neighbors} vecinos")
+        logger.info(f"   - Directorio: {table.base_dir}")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Error construyendo tabla de vecinos: {e}")
+        return False
+    finally:
+        mongo_manager.close()
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Trabajo batch: top-N de recomendaciones de todos los usuarios (item-based) en MODEL_CACHE_DIR/user_topn
+Uso: python scripts/build_user_topn.py [--size N] [--shard-size U] [--workers P]
+
+Solo se precalcula method=item. El método por defecto de /api/user-recommendations (cosine
+y el resto de métodos usuario-usuario) no: su respuesta toma, por película, el rating y la
+similitud del primer vecino que la puntuó, que no es un producto matricial que se pueda
+repartir por tramos. Su parte cara (buscar los vecinos) ya está precalculada en
+scripts/build_user_neighbors.py; online solo se agregan los ratings de esos vecinos.
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from scipy import sparse
+from database.mongo_client import mongo_manager
+from models.item_neighbors import ItemNeighborMatrix
+from models.user_topn import UserTopNStore
+from config import Config
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def load_rating_matrix(batch_size=100000):
+    """Leer todos los ratings de MongoDB como CSR usuarios x películas: (matriz, userIds, movieIds)"""
+    cursor = mongo_manager.db.ratings.find({}, {'_id': 0, 'userId': 1, 'movieId': 1, 'rating': 1}).batch_size(batch_size)
+
+    users, movies, ratings = [], [], []
+    for rating in cursor:
+        users.append(rating['userId'])
+        movies.append(rating['movieId'])
+        ratings.append(rating['rating'])
+
+    user_ids, rows = np.unique(np.array(users), return_inverse=True)
+    movie_ids, columns = np.unique(np.array(movies), return_inverse=True)
+    # Si un par está repetido gana el último rating (igual que en la matriz del motor)
+    matrix = sparse.coo_matrix((np.array(ratings, dtype=np.float32), (rows, columns)),
+                               shape=(len(user_ids), len(movie_ids)))
+    _, last = np.unique((rows * len(movie_ids) + columns)[::-1], return_index=True)
+    keep = len(rows) - 1 - last
+    matrix = sparse.csr_matrix((matrix.data[keep], (rows[keep], columns[keep])), shape=matrix.shape)
+    return matrix, user_ids, movie_ids
+
+def main():
+    """Función principal del trabajo batch"""
+    parser = argparse.ArgumentParser(description='Precalcular el top-N de recomendaciones por usuario')
+    parser.add_argument('--size', type=int, default=Config.USER_TOPN_SIZE)
+    parser.add_argument('--shard-size', type=int, default=Config.USER_TOPN_SHARD_SIZE)
+    parser.add_argument('--workers', type=int, default=Config.USER_TOPN_WORKERS)
+    parser.add_argument('--neighbors', type=int, default=Config.ITEM_NEIGHBORS)
+    args = parser.parse_args()
+
+    try:
+        logger.info("🚀 Precalculando recomendaciones por usuario...")
+
+        # Conectar a MongoDB
+        if not mongo_manager.connect():
+            logger.error("❌ No se pudo conectar a MongoDB")
+            return False
+
+        logger.info("📦 Leyendo ratings...")
+        matrix, user_ids, movie_ids = load_rating_matrix()
+        logger.info(f"📊 {matrix.nnz} ratings de {len(user_ids)} usuarios sobre {len(movie_ids)} películas")
+        if not matrix.nnz:
+            logger.error("❌ No hay ratings para calcular recomendaciones")
+            return False
+
+        neighbors = ItemNeighborMatrix(matrix, movie_ids, k=args.neighbors)
+        store = UserTopNStore.build('item', matrix, user_ids, neighbors, n=args.size,
+                                    shard_size=args.shard_size, workers=args.workers)
+
+        stats = store.get_stats()['methods']['item']
+        logger.info(f"📈 Recomendaciones precalculadas:")
+        logger.info(f"   - Usuarios: {stats['users']}")
+        logger.info(f"   - Top-N: {stats['n']}")
+        logger.info(f"   - Directorio: {store.base_dir}")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Error precalculando recomendaciones: {e}")
+        return False
+    finally:
+        mongo_manager.close()
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,12 +1,17 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 import pandas as pd
 import numpy as np
 from sklearn.cluster import KMeans
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import TruncatedSVD
 import requests
 import io
 
+from models.topk_kernel import top_k_similar
+
 def load_data():
     """Cargar los datos desde las URLs proporcionadas"""
     print("Cargando datos...")
@@ -63,16 +68,16 @@ def create_genre_clusters(movies_df, genres_expanded, n_clusters=10):
     
     return movies_df, kmeans, cluster_analysis
 
-def content_based_similarity(movies_df):
-    """Crear matriz de similitud basada en contenido"""
+def content_based_similarity(movies_df, k=50):
+    """Crear vecinos por similitud de contenido (top-k por película como CSR, sin matriz n x n densa)"""
     print("Calculando similitud basada en contenido...")
     
     # Vectorizar géneros usando TF-IDF
     tfidf = TfidfVectorizer(stop_words='english')
     tfidf_matrix = tfidf.fit_transform(movies_df['genres'])
     
-    # Calcular similitud coseno
-    cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
+    # Calcular similitud coseno (las filas de TF-IDF ya están normalizadas L2)
+    cosine_sim = top_k_similar(tfidf_matrix, k)
     
     return cosine_sim, tfidf
 
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Script para entrenar la factorización ALS implícita sobre todos los ratings
+Uso: python scripts/train_als.py [--factors D] [--iterations N] [--alpha A] [--regularization L] [--workers P]
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mongo_client import mongo_manager
+from models.als import ImplicitALS
+from config import Config
+from build_user_topn import load_rating_matrix
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    """Función principal de entrenamiento"""
+    parser = argparse.ArgumentParser(description='Entrenar la factorización ALS implícita')
+    parser.add_argument('--factors', type=int, default=Config.ALS_FACTORS)
+    parser.add_argument('--iterations', type=int, default=Config.ALS_ITERATIONS)
+    parser.add_argument('--alpha', type=float, default=Config.ALS_ALPHA)
+    parser.add_argument('--regularization', type=float, default=Config.ALS_REGULARIZATION)
+    parser.add_argument('--workers', type=int, default=Config.ALS_WORKERS)
+    parser.add_argument('--block-size', type=int, default=Config.ALS_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    try:
+        logger.info("🚀 Entrenando ALS...")
+
+        # Conectar a MongoDB
+        if not mongo_manager.connect():
+            logger.error("❌ No se pudo conectar a MongoDB")
+            return False
+
+        logger.info("📦 Leyendo ratings...")
+        matrix, user_ids, movie_ids = load_rating_matrix()
+        logger.info(f"📊 {matrix.nnz} ratings de {len(user_ids)} usuarios sobre {len(movie_ids)} películas")
+        if not matrix.nnz:
+            logger.error("❌ No hay ratings para entrenar")
+            return False
+
+        model = ImplicitALS.train(matrix, user_ids, movie_ids, factors=args.factors, iterations=args.iterations,
+                                  alpha=args.alpha, regularization=args.regularization, workers=args.workers,
+                                  block_size=args.block_size)
+        model.save()
+
+        logger.info(f"📈 Entrenamiento ALS:")
+        for step in model.meta['history']:
+            logger.info(f"   - Iteración {step['iteration']}: {step['seconds']:.2f}s, loss {step['loss']:.6f}")
+        logger.info(f"   - Total: {model.meta['train_seconds']:.2f}s")
+        logger.info(f"   - Directorio: {model.path}")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Error entrenando ALS: {e}")
+        return False
+    finally:
+        mongo_manager.close()
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
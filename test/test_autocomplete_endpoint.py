@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Script para probar el endpoint /api/autocomplete (búsqueda de títulos en memoria)
+"""
+
+import requests
+
+BASE_URL = "http://localhost:5000/api"
+
+def test_autocomplete_prefix():
+    """Probar sugerencias mientras se escribe un título"""
+    for query in ['s', 'star', 'star w', 'matrix']:
+        print(f"\n🔎 Probando GET /api/autocomplete?q={query}...")
+        try:
+            response = requests.get(f"{BASE_URL}/autocomplete", params={'q': query, 'limit': 5})
+            print(f"Status Code: {response.status_code}")
+            if response.status_code == 200:
+                data = response.json()
+                print(f"✅ {data['count']} sugerencias en {data['took_ms']} ms")
+                for movie in data['suggestions'][:3]:
+                    print(f"   - {movie['title']} ({movie['match']}, {movie['rating_count']} ratings)")
+            else:
+                print(f"❌ Error: {response.text}")
+        except Exception as e:
+            print(f"❌ Error conectando al servidor: {e}")
+
+def test_autocomplete_fuzzy():
+    """Las erratas y los acentos deben seguir encontrando el título"""
+    for query in ['starr wars', 'amelie']:
+        print(f"\n🔤 Probando búsqueda aproximada '{query}'...")
+        try:
+            response = requests.get(f"{BASE_URL}/autocomplete", params={'q': query, 'limit': 3})
+            if response.status_code == 200:
+                suggestions = response.json()['suggestions']
+                print(f"✅ {[(movie['title'], movie['match'], movie['match_score']) for movie in suggestions]}")
+            else:
+                print(f"❌ Error: {response.status_code} {response.text}")
+        except Exception as e:
+            print(f"❌ Error conectando al servidor: {e}")
+
+def test_autocomplete_empty():
+    """Una consulta vacía no devuelve sugerencias"""
+    print("\n🚫 Probando consulta vacía...")
+    try:
+        response = requests.get(f"{BASE_URL}/autocomplete", params={'q': ''})
+        ok = response.status_code == 200 and response.json()['count'] == 0
+        print(f"Status Code: {response.status_code} {'✅' if ok else '❌'}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+if __name__ == "__main__":
+    test_autocomplete_prefix()
+    test_autocomplete_fuzzy()
+    test_autocomplete_empty()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Script para probar la reconstrucción en caliente del motor (POST /api/engine/rebuild)
+"""
+
+import requests
+import time
+
+BASE_URL = "http://localhost:5000/api"
+
+def get_snapshot():
+    response = requests.get(f"{BASE_URL}/stats")
+    return response.json()['engine'].get('snapshot') if response.status_code == 200 else None
+
+def test_engine_rebuild():
+    """Lanzar una reconstrucción y comprobar que se sigue sirviendo y que cambia la versión"""
+    print("🔄 Probando POST /api/engine/rebuild...")
+    try:
+        before = get_snapshot()
+        print(f"Instantánea actual: {before}")
+
+        response = requests.post(f"{BASE_URL}/engine/rebuild")
+        print(f"Status Code: {response.status_code}")
+        if response.status_code not in (202, 409):
+            print(f"❌ Error: {response.text}")
+            return
+
+        # Durante la reconstrucción la instantánea anterior sigue respondiendo
+        response = requests.get(f"{BASE_URL}/recommendations/1", params={'method': 'collaborative', 'limit': 5})
+        print(f"Recomendaciones durante la reconstrucción: {response.status_code}")
+
+        for _ in range(120):
+            engine = requests.get(f"{BASE_URL}/health").json()['engine']
+            if engine['state'] != 'rebuilding':
+                break
+            print(f"   ⏳ {engine['stage']} ({engine['percent']}%)")
+            time.sleep(1)
+
+        after = get_snapshot()
+        if before and after and after['version'] > before['version']:
+            print(f"✅ Nueva instantánea v{after['version']} construida en {after['build_seconds']}s")
+        else:
+            print(f"⚠️ La versión no cambió: {after}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+if __name__ == "__main__":
+    test_engine_rebuild()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Script para probar el endpoint /api/metrics (métricas del cache por namespace)
+"""
+
+import requests
+import json
+
+BASE_URL = "http://localhost:5000/api"
+
+def test_metrics_endpoint():
+    """Probar métricas del cache tras generar algo de tráfico"""
+    print("📈 Probando GET /api/metrics...")
+    try:
+        # Generar un miss y un hit en el namespace 'genre'
+        requests.get(f"{BASE_URL}/genres/Action", params={'limit': 5})
+        requests.get(f"{BASE_URL}/genres/Action", params={'limit': 5})
+        
+        response = requests.get(f"{BASE_URL}/metrics")
+        print(f"Status Code: {response.status_code}")
+        
+        if response.status_code == 200:
+            data = response.json()
+            print(f"✅ Namespaces con métricas: {list(data['cache'].keys())}")
+            print(f"   Circuit breaker: {data['circuit_breaker']['state']}")
+            genre_metrics = data['cache'].get('genre')
+            if genre_metrics:
+                print(f"   genre → hits: {genre_metrics['hits']}, misses: {genre_metrics['misses']}, "
+                      f"p95: {genre_metrics['p95_latency_ms']}ms")
+            else:
+                print("   ⚠️ Sin métricas para 'genre' (¿Redis desconectado?)")
+        else:
+            print(f"❌ Error: {response.status_code}")
+            print(f"Response: {response.text}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+def test_metrics_prometheus():
+    """Probar la exportación en formato Prometheus"""
+    print("\n📊 Probando GET /api/metrics?format=prometheus...")
+    try:
+        response = requests.get(f"{BASE_URL}/metrics", params={'format': 'prometheus'})
+        print(f"Status Code: {response.status_code}")
+        if response.status_code == 200:
+            lines = response.text.splitlines()
+            print(f"✅ {len(lines)} líneas exportadas")
+            for line in lines[:5]:
+                print(f"   {line}")
+        else:
+            print(f"❌ Error: {response.text}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+if __name__ == "__main__":
+    test_metrics_endpoint()
+    test_metrics_prometheus()
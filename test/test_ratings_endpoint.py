@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Script para probar la ingesta de ratings (POST /api/ratings)
+"""
+
+import requests
+import time
+
+BASE_URL = "http://localhost:5000/api"
+
+def test_single_rating():
+    """Registrar un rating individual"""
+    print("⭐ Probando POST /api/ratings (individual)...")
+    try:
+        response = requests.post(f"{BASE_URL}/ratings", json={'userId': 1, 'movieId': 1, 'rating': 4.5})
+        print(f"Status Code: {response.status_code}")
+        if response.status_code == 202:
+            data = response.json()
+            print(f"✅ Aceptados: {data['accepted']}, pendientes de escribir: {data['pending']}")
+        else:
+            print(f"❌ Error: {response.text}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+def test_bulk_ratings():
+    """Registrar varios ratings y comprobar que se persisten y actualizan las estadísticas"""
+    print("\n📦 Probando POST /api/ratings (bulk)...")
+    try:
+        ratings = [{'userId': 1, 'movieId': movie_id, 'rating': 4.0} for movie_id in (2, 3, 5, 6, 7)]
+        response = requests.post(f"{BASE_URL}/ratings", json={'ratings': ratings})
+        print(f"Status Code: {response.status_code}")
+        if response.status_code != 202:
+            print(f"❌ Error: {response.text}")
+            return
+
+        time.sleep(3)  # esperar al siguiente lote de escritura
+        ingestion = requests.get(f"{BASE_URL}/stats").json().get('ingestion', {})
+        buffer = ingestion.get('buffer', {})
+        print(f"✅ Persistidos: {buffer.get('flushed')} ({buffer.get('inserted')} nuevos, "
+              f"{buffer.get('updated')} actualizados), pendientes: {buffer.get('pending')}")
+        print(f"   Estadísticas por película: {ingestion.get('movie_stats')}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+def test_invalid_rating():
+    """Un rating fuera de rango debe rechazarse con 400"""
+    print("\n🚫 Probando rating no válido...")
+    try:
+        response = requests.post(f"{BASE_URL}/ratings", json={'userId': 1, 'movieId': 1, 'rating': 7})
+        print(f"Status Code: {response.status_code}")
+        if response.status_code == 400:
+            print(f"✅ Rechazado: {response.json()['details']}")
+        else:
+            print(f"❌ Se esperaba 400: {response.text}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+def test_future_timestamp():
+    """Un timestamp en el futuro debe rechazarse con 400"""
+    print("\n🕒 Probando timestamp fuera de rango...")
+    try:
+        response = requests.post(f"{BASE_URL}/ratings",
+                                 json={'userId': 1, 'movieId': 1, 'rating': 4.0, 'timestamp': int(time.time()) + 86400 * 365})
+        print(f"Status Code: {response.status_code}")
+        if response.status_code == 400:
+            print(f"✅ Rechazado: {response.json()['details']}")
+        else:
+            print(f"❌ Se esperaba 400: {response.text}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+def test_non_finite_timestamp():
+    """Un timestamp que no cabe en un float (1e400 -> inf) debe rechazarse con 400, no con 500"""
+    print("\n♾️ Probando timestamp no finito...")
+    try:
+        response = requests.post(f"{BASE_URL}/ratings",
+                                 data='{"userId": 1, "movieId": 1, "rating": 4.0, "timestamp": 1e400}',
+                                 headers={'Content-Type': 'application/json'})
+        print(f"Status Code: {response.status_code}")
+        if response.status_code == 400:
+            print(f"✅ Rechazado: {response.json()['details']}")
+        else:
+            print(f"❌ Se esperaba 400: {response.text}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+if __name__ == "__main__":
+    test_single_rating()
+    test_bulk_ratings()
+    test_invalid_rating()
+    test_future_timestamp()
+    test_non_finite_timestamp()
@@ -18,6 +18,7 @@ def test_recommendations_endpoint():
         {'movie_id': 2, 'method': 'collaborative', 'limit': 5},
         {'movie_id': 3, 'method': 'popular', 'limit': 5},
         {'movie_id': 1299, 'method': 'hybrid', 'limit': 10},
+        {'movie_id': 1, 'method': 'graph', 'limit': 5},
         {'movie_id': 100, 'method': 'content', 'limit': 5},
     ]
     
@@ -61,5 +62,28 @@ def test_recommendations_endpoint():
     
     print("\n🏁 Pruebas completadas!")
 
+def test_recommendations_pagination():
+    """Probar que las páginas se sirven del mismo ranking cacheado"""
+    base_url = "http://localhost:5000"
+    
+    print("\n📄 Probando paginación de /api/recommendations/1...")
+    try:
+        full = requests.get(f"{base_url}/api/recommendations/1",
+                            params={'method': 'content', 'limit': 10}).json()
+        page = requests.get(f"{base_url}/api/recommendations/1",
+                            params={'method': 'content', 'limit': 5, 'offset': 5}).json()
+        
+        full_ids = [rec['movieId'] for rec in full.get('recommendations', [])]
+        page_ids = [rec['movieId'] for rec in page.get('recommendations', [])]
+        
+        if full_ids[5:10] == page_ids:
+            print(f"✅ La página 2 coincide con el ranking completo ({len(page_ids)} películas)")
+        else:
+            print(f"❌ Páginas inconsistentes: {full_ids[5:10]} vs {page_ids}")
+        print(f"   Total en cache: {page.get('total')} | next_cursor: {page.get('next_cursor')}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
 if __name__ == "__main__":
-    test_recommendations_endpoint() 
\ No newline at end of file
+    test_recommendations_endpoint()
+    test_recommendations_pagination() 
\ No newline at end of file
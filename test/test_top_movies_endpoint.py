@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Script para probar el endpoint /api/movies/top (rankings de películas)
+"""
+
+import requests
+
+BASE_URL = "http://localhost:5000/api"
+
+def test_top_formulas():
+    """Probar las fórmulas de ranking disponibles"""
+    for formula in ['average', 'bayesian', 'count']:
+        print(f"\n🏆 Probando GET /api/movies/top?formula={formula}...")
+        try:
+            response = requests.get(f"{BASE_URL}/movies/top", params={'formula': formula, 'limit': 5})
+            print(f"Status Code: {response.status_code}")
+            if response.status_code == 200:
+                data = response.json()
+                print(f"✅ {data['count']} películas")
+                for movie in data['movies'][:3]:
+                    print(f"   - {movie['title']} (score: {movie['score']:.3f}, "
+                          f"⭐ {movie['avg_rating']:.2f}, {movie['rating_count']} ratings)")
+            else:
+                print(f"❌ Error: {response.text}")
+        except Exception as e:
+            print(f"❌ Error conectando al servidor: {e}")
+
+def test_top_filters():
+    """Probar los filtros por género y década"""
+    print("\n🎭 Probando GET /api/movies/top?genre=Comedy&decade=1990...")
+    try:
+        response = requests.get(f"{BASE_URL}/movies/top",
+                                params={'genre': 'Comedy', 'decade': 1990, 'formula': 'bayesian', 'limit': 5})
+        print(f"Status Code: {response.status_code}")
+        if response.status_code == 200:
+            movies = response.json()['movies']
+            matches = all('comedy' in movie['genres'].lower() and 1990 <= (movie.get('year') or 0) < 2000
+                          for movie in movies)
+            print(f"✅ {len(movies)} películas, todas comedias de los 90: {matches}")
+        else:
+            print(f"❌ Error: {response.text}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+def test_top_invalid_formula():
+    """Una fórmula desconocida debe devolver 400"""
+    print("\n🚫 Probando fórmula no válida...")
+    try:
+        response = requests.get(f"{BASE_URL}/movies/top", params={'formula': 'median'})
+        print(f"Status Code: {response.status_code} {'✅' if response.status_code == 400 else '❌'}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+if __name__ == "__main__":
+    test_top_formulas()
+    test_top_filters()
+    test_top_invalid_formula()
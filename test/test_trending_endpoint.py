@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Script para probar el endpoint /api/trending (películas en tendencia)
+"""
+
+import requests
+
+BASE_URL = "http://localhost:5000/api"
+
+def test_trending_windows():
+    """Probar las ventanas disponibles"""
+    for window in ['24h', '7d', '30d']:
+        print(f"\n🔥 Probando GET /api/trending?window={window}...")
+        try:
+            response = requests.get(f"{BASE_URL}/trending", params={'window': window, 'limit': 5})
+            print(f"Status Code: {response.status_code}")
+            if response.status_code == 200:
+                data = response.json()
+                print(f"✅ {data['count']} películas en tendencia")
+                for movie in data['movies'][:3]:
+                    print(f"   - {movie['title']} (score: {movie['trend_score']}, "
+                          f"ratings recientes: {movie['recent_ratings']})")
+            else:
+                print(f"❌ Error: {response.text}")
+        except Exception as e:
+            print(f"❌ Error conectando al servidor: {e}")
+
+def test_trending_genre():
+    """Probar el filtro por género"""
+    print("\n🎭 Probando GET /api/trending?genre=Comedy...")
+    try:
+        response = requests.get(f"{BASE_URL}/trending", params={'window': '30d', 'genre': 'Comedy', 'limit': 5})
+        print(f"Status Code: {response.status_code}")
+        if response.status_code == 200:
+            movies = response.json()['movies']
+            all_comedy = all('comedy' in movie['genres'].lower() for movie in movies)
+            print(f"✅ {len(movies)} películas, todas de comedia: {all_comedy}")
+        else:
+            print(f"❌ Error: {response.text}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+def test_trending_invalid_window():
+    """Una ventana desconocida debe devolver 400"""
+    print("\n🚫 Probando ventana no válida...")
+    try:
+        response = requests.get(f"{BASE_URL}/trending", params={'window': '2y'})
+        print(f"Status Code: {response.status_code} {'✅' if response.status_code == 400 else '❌'}")
+    except Exception as e:
+        print(f"❌ Error conectando al servidor: {e}")
+
+if __name__ == "__main__":
+    test_trending_windows()
+    test_trending_genre()
+    test_trending_invalid_window()
@@ -40,6 +40,24 @@ def test_user_recommendations():
             "method": "manhattan",
             "limit": 12
         },
+        {
+            "name": "Usuario 1 item-based",
+            "user_id": "1",
+            "method": "item",
+            "limit": 10
+        },
+        {
+            "name": "Usuario 1 con factores ALS",
+            "user_id": "1",
+            "method": "als",
+            "limit": 10
+        },
+        {
+            "name": "Usuario 1 con paseo aleatorio en el grafo",
+            "user_id": "1",
+            "method": "graph",
+            "limit": 10
+        },
         {
             "name": "Usuario inexistente",
             "user_id": "99999",
@@ -82,7 +100,10 @@ def test_user_recommendations():
                     for j, movie in enumerate(recommendations[:3], 1):
                         rating_info = f"⭐ {movie.get('rating', 0):.1f}" if movie.get('rating') else ""
                         similarity_info = f"👥 {movie.get('user_similarity', 0):.3f}" if movie.get('user_similarity') else ""
-                        info_parts = [rating_info, similarity_info]
+                        score_info = f"🎯 {movie['score']:.2f}" if movie.get('score') else ""
+                        if movie.get('predicted_rating'):
+                            score_info += f" (≈ {movie['predicted_rating']:.1f})"
+                        info_parts = [rating_info, similarity_info, score_info]
                         info_str = " | ".join([part for part in info_parts if part])
                         
                         print(f"      {j}. {movie.get('title', 'N/A')} ({movie.get('year', 'N/A')})")